@@ -0,0 +1,158 @@
+import json
+from flask import Blueprint, Response, jsonify, request
+import database_manager
+from http_caching import conditional
+
+# Version 1 of the JSON API, mounted at /api/v1 by app.py.
+api = Blueprint('api', __name__)
+
+API_MAX_PAGE_SIZE = 200
+PODCAST_FIELDS = ["id", "name", "rss_feed_url", "recipient_email", "summary_variant"]
+# Listings leave out the bulky columns unless asked for them with ?fields=
+EPISODE_LIST_FIELDS = ["id", "podcast_id", "podcast_url", "title", "published_date", "published_epoch"]
+
+def api_error(message, status):
+    return jsonify({"error": message}), status
+
+def get_fields(available, default):
+    """
+    Returns the fields a request selects with ?fields=a,b,c, or default if it selects none.
+
+    Raises:
+        ValueError: If a selected field is not available.
+    """
+    fields = [field for field in request.args.get('fields', '').split(',') if field]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or default
+
+def select_fields(record, fields):
+    return {field: record.get(field) for field in fields}
+
+def stream_json(items, **envelope):
+    """
+    Streams {"data": [...items], **envelope} as JSON, serialising one item at a time
+    rather than building the whole document in memory.
+    """
+    def generate():
+        yield '{"data": ['
+        for i, item in enumerate(items):
+            yield (', ' if i else '') + json.dumps(item)
+        yield ']'
+        for key, value in envelope.items():
+            yield f', {json.dumps(key)}: {json.dumps(value)}'
+        yield '}'
+    return Response(generate(), mimetype='application/json')
+
+@api.route('/podcasts')
+@conditional
+def list_podcasts():
+    try:
+        fields = get_fields(PODCAST_FIELDS, PODCAST_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    podcasts = database_manager.get_all_podcast_configs()
+    return stream_json(select_fields(podcast, fields) for podcast in podcasts)
+
+@api.route('/podcasts/<int:podcast_id>')
+@conditional
+def get_podcast(podcast_id):
+    try:
+        fields = get_fields(PODCAST_FIELDS, PODCAST_FIELDS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    podcast = database_manager.get_podcast_config_by_id(podcast_id)
+    if not podcast:
+        return api_error("Podcast not found", 404)
+    return jsonify(select_fields(podcast, fields))
+
+@api.route('/episodes')
+@conditional
+def list_episodes():
+    """
+    Lists episodes newest first, a page at a time. Follow next_cursor (?after=) for older
+    episodes and prev_cursor (?before=) for newer ones.
+    """
+    limit = request.args.get('limit', type=int)
+    if limit is not None and not 0 < limit <= API_MAX_PAGE_SIZE:
+        return api_error(f"limit must be between 1 and {API_MAX_PAGE_SIZE}", 400)
+    try:
+        fields = get_fields(database_manager.EPISODE_COLUMNS, EPISODE_LIST_FIELDS)
+        page = database_manager.list_episodes(podcast_id=request.args.get('podcast', type=int),
+                                              after=request.args.get('after'), before=request.args.get('before'),
+                                              limit=limit, columns=tuple(fields))
+    except ValueError as e:
+        return api_error(str(e), 400)
+    return stream_json((select_fields(episode, fields) for episode in page['episodes']),
+                       next_cursor=page['next_cursor'], prev_cursor=page['prev_cursor'])
+
+@api.route('/episodes/<int:episode_id>')
+@conditional
+def get_episode(episode_id):
+    try:
+        fields = get_fields(database_manager.EPISODE_COLUMNS, database_manager.EPISODE_COLUMNS)
+    except ValueError as e:
+        return api_error(str(e), 400)
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode:
+        return api_error("Episode not found", 404)
+    return jsonify(select_fields(episode, fields))
+
+@api.route('/episodes/<int:episode_id>/summary')
+@conditional
+def get_episode_summary(episode_id):
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode:
+        return api_error("Episode not found", 404)
+    return jsonify({
+        "episode_id": episode_id,
+        "summary_text": episode['summary_text'],
+        "summary_html": database_manager.get_summary_html(episode),
+        "summary_variants": database_manager.get_summary_variants(episode['episode_url']),
+        "summary_variants_html": database_manager.get_summary_variants_html(episode['episode_url']),
+    })
+
+@api.route('/episodes/<int:episode_id>/transcript')
+@conditional
+def get_episode_transcript(episode_id):
+    if not database_manager.get_episode_by_id(episode_id):
+        return api_error("Episode not found", 404)
+    transcript = database_manager.get_transcript(episode_id)
+    if transcript is None:
+        return api_error("Transcript not found", 404)
+    return jsonify({"episode_id": episode_id, "transcript": transcript})
+
+@api.route('/episodes/<int:episode_id>/job')
+def get_episode_job(episode_id):
+    """Reports where an episode is in the processing pipeline."""
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode:
+        return api_error("Episode not found", 404)
+    job = database_manager.get_pipeline_job_by_url(episode['episode_url'])
+    if not job:
+        return api_error("Episode has no pipeline job", 404)
+    return jsonify(job)
+
+@api.route('/jobs/<int:job_id>')
+def get_job(job_id):
+    job = database_manager.get_pipeline_job(job_id)
+    if not job:
+        return api_error("Job not found", 404)
+    return jsonify(job)
+
+@api.route('/tasks/<int:task_id>')
+def get_task(task_id):
+    """Reports a background re-summarize or re-transcribe task's status."""
+    task = database_manager.get_episode_task(task_id)
+    if not task:
+        return api_error("Task not found", 404)
+    return jsonify(task)
+
+@api.route('/status')
+def get_status():
+    """Reports the pipeline's backlog, in-flight jobs, stage durations, feed polls and failures."""
+    status = database_manager.get_pipeline_status()
+    if status is None:
+        return api_error("Could not retrieve pipeline status", 500)
+    return jsonify(status)
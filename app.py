@@ -1,27 +1,54 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, stream_with_context, send_file
+from markupsafe import Markup, escape
 import database_manager
+from http_caching import conditional, compress_response
+from api import api
+import opml
+from summarize_podcast import SUMMARY_VARIANTS
+from digest import DIGEST_FREQUENCIES
 import os
 import json
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import sqlite3
 
 app = Flask(__name__)
+# Behind a web server that supports it (nginx, Apache), let it send audio files itself
+app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+
+# Episode audio doesn't change once downloaded, so browsers may reuse it for a day
+# before revalidating.
+AUDIO_MAX_AGE_SECONDS = 24 * 60 * 60
 
 # Configure logging for Flask app
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Create or migrate the database schema once, at startup, rather than on every request
+database_manager.create_table()
 
+app.after_request(compress_response)
 
-
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Hands the request thread's database connection back to the pool for later requests."""
+    database_manager.release_connection()
+app.register_blueprint(api, url_prefix='/api/v1')
 
 @app.route('/')
+@conditional
 def index():
-    database_manager.create_table() # Ensure table exists
-    database_manager.create_podcast_configs_table() # Ensure podcast configs table exists
-    episodes = database_manager.get_all_episodes()
+    podcast_id = request.args.get('podcast', type=int)
+    try:
+        page = database_manager.list_episodes(podcast_id=podcast_id, after=request.args.get('after'),
+                                              before=request.args.get('before'))
+    except ValueError:
+        return "Invalid page cursor", 400
     podcast_configs = database_manager.get_all_podcast_configs()
-    return render_template('index.html', episodes=episodes, podcast_configs=podcast_configs)
+    subscriptions = database_manager.get_subscriptions_by_podcast()
+    return render_template('index.html', episodes=page['episodes'], next_cursor=page['next_cursor'],
+                           prev_cursor=page['prev_cursor'], podcast_id=podcast_id, podcast_configs=podcast_configs,
+                           subscriptions=subscriptions, summary_variants=SUMMARY_VARIANTS)
 
 @app.route('/add_podcast', methods=['GET', 'POST'])
 def add_podcast():
@@ -29,22 +56,149 @@ def add_podcast():
         podcast_name = request.form['podcast_name']
         rss_feed_url = request.form['rss_feed_url']
         recipient_email = request.form['recipient_email']
-        
-        if database_manager.add_podcast_config(podcast_name, rss_feed_url, recipient_email):
+        summary_variant = request.form.get('summary_variant') or None
+        digest_frequency = request.form.get('digest_frequency')
+        if not database_manager.is_valid_summary_variant(summary_variant):
+            return f"Unknown summary variant: {escape(summary_variant)}", 400
+
+        if database_manager.add_podcast_config(podcast_name, rss_feed_url, recipient_email, summary_variant):
             logging.info(f"Added new podcast to config: {podcast_name} - {rss_feed_url}")
+            if recipient_email and digest_frequency in DIGEST_FREQUENCIES:
+                database_manager.set_recipient_digest_frequency(recipient_email, digest_frequency)
             return redirect(url_for('index'))
         else:
             return "Error adding podcast configuration", 500
             
-    return render_template('add_podcast.html')
+    return render_template('add_podcast.html', summary_variants=SUMMARY_VARIANTS, digest_frequencies=DIGEST_FREQUENCIES)
+
+@app.route('/opml/import', methods=['GET', 'POST'])
+def import_opml():
+    """Adds the feeds in an uploaded OPML file, reporting how each one fared."""
+    if request.method == 'POST':
+        upload = request.files.get('opml_file')
+        if not upload or not upload.filename:
+            return "No OPML file uploaded", 400
+        try:
+            report = opml.import_opml(upload.read())
+        except ValueError as e:
+            return str(e), 400
+        return render_template('opml_import.html', report=report)
+    return render_template('opml_import.html', report=None)
+
+@app.route('/opml/export')
+def export_opml():
+    return Response(opml.export_opml(database_manager.get_all_podcast_configs()), mimetype='text/x-opml',
+                    headers={'Content-Disposition': 'attachment; filename=summacast.opml'})
 
 @app.route('/summaries/<int:episode_id>')
+@conditional
 def view_summary(episode_id):
     episode = database_manager.get_episode_by_id(episode_id) # Assuming this function exists or will be created
     if episode:
-        return render_template('summary.html', episode=episode)
+        summary_html = Markup(database_manager.get_summary_html(episode))
+        summary_variants = {variant: Markup(variant_html) for variant, variant_html
+                            in database_manager.get_summary_variants_html(episode['episode_url']).items()}
+        return render_template('summary.html', episode=episode, summary_html=summary_html, summary_variants=summary_variants,
+                               start_seconds=request.args.get('t', type=float),
+                               has_audio=bool(episode['audio_filepath']) and os.path.isfile(episode['audio_filepath']))
     return "Episode not found", 404
 
+@app.route('/audio/<int:episode_id>')
+def episode_audio(episode_id):
+    """
+    Serves an episode's stored audio. Range requests get 206 partial responses, so players
+    can seek without downloading the whole file, and the file is handed to the server's
+    file wrapper (sendfile where supported, or X-Sendfile if enabled) rather than read
+    through Python.
+    """
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode or not episode['audio_filepath'] or not os.path.isfile(episode['audio_filepath']):
+        return "Audio not found", 404
+    return send_file(os.path.abspath(episode['audio_filepath']), conditional=True, max_age=AUDIO_MAX_AGE_SECONDS)
+
+def highlight_snippet(snippet):
+    """Escapes a search snippet and wraps its matched terms in <mark> tags."""
+    return Markup(str(escape(snippet or ""))
+                  .replace(database_manager.SNIPPET_START, "<mark>")
+                  .replace(database_manager.SNIPPET_END, "</mark>"))
+
+@app.template_filter('timestamp')
+def format_timestamp(seconds):
+    """Formats a time in the audio as H:MM:SS, or M:SS under an hour."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}" if hours else f"{minutes}:{seconds:02}"
+
+def load_transcript_page(episode_id, start=None, before=None, query=None):
+    """Loads a page of transcript segments, with search matches highlighted for display."""
+    page = database_manager.get_transcript_segments(episode_id, start=start, before=before, query=query)
+    for segment in page['segments']:
+        segment['html'] = highlight_snippet(segment['highlighted']) if segment['highlighted'] else segment['text']
+    return page
+
+@app.route('/transcripts/<int:episode_id>')
+@conditional
+def view_transcript(episode_id):
+    """
+    Shows an episode's transcript a page of segments at a time, starting at ?position= or
+    at the segment spoken at ?t= seconds, and lists the segments matching ?q=. Further
+    pages are loaded from transcript_segments as the reader scrolls.
+    """
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode:
+        return "Episode not found", 404
+    query = request.args.get('q', '').strip()
+    start = request.args.get('position', type=int)
+    seconds = request.args.get('t', type=float)
+    if start is None and seconds is not None:
+        start = database_manager.find_transcript_position(episode_id, seconds)
+    page = load_transcript_page(episode_id, start=start, query=query)
+    hits = database_manager.get_transcript_hits(episode_id, query) if query else []
+    return render_template('transcript.html', episode=episode, episode_id=episode_id, page=page, query=query, hits=hits,
+                           hits_limit=database_manager.TRANSCRIPT_HITS_LIMIT)
+
+@app.route('/transcripts/<int:episode_id>/segments')
+@conditional
+def transcript_segments(episode_id):
+    """Renders the page of transcript segments after ?start= or before ?before=, for infinite scrolling."""
+    if not database_manager.get_episode_by_id(episode_id):
+        return "Episode not found", 404
+    page = load_transcript_page(episode_id, start=request.args.get('start', type=int),
+                                before=request.args.get('before', type=int), query=request.args.get('q', '').strip())
+    return render_template('transcript_segments.html', episode_id=episode_id, page=page)
+
+@app.route('/search')
+@conditional
+def search():
+    query = request.args.get('q', '').strip()
+    results = database_manager.search_episodes(query) if query else []
+    for result in results:
+        result['snippet'] = highlight_snippet(result['snippet'])
+    return render_template('search.html', query=query, results=results)
+
+# How the status page names each pipeline stage, keyed by the stage a job reaches after it.
+PIPELINE_STEP_NAMES = {
+    "downloaded": "Download",
+    "transcribed": "Transcription",
+    "summarized": "Summarization",
+    "emailed": "Email",
+}
+
+@app.route('/status')
+def pipeline_status():
+    """Shows the pipeline's backlog, in-flight jobs, stage durations, feed polls and failures."""
+    status = database_manager.get_pipeline_status()
+    if status is None:
+        return "Error retrieving pipeline status", 500
+    for failure in status['recent_failures']:
+        failure['finished'] = datetime.fromtimestamp(failure['finished_epoch']).isoformat(sep=' ', timespec='seconds')
+    return render_template('status.html', status=status, step_names=PIPELINE_STEP_NAMES)
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Reports the read cache's hit rate, for monitoring."""
+    return jsonify(database_manager.get_read_cache_stats())
+
 @app.route('/delete_podcast/<int:podcast_id>', methods=['POST'])
 def delete_podcast(podcast_id):
     podcast = database_manager.get_podcast_config_by_id(podcast_id)
@@ -59,51 +213,216 @@ def delete_podcast(podcast_id):
         logging.error(f"Failed to delete podcast: {podcast['name']}")
         return "Error deleting podcast", 500
 
-@app.route('/resummarize/<int:episode_id>', methods=['POST'])
-def resummarize_episode(episode_id):
+@app.route('/podcasts/<int:podcast_id>/subscribers', methods=['POST'])
+def add_subscriber(podcast_id):
+    podcast = database_manager.get_podcast_config_by_id(podcast_id)
+    if not podcast:
+        logging.error(f"Attempted to subscribe to non-existent podcast with ID: {podcast_id}")
+        return "Podcast not found", 404
+
+    email = request.form['email'].strip()
+    summary_variant = request.form.get('summary_variant') or None
+    if not database_manager.is_valid_summary_variant(summary_variant):
+        return f"Unknown summary variant: {escape(summary_variant)}", 400
+    if email and database_manager.add_subscription(podcast_id, email, summary_variant):
+        logging.info(f"Subscribed {email} to podcast: {podcast['name']}")
+        return redirect(url_for('index'))
+    return "Error adding subscriber", 500
+
+@app.route('/podcasts/<int:podcast_id>/subscribers/delete', methods=['POST'])
+def remove_subscriber(podcast_id):
+    email = request.form['email']
+    if database_manager.remove_subscription(podcast_id, email):
+        logging.info(f"Unsubscribed {email} from podcast with ID: {podcast_id}")
+        return redirect(url_for('index'))
+    return "Subscriber not found", 404
+
+# Re-summarize and re-transcribe tasks run off the request thread, one at a time as
+# Whisper and the summarizer are heavy; the browser polls /tasks/<task_id> for progress.
+task_executor = ThreadPoolExecutor(max_workers=1)
+# How often a stream following a task already in progress checks on it.
+TASK_POLL_SECONDS = 2
+
+def get_episode_config(episode):
+    """Returns the podcast config for an episode, or a stand-in if its podcast has since been deleted."""
+    config = database_manager.get_podcast_config_by_id(episode['podcast_id']) if episode.get('podcast_id') else None
+    return config or {"name": "Unknown Podcast", "rss_feed_url": episode['podcast_url']}
+
+def refresh_episode(episode, retranscribe=False):
+    """
+    Re-summarizes an episode, first re-transcribing it if asked to or if its transcription
+    file is missing.
+
+    Returns:
+        str: An error message, or None on success.
+    """
+    transcription_file_path = episode['transcription_filepath']
+    if retranscribe or not transcription_file_path or not os.path.exists(transcription_file_path):
+        logging.info(f"Re-transcribing {episode['title']}...")
+        from transcribe_podcast import transcribe_audio
+        transcription_file_path = transcribe_audio(episode['audio_filepath'])
+        if not transcription_file_path:
+            logging.error(f"Failed to re-transcribe audio for episode: {episode['title']}")
+            return "Failed to re-transcribe audio"
+        database_manager.index_transcript(episode['episode_url'], transcription_file_path)
+
+    from main_workflow import summarize_episode
+    new_summary_text = summarize_episode(episode['episode_url'], episode['title'], transcription_file_path, get_episode_config(episode))
+    if not new_summary_text:
+        logging.error(f"Failed to generate new summary for episode: {episode['title']}")
+        return "Failed to generate summary"
+    if not database_manager.update_episode_summary(episode['id'], new_summary_text):
+        logging.error(f"Error updating summary in DB for episode {episode['title']}")
+        return "Error updating summary"
+    logging.info(f"Successfully re-summarized and updated episode {episode['title']}")
+    return None
+
+def run_episode_task(task_id):
+    """Runs a queued episode task on the task executor, recording its outcome."""
+    if not database_manager.start_episode_task(task_id):
+        return # Already started elsewhere
+    task = database_manager.get_episode_task(task_id)
+    episode = database_manager.get_episode_by_id(task['episode_id'])
+    try:
+        error = refresh_episode(episode, retranscribe=task['action'] == 'retranscribe')
+    except Exception as e:
+        logging.exception(f"Episode task {task_id} failed")
+        error = str(e)
+    database_manager.finish_episode_task(task_id, error)
+
+def task_response(task):
+    """Describes a task as JSON, with a link to poll for its status."""
+    body = dict(task, status_url=url_for('episode_task_status', task_id=task['id']))
+    return jsonify(body), 202, {'Location': body['status_url']}
+
+def enqueue_episode_task(episode_id, action):
+    """Queues a background task on an episode, or returns the one already in progress."""
     episode = database_manager.get_episode_by_id(episode_id)
     if not episode:
-        logging.error(f"Attempted to re-summarize non-existent episode with ID: {episode_id}")
+        logging.error(f"Attempted to {action} non-existent episode with ID: {episode_id}")
         return "Episode not found", 404
+    task = database_manager.enqueue_episode_task(episode_id, action)
+    if task is None:
+        return "Could not queue task", 500
+    if task['created']:
+        logging.info(f"Queued {task['action']} of episode: {episode['title']}")
+        task_executor.submit(run_episode_task, task['id'])
+    return task_response(task)
+
+@app.route('/resummarize/<int:episode_id>', methods=['POST'])
+def resummarize_episode(episode_id):
+    return enqueue_episode_task(episode_id, 'resummarize')
+
+@app.route('/retranscribe/<int:episode_id>', methods=['POST'])
+def retranscribe_episode(episode_id):
+    return enqueue_episode_task(episode_id, 'retranscribe')
+
+@app.route('/tasks/<int:task_id>')
+def episode_task_status(task_id):
+    """Reports a background task's status: queued, running, done or failed."""
+    task = database_manager.get_episode_task(task_id)
+    if not task:
+        return "Task not found", 404
+    return jsonify(task)
 
-    logging.info(f"Re-summarizing episode: {episode['title']}")
+def format_sse(data, event=None):
+    """Formats a payload as a Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
 
-    # Assuming audio_filepath and transcription_filepath are stored in the DB
-    audio_file_path = episode['audio_filepath']
+def stream_resummary(episode):
+    """
+    Re-summarizes an episode from its existing transcription file as format_sse() events,
+    streaming the summary as it is generated.
+
+    Returns:
+        str: An error message, or None on success (as the generator's return value).
+    """
     transcription_file_path = episode['transcription_filepath']
+    yield format_sse("Summarizing...", event='status')
+    from summarize_podcast import stream_summary, SummarizationError
+    pieces = []
+    try:
+        for piece in stream_summary(transcription_file_path):
+            pieces.append(piece)
+            yield format_sse(piece)
+    except SummarizationError:
+        logging.error(f"Failed to generate new summary for episode: {episode['title']}")
+        return "Failed to generate summary"
 
-    # Re-transcribe if transcription file doesn't exist or is needed
-    if not os.path.exists(transcription_file_path):
-        logging.info(f"Transcription file not found for {episode['title']}, re-transcribing...")
-        from transcribe_podcast import transcribe_audio
-        transcription_file_path = transcribe_audio(audio_file_path)
-        if not transcription_file_path:
-            logging.error(f"Failed to re-transcribe audio for episode: {episode['title']}")
-            return "Failed to re-transcribe audio", 500
-
-    # Re-summarize
-    from summarize_podcast import summarize_text
-    new_summary_text = summarize_text(transcription_file_path)
-
-    if new_summary_text:
-        # Update the summary in the database
-        conn = database_manager.connect_db()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("UPDATE episodes SET summary_text = ?, processed_timestamp = ? WHERE id = ?",
-                               (new_summary_text, datetime.now().isoformat(), episode_id))
-                conn.commit()
-                logging.info(f"Successfully re-summarized and updated episode {episode['title']}")
-            except sqlite3.Error as e:
-                logging.error(f"Error updating summary in DB for episode {episode['title']}: {e}")
-                return "Error updating summary", 500
-            finally:
-                conn.close()
-        return redirect(url_for('view_summary', episode_id=episode_id))
+    # The variants subscribers receive are regenerated from the new transcript too
+    yield format_sse("Updating summary variants...", event='status')
+    from main_workflow import summarize_episode
+    new_summary_text = summarize_episode(episode['episode_url'], episode['title'], transcription_file_path,
+                                         get_episode_config(episode), summary="".join(pieces).strip())
+    if not new_summary_text or not database_manager.update_episode_summary(episode['id'], new_summary_text):
+        return "Error updating summary"
+    logging.info(f"Successfully streamed re-summary for episode {episode['title']}")
+    return None
+
+def follow_episode_task(task):
+    """Reports another request's or the executor's task on an episode as format_sse() events until it ends."""
+    while task and task['status'] in ('queued', 'running'):
+        action = 'Re-transcribing' if task['action'] == 'retranscribe' else 'Re-summarizing'
+        yield format_sse(f"{action} ({task['status']})...", event='status')
+        time.sleep(TASK_POLL_SECONDS)
+        task = database_manager.get_episode_task(task['id'])
+    if task and task['status'] == 'done':
+        yield format_sse(url_for('view_summary', episode_id=task['episode_id']), event='done')
     else:
-        logging.error(f"Failed to generate new summary for episode: {episode['title']}")
-        return "Failed to generate summary", 500
+        yield format_sse(task['error'] if task else "Task not found", event='error')
+
+@app.route('/resummarize/<int:episode_id>/stream')
+def resummarize_episode_stream(episode_id):
+    """
+    Re-summarizes an episode, streaming the summary to the browser as it is generated.
+    The stream runs as the episode's re-summarize task, so while another task on the
+    episode is queued or running it reports that task's progress instead of starting one.
+    An episode without a transcription file is re-transcribed on the task executor, as
+    Whisper is too heavy for a request thread, and the stream reports that task instead.
+    """
+    episode = database_manager.get_episode_by_id(episode_id)
+    if not episode:
+        logging.error(f"Attempted to stream re-summary of non-existent episode with ID: {episode_id}")
+        return "Episode not found", 404
+    task = database_manager.enqueue_episode_task(episode_id, 'resummarize')
+    if task is None:
+        return "Could not queue task", 500
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    transcription_file_path = episode['transcription_filepath']
+    if task['created'] and (not transcription_file_path or not os.path.exists(transcription_file_path)):
+        logging.info(f"Queued re-transcription and re-summary of episode: {episode['title']}")
+        task_executor.submit(run_episode_task, task['id'])
+        return Response(stream_with_context(follow_episode_task(task)), mimetype='text/event-stream', headers=headers)
+    if not task['created'] or not database_manager.start_episode_task(task['id']):
+        task = database_manager.get_episode_task(task['id'])
+        return Response(stream_with_context(follow_episode_task(task)), mimetype='text/event-stream', headers=headers)
+
+    def generate():
+        try:
+            error = yield from stream_resummary(episode)
+        except Exception as e:
+            logging.exception(f"Streamed re-summary of episode {episode_id} failed")
+            error = str(e)
+        database_manager.finish_episode_task(task['id'], error)
+        if error:
+            yield format_sse(error, event='error')
+        else:
+            yield format_sse(url_for('view_summary', episode_id=episode_id), event='done')
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+    # The task is running from here on, so it is failed when the response is closed, even
+    # if the stream never started or broke off, e.g. because the browser tab was closed.
+    # Once generate() has finished the task this does nothing, as only running tasks are updated.
+    def fail_unfinished_task():
+        database_manager.finish_episode_task(task['id'], "Stream closed before the summary was finished")
+        database_manager.release_connection() # This runs after the request's teardown
+
+    response.call_on_close(fail_unfinished_task)
+    return response
 
 if __name__ == '__main__':
+    # Resume tasks queued before the last shutdown
+    for task in database_manager.get_queued_episode_tasks():
+        task_executor.submit(run_episode_task, task['id'])
     app.run(debug=True)
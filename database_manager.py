@@ -1,29 +1,345 @@
+import os
+import json
+import math
+import queue
+import zlib
+import hashlib
+import secrets
 import sqlite3
 import logging
-from datetime import datetime
+import threading
+import weakref
+import functools
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from summary_renderer import render_summary_html, SUMMARY_RENDERER_VERSION
+from summarize_podcast import parse_variant
 
 logger = logging.getLogger(__name__)
 
 DATABASE_NAME = "summacast.db"
 
-def connect_db():
-    """Establishes a connection to the SQLite database."""
+# Connection tuning applied to every pooled connection. WAL lets the web app read while
+# the workflow writes; busy_timeout makes concurrent writers wait rather than fail with
+# "database is locked"; synchronous=NORMAL is durable under WAL at a fraction of the fsyncs.
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 20000
+CONNECTION_PRAGMAS = (
+    # Lets compaction return free pages a few at a time. It must precede the switch to WAL
+    # to take effect on a new database; existing ones get it from compact_database().
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    f"PRAGMA cache_size = -{CACHE_SIZE_KIB}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+# Migrations backfill existing rows in batches of this many, each in its own short
+# transaction, so the web app and workflow are never blocked for long.
+BACKFILL_BATCH_SIZE = 500
+
+# Episode listings are paged, and load only these columns rather than whole summaries.
+EPISODE_PAGE_SIZE = 50
+EPISODE_LIST_COLUMNS = "id, podcast_id, podcast_url, title, published_date, published_epoch"
+# Every column an episode listing may select, e.g. for the JSON API's sparse fields.
+EPISODE_COLUMNS = [
+    "id", "podcast_id", "podcast_url", "episode_url", "title", "published_date", "published_epoch",
+    "audio_filepath", "transcription_filepath", "summary_filepath", "summary_text", "processed_timestamp",
+]
+
+# Transcripts are indexed for search in segments of about this many words, so a match
+# can be shown in context. Porter stemming lets "economy" match "economic".
+SEGMENT_WORDS = 150
+SEARCH_TOKENIZER = "porter unicode61"
+SEARCH_RESULTS_LIMIT = 20
+# Control characters that mark matched terms in search snippets, as they never occur in text.
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+# The transcript viewer loads this many segments at a time, and lists at most this many
+# segments matching a search.
+TRANSCRIPT_PAGE_SIZE = 20
+TRANSCRIPT_HITS_LIMIT = 100
+
+# Transcripts are kept zlib-compressed in the artifact store, keyed by SHA-256 of their text.
+ARTIFACT_CODEC = "zlib"
+ARTIFACT_COMPRESSION_LEVEL = 6
+TRANSCRIPT_ARTIFACT = "transcript"
+# When each stretch of a transcript was spoken, as JSON from the transcriber.
+TIMINGS_ARTIFACT = "transcript_timings"
+
+# Stages an episode passes through, in order. "emailed" means its emails are in the outbox.
+PIPELINE_STAGES = ["discovered", "downloaded", "transcribed", "summarized", "emailed"]
+# Job columns a stage may record on completion.
+PIPELINE_JOB_FIELDS = {"audio_filepath", "transcription_filepath", "summary_text", "title", "published_date"}
+
+# Reads of rarely-changing data (podcasts, subscriptions, episode listings) are cached
+# in-process, up to this many results, until the database's data version changes.
+READ_CACHE_SIZE = 256
+# Tables whose changes bump the data version, and so invalidate cached reads.
+VERSIONED_TABLES = ["podcast_configs", "episodes", "recipients", "subscriptions", "summary_variants", "transcript_segments"]
+
+# Episodes whose summaries outlive their retention are moved, zlib-compressed, to this
+# separate archive database. Retention work is done this many episodes at a time.
+ARCHIVE_DATABASE_NAME = "summacast_archive.db"
+RETENTION_KINDS = ["audio", "transcript", "summary"]
+RETENTION_BATCH_SIZE = 500
+# ANALYZE samples about this many rows per index, keeping scheduled runs short.
+ANALYSIS_LIMIT = 1000
+
+# Actions the web app runs on an episode in the background. An episode has at most one
+# queued or running task; one running longer than the timeout is presumed dead.
+EPISODE_TASK_ACTIONS = ["resummarize", "retranscribe"]
+EPISODE_TASK_TIMEOUT_SECONDS = 2 * 60 * 60
+
+# Stage runs are kept this long for the status page's duration percentiles; older runs
+# are pruned as new ones are recorded, so the table stays small.
+STAGE_RUN_WINDOW_DAYS = 7
+RECENT_FAILURES_LIMIT = 10
+
+# Connections released by threads that are done with them, e.g. the web server's
+# per-request threads, are kept for the next thread rather than closed, so a request
+# doesn't open and tune a new connection. At most this many are kept idle.
+IDLE_CONNECTIONS = 8
+
+class PooledConnection(sqlite3.Connection):
+    """A sqlite3 connection that can be tracked by weak reference, and knows which database file it opened."""
+
+_local = threading.local()
+_connections = weakref.WeakSet()
+_connections_lock = threading.Lock()
+# Most recently released first, as its pages are likeliest to still be cached.
+_idle_connections = queue.LifoQueue(maxsize=IDLE_CONNECTIONS)
+
+def _database_identity():
+    """
+    Identifies the database file currently named by DATABASE_NAME, so a thread's cached
+    connection is replaced if DATABASE_NAME changes or the file is deleted and recreated.
+    """
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
-        conn.row_factory = sqlite3.Row # Allows accessing columns by name
-        logger.info(f"Successfully connected to database: {DATABASE_NAME}")
+        stat = os.stat(DATABASE_NAME)
+        return (DATABASE_NAME, stat.st_dev, stat.st_ino)
+    except OSError:
+        return (DATABASE_NAME, None, None)
+
+def _is_open(conn):
+    try:
+        conn.in_transaction
+        return True
+    except sqlite3.ProgrammingError:
+        return False
+
+def _is_usable(conn):
+    """Whether a connection is still open on the database file currently named by DATABASE_NAME."""
+    return _is_open(conn) and conn.identity == _database_identity()
+
+def _checkout_idle_connection():
+    """Takes a usable connection from the idle pool, closing stale ones, or returns None if there is none."""
+    while True:
+        try:
+            conn = _idle_connections.get_nowait()
+        except queue.Empty:
+            return None
+        if _is_usable(conn):
+            return conn
+        if _is_open(conn):
+            conn.close()
+
+def connect_db():
+    """
+    Returns this thread's persistent connection to the SQLite database. A thread's first
+    call checks out an idle connection released by another thread, or opens and tunes a
+    new one if there is none; release_connection() hands it back.
+
+    Connections run in autocommit mode; group writes with transaction().
+
+    Raises:
+        sqlite3.Error: If the database cannot be opened.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _is_usable(conn):
         return conn
-    except sqlite3.Error as e:
-        logger.error(f"Error connecting to database: {e}")
+    if conn is not None and _is_open(conn):
+        conn.close()
+
+    conn = _checkout_idle_connection()
+    if conn is None:
+        try:
+            conn = sqlite3.connect(DATABASE_NAME, isolation_level=None, check_same_thread=False, factory=PooledConnection)
+            conn.row_factory = sqlite3.Row # Allows accessing columns by name
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+        except sqlite3.Error as e:
+            logger.error(f"Error connecting to database: {e}")
+            raise
+        logger.debug(f"Successfully connected to database: {DATABASE_NAME}")
+        conn.identity = _database_identity()
+        with _connections_lock:
+            _connections.add(conn)
+    _local.conn = conn
+    return conn
+
+def release_connection():
+    """
+    Returns the calling thread's connection to the idle pool for another thread to use,
+    e.g. at the end of a web request. It is closed instead if the pool is full, or if it
+    was left in a transaction.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        return
+    _local.conn = None
+    if not _is_open(conn):
+        return
+    if conn.in_transaction or not _is_usable(conn):
+        conn.close()
+        return
+    try:
+        _idle_connections.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def close_connection():
+    """Closes the calling thread's persistent connection, if it has one."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+def close_all_connections():
+    """
+    Closes every pooled connection in every thread or the idle pool, checkpointing the
+    WAL, and empties the read cache. Threads transparently reconnect on their next database call.
+    """
+    with _connections_lock:
+        connections = list(_connections)
+        _connections.clear()
+    while _checkout_idle_connection() is not None:
+        pass # Empties the idle pool; its connections are among those closed below
+    _read_cache.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Error closing database connection: {e}")
+
+@contextmanager
+def transaction():
+    """
+    Runs the enclosed statements as one write transaction on this thread's connection,
+    committing on success and rolling back on error. Nested uses join the outer transaction.
+
+    BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue on
+    busy_timeout instead of failing part-way through with "database is locked".
+    """
+    conn = connect_db()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+class ReadCache:
+    """
+    A bounded LRU cache of query results, each valid only for the data version it was
+    read at. Thread-safe, and counts hits and misses so its hit rate can be monitored.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, load):
+        """Returns the result cached for key at version, calling load() to read it on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = load()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+_read_cache = ReadCache(READ_CACHE_SIZE)
+
+def get_data_version_info():
+    """
+    Returns the database's data version, which changes whenever VERSIONED_TABLES change
+    in any process, and the Unix time it last changed, or None if it has none yet.
+    """
+    try:
+        row = connect_db().execute("SELECT version, modified_epoch FROM data_version WHERE id = 1").fetchone()
+    except sqlite3.Error:
         return None
+    return dict(row) if row else None
+
+def get_data_version():
+    """
+    Returns a token that changes whenever VERSIONED_TABLES change, in any process, or
+    None if the database has no data version yet.
+    """
+    info = get_data_version_info()
+    return (_database_identity(), info['version']) if info else None
+
+def cached_read(func):
+    """
+    Serves a read function's results from the read cache while the data version is
+    unchanged. Cached results are shared between callers and must not be modified.
+
+    Reads inside a write transaction bypass the cache, as they may see uncommitted changes.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        version = None if connect_db().in_transaction else get_data_version()
+        if version is None:
+            return func(*args, **kwargs)
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        return _read_cache.get(key, version, lambda: func(*args, **kwargs))
+    return wrapper
+
+def get_read_cache_stats():
+    """Returns the read cache's size, hits, misses and hit rate."""
+    return _read_cache.stats()
 
 def create_table():
     """Creates the episodes table if it doesn't exist."""
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
+    try:
+        with transaction() as conn:
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS episodes (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     podcast_url TEXT NOT NULL,
@@ -37,245 +353,2258 @@ def create_table():
                     processed_timestamp TEXT
                 )
             """)
-            conn.commit()
-            logger.info("Table 'episodes' checked/created successfully.")
-        except sqlite3.Error as e:
-            logger.error(f"Error creating table: {e}")
-        finally:
-            conn.close()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary_variants (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    episode_url TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    summary_text TEXT NOT NULL,
+                    created_timestamp TEXT,
+                    UNIQUE (episode_url, variant)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    episode_url TEXT NOT NULL,
+                    recipient_email TEXT NOT NULL DEFAULT '',
+                    subject TEXT NOT NULL,
+                    podcast_name TEXT,
+                    episode_title TEXT,
+                    published_date TEXT,
+                    summary_text TEXT,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at TEXT NOT NULL,
+                    last_error TEXT,
+                    created_timestamp TEXT,
+                    sent_timestamp TEXT,
+                    UNIQUE (episode_url, recipient_email)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_recipient ON outbox (recipient_email, status)")
+        logger.info("Table 'episodes' checked/created successfully.")
+    except sqlite3.Error as e:
+        logger.error(f"Error creating table: {e}")
     create_podcast_configs_table()
+    run_migrations()
+    rerender_stale_summaries()
 
 def create_podcast_configs_table():
     """Creates the podcast_configs table if it doesn't exist."""
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
+    try:
+        with transaction() as conn:
+            conn.execute("""
                 CREATE TABLE IF NOT EXISTS podcast_configs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
                     rss_feed_url TEXT NOT NULL UNIQUE,
-                    recipient_email TEXT
+                    recipient_email TEXT,
+                    summary_variant TEXT
                 )
             """)
-            conn.commit()
-            logger.info("Table 'podcast_configs' checked/created successfully.")
-        except sqlite3.Error as e:
-            logger.error(f"Error creating podcast_configs table: {e}")
-        finally:
-            conn.close()
+            # Databases created before summary variants existed lack the column
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(podcast_configs)")]
+            if 'summary_variant' not in columns:
+                conn.execute("ALTER TABLE podcast_configs ADD COLUMN summary_variant TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS recipients (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT NOT NULL UNIQUE,
+                    digest_frequency TEXT NOT NULL DEFAULT 'immediate',
+                    last_digest_timestamp TEXT
+                )
+            """)
+            subscriptions_existed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'subscriptions'"
+            ).fetchone() is not None
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS subscriptions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    podcast_id INTEGER NOT NULL REFERENCES podcast_configs (id) ON DELETE CASCADE,
+                    recipient_id INTEGER NOT NULL REFERENCES recipients (id) ON DELETE CASCADE,
+                    summary_variant TEXT,
+                    UNIQUE (podcast_id, recipient_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_subscriptions_recipient ON subscriptions (recipient_id)")
+            if not subscriptions_existed:
+                # Carry over the single recipient each podcast config had before subscriptions existed
+                conn.execute("""
+                    INSERT OR IGNORE INTO recipients (email)
+                    SELECT DISTINCT recipient_email FROM podcast_configs WHERE COALESCE(recipient_email, '') != ''
+                """)
+                conn.execute("""
+                    INSERT OR IGNORE INTO subscriptions (podcast_id, recipient_id, summary_variant)
+                    SELECT podcast_configs.id, recipients.id, podcast_configs.summary_variant
+                    FROM podcast_configs JOIN recipients ON recipients.email = podcast_configs.recipient_email
+                """)
+        logger.info("Table 'podcast_configs' checked/created successfully.")
+    except sqlite3.Error as e:
+        logger.error(f"Error creating podcast_configs table: {e}")
+
+def parse_published_epoch(published_date):
+    """
+    Converts a feed's published date (RFC 822, as given by feedparser, or ISO 8601)
+    to a Unix timestamp, or None if it is missing or unparseable. Dates without a
+    timezone are taken to be UTC.
+    """
+    if not published_date:
+        return None
+    try:
+        published = parsedate_to_datetime(published_date)
+    except (TypeError, ValueError, IndexError):
+        try:
+            published = datetime.fromisoformat(published_date)
+        except ValueError:
+            logger.warning(f"Could not parse published date: {published_date}")
+            return None
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return int(published.timestamp())
+
+def _add_episode_ordering_columns(conn):
+    """Adds the numeric publish time and owning podcast to episodes, with indexes for listing."""
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(episodes)")]
+    if 'published_epoch' not in columns:
+        conn.execute("ALTER TABLE episodes ADD COLUMN published_epoch INTEGER")
+    if 'podcast_id' not in columns:
+        conn.execute("ALTER TABLE episodes ADD COLUMN podcast_id INTEGER REFERENCES podcast_configs (id) ON DELETE SET NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episodes_published ON episodes (published_epoch DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episodes_podcast ON episodes (podcast_id, published_epoch DESC, id DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episodes_podcast_url ON episodes (podcast_url)")
+
+def _backfill_episode_ordering_columns(conn):
+    """
+    Fills published_epoch and podcast_id for episodes stored before those columns existed.
+
+    Rows are walked by id in batches that each commit on their own, so the backfill
+    never holds the write lock for long and resumes where it left off if interrupted.
+    """
+    conn.commit() # Release the migration transaction; each batch takes its own
+    last_id = 0
+    backfilled = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, published_date FROM episodes
+            WHERE id > ? AND (published_epoch IS NULL OR podcast_id IS NULL)
+            ORDER BY id LIMIT ?
+        """, (last_id, BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        with transaction():
+            conn.executemany("""
+                UPDATE episodes SET
+                    published_epoch = COALESCE(published_epoch, ?),
+                    podcast_id = COALESCE(podcast_id, (SELECT id FROM podcast_configs WHERE rss_feed_url = episodes.podcast_url))
+                WHERE id = ?
+            """, [(parse_published_epoch(row['published_date']), row['id']) for row in rows])
+        last_id = rows[-1]['id']
+        backfilled += len(rows)
+    logger.info(f"Backfilled publish times and podcast ids for {backfilled} episodes.")
+    conn.execute("BEGIN IMMEDIATE") # Hand a transaction back for the version bump
+
+def _fill_unknown_publish_times(conn):
+    """
+    Gives episodes with an unparseable published date their processing time instead
+    (or the epoch if that is missing too), so every episode has a position in listings.
+    """
+    conn.execute("""
+        UPDATE episodes SET published_epoch = COALESCE(CAST(strftime('%s', processed_timestamp) AS INTEGER), 0)
+        WHERE published_epoch IS NULL
+    """)
+
+def _create_search_index(conn):
+    """
+    Adds transcript segments and FTS5 full-text indexes over episode titles, summaries and
+    transcript segments. The indexes are external-content tables kept in step by triggers,
+    so every insert, re-summarization and delete updates them incrementally.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS transcript_segments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            episode_id INTEGER NOT NULL REFERENCES episodes (id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            UNIQUE (episode_id, position)
+        )
+    """)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS episodes_fts USING fts5(
+            title, summary_text, content='episodes', content_rowid='id', tokenize='{SEARCH_TOKENIZER}'
+        )
+    """)
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+            text, content='transcript_segments', content_rowid='id', tokenize='{SEARCH_TOKENIZER}'
+        )
+    """)
+    for statement in (
+        """CREATE TRIGGER IF NOT EXISTS episodes_fts_insert AFTER INSERT ON episodes BEGIN
+            INSERT INTO episodes_fts (rowid, title, summary_text) VALUES (new.id, new.title, new.summary_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS episodes_fts_delete AFTER DELETE ON episodes BEGIN
+            INSERT INTO episodes_fts (episodes_fts, rowid, title, summary_text) VALUES ('delete', old.id, old.title, old.summary_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS episodes_fts_update AFTER UPDATE OF title, summary_text ON episodes BEGIN
+            INSERT INTO episodes_fts (episodes_fts, rowid, title, summary_text) VALUES ('delete', old.id, old.title, old.summary_text);
+            INSERT INTO episodes_fts (rowid, title, summary_text) VALUES (new.id, new.title, new.summary_text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS segments_fts_insert AFTER INSERT ON transcript_segments BEGIN
+            INSERT INTO segments_fts (rowid, text) VALUES (new.id, new.text);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS segments_fts_delete AFTER DELETE ON transcript_segments BEGIN
+            INSERT INTO segments_fts (segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        END""",
+    ):
+        conn.execute(statement)
+    # Index the episodes stored so far; their transcripts are indexed by rebuild_search_index.py
+    conn.execute("INSERT INTO episodes_fts (episodes_fts) VALUES ('rebuild')")
+
+def _create_artifact_store(conn):
+    """
+    Adds the compressed, content-addressed artifact store. Artifact bodies live in their
+    own table, so no episode query reads them; episode_artifacts maps episodes to them.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS artifacts (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            stored_size INTEGER NOT NULL,
+            body BLOB NOT NULL,
+            created_timestamp TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS episode_artifacts (
+            episode_id INTEGER NOT NULL REFERENCES episodes (id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            artifact_hash TEXT NOT NULL REFERENCES artifacts (hash),
+            PRIMARY KEY (episode_id, kind)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episode_artifacts_hash ON episode_artifacts (artifact_hash)")
+
+def _import_transcript_files(conn):
+    """
+    Imports the transcript file of every episode into the artifact store, deduplicating
+    identical transcripts. Episodes are walked by id in batches, each in its own short
+    transaction; missing files are skipped and can be imported later by rebuild_search_index.py.
+    """
+    conn.commit() # Release the migration transaction; each batch takes its own
+    last_id = 0
+    imported = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, transcription_filepath FROM episodes
+            WHERE id > ? AND transcription_filepath IS NOT NULL
+            ORDER BY id LIMIT ?
+        """, (last_id, BACKFILL_BATCH_SIZE)).fetchall()
+        if not rows:
+            break
+        transcripts = [(row['id'], _read_text_file(row['transcription_filepath'])) for row in rows]
+        with transaction():
+            for episode_id, transcript_text in transcripts:
+                if transcript_text is not None:
+                    _attach_artifact(conn, episode_id, TRANSCRIPT_ARTIFACT, transcript_text)
+                    imported += 1
+        last_id = rows[-1]['id']
+    logger.info(f"Imported {imported} transcript files into the artifact store.")
+    conn.execute("BEGIN IMMEDIATE") # Hand a transaction back for the version bump
+
+def _create_pipeline_jobs(conn):
+    """
+    Adds pipeline_jobs, which tracks each episode through the processing stages so a
+    crash or failure part-way through resumes from the last completed stage.
+    """
+    stage_columns = ",\n".join(f"            {stage}_timestamp TEXT" for stage in PIPELINE_STAGES)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS pipeline_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            episode_url TEXT NOT NULL UNIQUE,
+            podcast_id INTEGER REFERENCES podcast_configs (id) ON DELETE SET NULL,
+            podcast_name TEXT,
+            rss_feed_url TEXT,
+            title TEXT,
+            published_date TEXT,
+            stage TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            next_attempt_at TEXT NOT NULL,
+            audio_filepath TEXT,
+            transcription_filepath TEXT,
+            summary_text TEXT,
+{stage_columns}
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_due ON pipeline_jobs (status, stage, next_attempt_at)")
+
+def _add_pipeline_leases(conn):
+    """
+    Adds leases, so several worker processes can share the pipeline: each job records
+    which worker holds it and until when, and the leases table coordinates periodic tasks.
+    """
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(pipeline_jobs)")]
+    if 'lease_owner' not in columns:
+        conn.execute("ALTER TABLE pipeline_jobs ADD COLUMN lease_owner TEXT")
+    if 'lease_expires_at' not in columns:
+        conn.execute("ALTER TABLE pipeline_jobs ADD COLUMN lease_expires_at TEXT")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at TEXT NOT NULL
+        )
+    """)
+
+def _add_data_version(conn):
+    """
+    Adds a data version counter that triggers bump on every change to VERSIONED_TABLES.
+    Being kept in the database, it catches writes from every process, so in-process read
+    caches can tell when their results are stale.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_data_version AFTER {event} ON {table} BEGIN
+                    UPDATE data_version SET version = version + 1 WHERE id = 1;
+                END
+            """)
+
+def _create_retention_tables(conn):
+    """
+    Adds per-feed retention rules, a record of archived episodes (so they aren't
+    processed again once they leave the episodes table), and a log of retention runs.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS retention_rules (
+            podcast_id INTEGER NOT NULL REFERENCES podcast_configs (id) ON DELETE CASCADE,
+            kind TEXT NOT NULL,
+            keep_days INTEGER,
+            PRIMARY KEY (podcast_id, kind)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archived_episodes (
+            episode_url TEXT PRIMARY KEY,
+            podcast_id INTEGER,
+            archived_timestamp TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS retention_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_timestamp TEXT NOT NULL,
+            duration_seconds REAL NOT NULL,
+            audio_files_deleted INTEGER NOT NULL,
+            transcripts_deleted INTEGER NOT NULL,
+            episodes_archived INTEGER NOT NULL,
+            file_bytes_reclaimed INTEGER NOT NULL,
+            database_bytes_reclaimed INTEGER NOT NULL
+        )
+    """)
+
+def _create_episode_tasks(conn):
+    """
+    Adds episode_tasks, the queue of background re-summarize and re-transcribe jobs.
+    A partial unique index allows only one active task per episode.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS episode_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            episode_id INTEGER NOT NULL REFERENCES episodes (id) ON DELETE CASCADE,
+            action TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            error TEXT,
+            created_timestamp TEXT NOT NULL,
+            started_timestamp TEXT,
+            finished_timestamp TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_episode_tasks_active ON episode_tasks (episode_id)
+        WHERE status IN ('queued', 'running')
+    """)
+
+def _add_data_version_timestamps(conn):
+    """
+    Records when the data version last changed, for HTTP Last-Modified headers, and
+    versions summary variants and transcript segments too, as the web pages show them.
+    """
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(data_version)")]
+    if 'modified_epoch' not in columns:
+        conn.execute("ALTER TABLE data_version ADD COLUMN modified_epoch INTEGER")
+    conn.execute("UPDATE data_version SET modified_epoch = CAST(strftime('%s', 'now') AS INTEGER)")
+    for table in VERSIONED_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {table}_{event.lower()}_data_version")
+            conn.execute(f"""
+                CREATE TRIGGER {table}_{event.lower()}_data_version AFTER {event} ON {table} BEGIN
+                    UPDATE data_version SET version = version + 1, modified_epoch = CAST(strftime('%s', 'now') AS INTEGER)
+                    WHERE id = 1;
+                END
+            """)
+
+def _add_rendered_summaries(conn):
+    """
+    Adds columns for summaries' sanitized HTML and the renderer version that produced it,
+    to episodes, summary variants and queued emails. Existing summaries are rendered when
+    first read, rather than all at once here.
+    """
+    for table, columns in (
+        ("episodes", ("summary_html TEXT", "summary_html_version INTEGER")),
+        ("summary_variants", ("summary_html TEXT", "summary_html_version INTEGER")),
+        ("outbox", ("summary_html TEXT",)),
+    ):
+        existing = [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+        for column in columns:
+            if column.split()[0] not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+def _create_pipeline_metrics(conn):
+    """
+    Adds the tables behind the status page: a log of each pipeline stage run (its worker,
+    duration and any error), and each feed's last poll. Partial indexes keep in-flight
+    jobs and recent failures quick to find however many jobs have completed.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_stage_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER,
+            stage TEXT NOT NULL,
+            worker_id TEXT,
+            finished_epoch INTEGER NOT NULL,
+            duration_seconds REAL NOT NULL,
+            error TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_runs_finished ON pipeline_stage_runs (stage, finished_epoch)")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_stage_runs_failed ON pipeline_stage_runs (finished_epoch)
+        WHERE error IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_leased ON pipeline_jobs (stage)
+        WHERE lease_owner IS NOT NULL
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS feed_polls (
+            podcast_id INTEGER PRIMARY KEY REFERENCES podcast_configs (id) ON DELETE CASCADE,
+            last_polled_timestamp TEXT NOT NULL,
+            last_success_timestamp TEXT,
+            last_error TEXT
+        )
+    """)
+
+def _add_segment_times(conn):
+    """
+    Adds when each transcript segment starts and ends in the audio, so the transcript
+    viewer can jump to a timestamp. Transcripts indexed before have no times.
+    """
+    columns = [row['name'] for row in conn.execute("PRAGMA table_info(transcript_segments)")]
+    for column in ("start_seconds", "end_seconds"):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE transcript_segments ADD COLUMN {column} REAL")
+
+def _randomize_data_version(conn):
+    """
+    Moves the data version to a random value, so a database that replaces another (say,
+    one restored from a backup) doesn't reuse versions whose results are still cached.
+    """
+    conn.execute("UPDATE data_version SET version = ? WHERE id = 1", (secrets.randbits(48),))
+
+def _cover_episode_listings(conn):
+    """
+    Rebuilds the episode ordering indexes to include the rest of EPISODE_LIST_COLUMNS, so
+    a listing page is read from the index alone, without looking up each row's table page.
+    """
+    conn.execute("DROP INDEX IF EXISTS idx_episodes_published")
+    conn.execute("DROP INDEX IF EXISTS idx_episodes_podcast")
+    conn.execute("""
+        CREATE INDEX idx_episodes_published
+        ON episodes (published_epoch DESC, id DESC, podcast_id, podcast_url, title, published_date)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_episodes_podcast
+        ON episodes (podcast_id, published_epoch DESC, id DESC, podcast_url, title, published_date)
+    """)
+
+# Schema migrations, applied in order. PRAGMA user_version records how many have been
+# applied, so each runs once per database. Append new migrations; never edit or reorder them.
+MIGRATIONS = [
+    _add_episode_ordering_columns,
+    _backfill_episode_ordering_columns,
+    _fill_unknown_publish_times,
+    _create_search_index,
+    _create_artifact_store,
+    _import_transcript_files,
+    _create_pipeline_jobs,
+    _add_pipeline_leases,
+    _add_data_version,
+    _create_retention_tables,
+    _create_episode_tasks,
+    _add_data_version_timestamps,
+    _add_rendered_summaries,
+    _create_pipeline_metrics,
+    _add_segment_times,
+    _randomize_data_version,
+    _cover_episode_listings,
+]
+
+def get_schema_version():
+    """Returns the number of schema migrations applied to the database."""
+    return connect_db().execute("PRAGMA user_version").fetchone()[0]
+
+def run_migrations():
+    """
+    Applies any schema migrations the database has not had yet.
+
+    Each migration commits together with its user_version bump, so a failed migration
+    leaves the schema at the previous version and is retried on the next startup.
+    """
+    try:
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            with transaction() as conn:
+                # Checked under the write lock in case another process has just migrated
+                if conn.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                logger.info(f"Applying schema migration {version}: {migration.__name__}")
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {version}")
+    except sqlite3.Error as e:
+        logger.error(f"Error applying schema migrations: {e}")
+
+def rerender_stale_summaries():
+    """
+    Renders and saves the HTML of summaries and summary variants stored before summaries
+    were rendered, or by an older SUMMARY_RENDERER_VERSION. It runs at startup, after the
+    migrations, so reads never have to write rendered HTML back.
+
+    Rows are walked by id in batches that each commit on their own, like the migrations'
+    backfills.
+
+    Returns:
+        int: The number of summaries and variants rendered.
+    """
+    rendered = 0
+    try:
+        conn = connect_db()
+        for table in ("episodes", "summary_variants"):
+            last_id = 0
+            while True:
+                rows = conn.execute(f"""
+                    SELECT id, summary_text FROM {table}
+                    WHERE id > ? AND (summary_html IS NULL OR summary_html_version IS NOT ?)
+                    ORDER BY id LIMIT ?
+                """, (last_id, SUMMARY_RENDERER_VERSION, BACKFILL_BATCH_SIZE)).fetchall()
+                if not rows:
+                    break
+                with transaction():
+                    conn.executemany(f"""
+                        UPDATE {table} SET summary_html = ?, summary_html_version = ? WHERE id = ? AND summary_text IS ?
+                    """, [(render_summary_html(row['summary_text']), SUMMARY_RENDERER_VERSION, row['id'], row['summary_text'])
+                          for row in rows])
+                last_id = rows[-1]['id']
+                rendered += len(rows)
+    except sqlite3.Error as e:
+        logger.error(f"Error re-rendering stored summaries: {e}")
+    if rendered:
+        logger.info(f"Rendered {rendered} summaries stored by an older renderer.")
+    return rendered
 
 def add_episode(episode_data):
     """
     Adds a new episode record to the database.
     episode_data is a dictionary containing episode details.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
+    # Episodes without a usable date are listed as of when they were processed
+    published_epoch = parse_published_epoch(episode_data.get('published_date'))
+    if published_epoch is None:
+        published_epoch = int(datetime.now(timezone.utc).timestamp())
+    try:
+        with transaction() as conn:
+            conn.execute("""
                 INSERT INTO episodes (
-                    podcast_url, episode_url, title, published_date,
-                    audio_filepath, transcription_filepath, summary_filepath, summary_text, processed_timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    podcast_url, episode_url, title, published_date, published_epoch, podcast_id,
+                    audio_filepath, transcription_filepath, summary_filepath, summary_text, processed_timestamp,
+                    summary_html, summary_html_version
+                ) VALUES (?, ?, ?, ?, ?, (SELECT id FROM podcast_configs WHERE rss_feed_url = ?), ?, ?, ?, ?, ?, ?, ?)
             """, (
                 episode_data.get('podcast_url'),
                 episode_data.get('episode_url'),
                 episode_data.get('title'),
                 episode_data.get('published_date'),
+                published_epoch,
+                episode_data.get('podcast_url'),
                 episode_data.get('audio_filepath'),
                 episode_data.get('transcription_filepath'),
                 episode_data.get('summary_filepath'),
                 episode_data.get('summary_text'),
-                datetime.now().isoformat()
+                datetime.now().isoformat(),
+                render_summary_html(episode_data.get('summary_text')),
+                SUMMARY_RENDERER_VERSION
             ))
-            conn.commit()
-            logger.info(f"Added episode '{episode_data.get('title')}' to database.")
-            return True
-        except sqlite3.IntegrityError:
-            logger.warning(f"Episode '{episode_data.get('title')}' (URL: {episode_data.get('episode_url')}) already exists in database. Skipping.")
-            return False
-        except sqlite3.Error as e:
-            logger.error(f"Error adding episode to database: {e}")
-            return False
-        finally:
-            conn.close()
+        logger.info(f"Added episode '{episode_data.get('title')}' to database.")
+        return True
+    except sqlite3.IntegrityError:
+        logger.warning(f"Episode '{episode_data.get('title')}' (URL: {episode_data.get('episode_url')}) already exists in database. Skipping.")
+        return False
+    except sqlite3.Error as e:
+        logger.error(f"Error adding episode to database: {e}")
+        return False
+
+def add_podcast_configs(configs):
+    """
+    Adds many podcast configurations in one transaction, skipping feeds already configured.
+    configs is a list of dicts with name, rss_feed_url and optionally recipient_email.
+
+    Returns:
+        int: The number of configurations added, or None on error.
+    """
+    try:
+        with transaction() as conn:
+            cursor = conn.executemany("""
+                INSERT OR IGNORE INTO podcast_configs (name, rss_feed_url, recipient_email) VALUES (?, ?, ?)
+            """, [(c['name'], c['rss_feed_url'], c.get('recipient_email')) for c in configs])
+            added = cursor.rowcount
+        logger.info(f"Added {added} podcast configs.")
+        return added
+    except sqlite3.Error as e:
+        logger.error(f"Error adding podcast configs: {e}")
+        return None
+
+def add_episodes(episodes):
+    """
+    Adds many episode records in one transaction, skipping episodes already stored.
+
+    Each dict has the same keys as for add_episode, plus an optional "transcript": an
+    artifact from prepare_artifact(), which is stored and indexed for search alongside it.
+
+    Returns:
+        int: The number of episodes added, or None on error (in which case none are).
+    """
+    episodes = list({episode.get('episode_url'): episode for episode in episodes}.values())
+    if not episodes:
+        return 0
+    now = datetime.now()
+    rows = []
+    for episode in episodes:
+        published_epoch = parse_published_epoch(episode.get('published_date'))
+        rows.append((
+            episode.get('podcast_url'), episode.get('episode_url'), episode.get('title'), episode.get('published_date'),
+            published_epoch if published_epoch is not None else int(now.timestamp()), episode.get('podcast_url'),
+            episode.get('audio_filepath'), episode.get('transcription_filepath'), episode.get('summary_filepath'),
+            episode.get('summary_text'), now.isoformat(), render_summary_html(episode.get('summary_text')),
+            SUMMARY_RENDERER_VERSION
+        ))
+    try:
+        with transaction() as conn:
+            urls = [episode.get('episode_url') for episode in episodes]
+            placeholders = ", ".join("?" * len(urls))
+            existing = {row[0] for row in conn.execute(f"SELECT episode_url FROM episodes WHERE episode_url IN ({placeholders})", urls)}
+            conn.executemany("""
+                INSERT OR IGNORE INTO episodes (
+                    podcast_url, episode_url, title, published_date, published_epoch, podcast_id,
+                    audio_filepath, transcription_filepath, summary_filepath, summary_text, processed_timestamp,
+                    summary_html, summary_html_version
+                ) VALUES (?, ?, ?, ?, ?, (SELECT id FROM podcast_configs WHERE rss_feed_url = ?), ?, ?, ?, ?, ?, ?, ?)
+            """, [row for row in rows if row[1] not in existing])
+            ids = {row['episode_url']: row['id'] for row in conn.execute(
+                f"SELECT id, episode_url FROM episodes WHERE episode_url IN ({placeholders})", urls)}
+
+            transcripts = [(ids[e['episode_url']], e['transcript']) for e in episodes
+                           if e.get('transcript') and e['episode_url'] not in existing]
+            conn.executemany("""
+                INSERT OR IGNORE INTO artifacts (hash, codec, size, stored_size, body, created_timestamp) VALUES (?, ?, ?, ?, ?, ?)
+            """, [(t['hash'], t['codec'], t['size'], t['stored_size'], t['body'], now.isoformat()) for _, t in transcripts])
+            conn.executemany("INSERT INTO episode_artifacts (episode_id, kind, artifact_hash) VALUES (?, ?, ?)",
+                             [(episode_id, TRANSCRIPT_ARTIFACT, t['hash']) for episode_id, t in transcripts])
+            conn.executemany(
+                "INSERT INTO transcript_segments (episode_id, position, text) VALUES (?, ?, ?)",
+                [(episode_id, position, text) for episode_id, t in transcripts
+                 for position, text in enumerate(split_transcript_segments(t['text']))]
+            )
+        added = len(set(urls) - existing)
+        logger.info(f"Added {added} episodes to database.")
+        return added
+    except sqlite3.Error as e:
+        logger.error(f"Error adding episodes to database: {e}")
+        return None
 
 def get_episode_by_url(episode_url):
     """
     Retrieves an episode record by its episode URL.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM episodes WHERE episode_url = ?", (episode_url,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving episode by URL {episode_url}: {e}")
-            return None
-        finally:
-            conn.close()
+    try:
+        row = connect_db().execute("SELECT * FROM episodes WHERE episode_url = ?", (episode_url,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving episode by URL {episode_url}: {e}")
+        return None
 
 def episode_exists(episode_url):
     """
     Checks if an episode with the given URL already exists in the database.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 FROM episodes WHERE episode_url = ?", (episode_url,))
-            return cursor.fetchone() is not None
-        except sqlite3.Error as e:
-            logger.error(f"Error checking if episode exists for URL {episode_url}: {e}")
-            return False
-        finally:
-            conn.close()
+    try:
+        return connect_db().execute("""
+            SELECT 1 FROM episodes WHERE episode_url = ?
+            UNION ALL SELECT 1 FROM archived_episodes WHERE episode_url = ?
+        """, (episode_url, episode_url)).fetchone() is not None
+    except sqlite3.Error as e:
+        logger.error(f"Error checking if episode exists for URL {episode_url}: {e}")
+        return False
 
-def get_all_episodes():
-    """
-    Retrieves all episode records from the database, ordered by published date descending.
-    """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM episodes ORDER BY published_date DESC")
-            return [dict(row) for row in cursor.fetchall()]
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving all episodes: {e}")
-            return []
-        finally:
-            conn.close()
+def encode_episode_cursor(episode):
+    """Encodes an episode's position in listings as an opaque page cursor."""
+    return f"{episode['published_epoch']}:{episode['id']}"
 
-def get_episode_by_id(episode_id):
+def decode_episode_cursor(cursor):
     """
-    Retrieves an episode record by its ID.
+    Decodes a page cursor made by encode_episode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM episodes WHERE id = ?", (episode_id,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving episode by ID {episode_id}: {e}")
-            return None
-        finally:
-            conn.close()
+    published_epoch, _, episode_id = cursor.partition(":")
+    return int(published_epoch), int(episode_id)
 
-def add_podcast_config(name, rss_feed_url, recipient_email=None):
+@cached_read
+def list_episodes(podcast_id=None, after=None, before=None, limit=None, columns=None):
     """
-    Adds a new podcast configuration to the database.
+    Retrieves one page of episodes, newest first, with only the columns needed for listings.
+
+    Pages are found by keyset rather than OFFSET: the cursor is the (published_epoch, id)
+    position of the page boundary, so each page is an index range scan no matter how deep.
+
+    Args:
+        podcast_id (int): Only list episodes of this podcast, if given.
+        after (str): Cursor of the last episode on the previous page; lists older episodes.
+        before (str): Cursor of the first episode on the next page; lists newer episodes.
+        limit (int): The maximum number of episodes on the page (default EPISODE_PAGE_SIZE).
+        columns (tuple): The EPISODE_COLUMNS to load (default EPISODE_LIST_COLUMNS). The
+            cursor columns, id and published_epoch, are always loaded.
+
+    Returns:
+        dict: "episodes" (list of dicts), plus "next_cursor" and "prev_cursor" for the
+            neighbouring pages, each None if there is no such page.
+
+    Raises:
+        ValueError: If a cursor is malformed or a column unknown.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO podcast_configs (name, rss_feed_url, recipient_email) VALUES (?, ?, ?)
-            """, (name, rss_feed_url, recipient_email))
-            conn.commit()
-            logger.info(f"Added podcast config: {name} - {rss_feed_url}")
-            return True
-        except sqlite3.IntegrityError:
-            logger.warning(f"Podcast config '{name}' (URL: {rss_feed_url}) already exists in database. Skipping.")
-            return False
-        except sqlite3.Error as e:
-            logger.error(f"Error adding podcast config: {e}")
-            return False
-        finally:
-            conn.close()
+    limit = limit or EPISODE_PAGE_SIZE
+    if columns:
+        unknown = set(columns) - set(EPISODE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown episode columns: {', '.join(sorted(unknown))}")
+        select = ", ".join(dict.fromkeys(("id", "published_epoch") + tuple(columns)))
+    else:
+        select = EPISODE_LIST_COLUMNS
+    conditions, params = [], []
+    if podcast_id is not None:
+        conditions.append("podcast_id = ?")
+        params.append(podcast_id)
+    if before:
+        conditions.append("(published_epoch, id) > (?, ?)")
+        params.extend(decode_episode_cursor(before))
+        order = "ASC"
+    else:
+        if after:
+            conditions.append("(published_epoch, id) < (?, ?)")
+            params.extend(decode_episode_cursor(after))
+        order = "DESC"
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
 
-def get_all_podcast_configs():
+    try:
+        # Fetch one extra row to learn whether there is a further page
+        rows = connect_db().execute(f"""
+            SELECT {select} FROM episodes {where}
+            ORDER BY published_epoch {order}, id {order} LIMIT ?
+        """, params + [limit + 1]).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error listing episodes: {e}")
+        return {"episodes": [], "next_cursor": None, "prev_cursor": None}
+
+    episodes = [dict(row) for row in rows[:limit]]
+    has_more = len(rows) > limit
+    if before:
+        episodes.reverse()
+        has_newer, has_older = has_more, True
+    else:
+        has_newer, has_older = bool(after), has_more
+    return {
+        "episodes": episodes,
+        "next_cursor": encode_episode_cursor(episodes[-1]) if episodes and has_older else None,
+        "prev_cursor": encode_episode_cursor(episodes[0]) if episodes and has_newer else None,
+    }
+
+def _compress(text):
+    """Compresses text for the artifact store, returning (codec, blob)."""
+    return ARTIFACT_CODEC, zlib.compress(text.encode('utf-8'), ARTIFACT_COMPRESSION_LEVEL)
+
+def _decompress(codec, body):
+    """Reverses _compress."""
+    if codec != "zlib":
+        raise ValueError(f"Unknown artifact codec: {codec}")
+    return zlib.decompress(body).decode('utf-8')
+
+def _store_artifact(conn, text):
     """
-    Retrieves all podcast configurations from the database.
+    Stores text in the artifact store within the caller's transaction, returning its
+    content hash. Identical content is stored once, however many episodes refer to it.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM podcast_configs")
-            return [dict(row) for row in cursor.fetchall()]
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving all podcast configs: {e}")
-            return []
-        finally:
-            conn.close()
+    content_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    if conn.execute("SELECT 1 FROM artifacts WHERE hash = ?", (content_hash,)).fetchone() is None:
+        codec, body = _compress(text)
+        conn.execute("""
+            INSERT INTO artifacts (hash, codec, size, stored_size, body, created_timestamp) VALUES (?, ?, ?, ?, ?, ?)
+        """, (content_hash, codec, len(text.encode('utf-8')), len(body), body, datetime.now().isoformat()))
+    return content_hash
 
-def delete_podcast_config(podcast_id):
+def prepare_artifact(text):
     """
-    Deletes a podcast configuration from the database by its ID.
+    Hashes and compresses text ahead of storing it, e.g. on a worker thread during a
+    bulk import. zlib releases the GIL, so several threads compress in parallel.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM podcast_configs WHERE id = ?", (podcast_id,))
-            conn.commit()
-            logger.info(f"Deleted podcast config with ID: {podcast_id}")
-            return True
-        except sqlite3.Error as e:
-            logger.error(f"Error deleting podcast config: {e}")
-            return False
-        finally:
-            conn.close()
+    codec, body = _compress(text)
+    return {
+        "hash": hashlib.sha256(text.encode('utf-8')).hexdigest(),
+        "codec": codec,
+        "size": len(text.encode('utf-8')),
+        "stored_size": len(body),
+        "body": body,
+        "text": text,
+    }
+
+def _attach_artifact(conn, episode_id, kind, text):
+    """Stores text as the episode's artifact of the given kind, replacing any previous one."""
+    content_hash = _store_artifact(conn, text)
+    conn.execute("""
+        INSERT INTO episode_artifacts (episode_id, kind, artifact_hash) VALUES (?, ?, ?)
+        ON CONFLICT (episode_id, kind) DO UPDATE SET artifact_hash = excluded.artifact_hash
+    """, (episode_id, kind, content_hash))
+    return content_hash
+
+def get_episode_artifact(episode_id, kind):
+    """
+    Loads and decompresses one artifact of an episode, e.g. its transcript.
+    Artifact bodies are only ever read here, never by episode queries.
+
+    Returns:
+        str: The artifact's text, or None if the episode has no artifact of that kind.
+    """
+    try:
+        row = connect_db().execute("""
+            SELECT artifacts.codec, artifacts.body FROM episode_artifacts
+            JOIN artifacts ON artifacts.hash = episode_artifacts.artifact_hash
+            WHERE episode_artifacts.episode_id = ? AND episode_artifacts.kind = ?
+        """, (episode_id, kind)).fetchone()
+        return _decompress(row['codec'], row['body']) if row else None
+    except (sqlite3.Error, zlib.error, ValueError) as e:
+        logger.error(f"Error loading {kind} artifact for episode {episode_id}: {e}")
+        return None
+
+def get_episode_artifact_info(episode_id):
+    """Returns the hash and original/stored sizes of each artifact of an episode, without reading bodies."""
+    try:
+        rows = connect_db().execute("""
+            SELECT episode_artifacts.kind, artifacts.hash, artifacts.codec, artifacts.size, artifacts.stored_size
+            FROM episode_artifacts JOIN artifacts ON artifacts.hash = episode_artifacts.artifact_hash
+            WHERE episode_artifacts.episode_id = ?
+        """, (episode_id,)).fetchall()
+        return {row['kind']: dict(row) for row in rows}
+    except sqlite3.Error as e:
+        logger.error(f"Error loading artifact info for episode {episode_id}: {e}")
+        return {}
+
+def get_transcript(episode_id):
+    """
+    Returns an episode's transcript from the artifact store, falling back to its
+    transcription file for episodes whose transcript has not been stored yet.
+    """
+    transcript_text = get_episode_artifact(episode_id, TRANSCRIPT_ARTIFACT)
+    if transcript_text is not None:
+        return transcript_text
+    row = connect_db().execute("SELECT transcription_filepath FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+    if row is None or not row['transcription_filepath']:
+        return None
+    return _read_text_file(row['transcription_filepath'])
+
+def delete_unreferenced_artifacts():
+    """Deletes artifacts no episode refers to any more, returning how many were deleted."""
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                DELETE FROM artifacts WHERE NOT EXISTS (
+                    SELECT 1 FROM episode_artifacts WHERE episode_artifacts.artifact_hash = artifacts.hash
+                )
+            """)
+        logger.info(f"Deleted {cursor.rowcount} unreferenced artifacts.")
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Error deleting unreferenced artifacts: {e}")
+        return 0
+
+def split_transcript_segments(transcript_text, segment_words=None):
+    """Splits a transcript into consecutive segments of at most segment_words (default SEGMENT_WORDS) words."""
+    segment_words = segment_words or SEGMENT_WORDS
+    words = transcript_text.split()
+    return [" ".join(words[i:i + segment_words]) for i in range(0, len(words), segment_words)]
+
+def split_timed_transcript_segments(timings, segment_words=None):
+    """
+    Groups a transcriber's timed stretches of text into segments of about segment_words
+    (default SEGMENT_WORDS) words, never splitting a stretch.
+
+    Returns:
+        list: (text, start_seconds, end_seconds) tuples.
+    """
+    segment_words = segment_words or SEGMENT_WORDS
+    segments, words, start = [], [], None
+    for timing in timings:
+        if start is None:
+            start = timing['start']
+        words.extend(timing['text'].split())
+        if len(words) >= segment_words:
+            segments.append((" ".join(words), start, timing['end']))
+            words, start = [], None
+    if words:
+        segments.append((" ".join(words), start, timings[-1]['end']))
+    return segments
+
+def transcript_timings_filepath(transcription_filepath):
+    """Returns where the transcriber saves a transcript's timings, next to its text."""
+    return os.path.splitext(transcription_filepath)[0] + ".timings.json"
+
+def _read_timings(timings_json, source):
+    """Parses transcript timings, or returns None (with a warning) if they are malformed."""
+    try:
+        timings = json.loads(timings_json)
+        if all({'start', 'end', 'text'} <= set(timing) for timing in timings):
+            return timings
+    except (ValueError, TypeError):
+        pass
+    logger.warning(f"Ignoring malformed transcript timings from {source}")
+    return None
+
+def get_transcript_timings(episode_id):
+    """
+    Returns an episode's transcript timings from the artifact store, or from the file
+    next to its transcription, or None if the transcript was made without them.
+    """
+    timings_json = get_episode_artifact(episode_id, TIMINGS_ARTIFACT)
+    if timings_json is not None:
+        return _read_timings(timings_json, f"episode {episode_id}")
+    row = connect_db().execute("SELECT transcription_filepath FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+    if row is None or not row['transcription_filepath']:
+        return None
+    timings_filepath = transcript_timings_filepath(row['transcription_filepath'])
+    if not os.path.exists(timings_filepath):
+        return None
+    timings_json = _read_text_file(timings_filepath)
+    return _read_timings(timings_json, timings_filepath) if timings_json is not None else None
+
+def _read_text_file(filepath):
+    """Returns the contents of a UTF-8 text file, or None (with a warning) if it can't be read."""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, TypeError) as e:
+        logger.warning(f"Could not read {filepath}: {e}")
+        return None
+
+def _index_transcript_text(conn, episode_id, transcript_text, timings=None):
+    """
+    Stores a transcript (and its timings, if any) in the artifact store and as searchable
+    segments, within the caller's transaction. Segments are timed if timings are given.
+    """
+    _attach_artifact(conn, episode_id, TRANSCRIPT_ARTIFACT, transcript_text)
+    if timings:
+        _attach_artifact(conn, episode_id, TIMINGS_ARTIFACT, json.dumps(timings))
+        segments = split_timed_transcript_segments(timings)
+    else:
+        conn.execute("DELETE FROM episode_artifacts WHERE episode_id = ? AND kind = ?", (episode_id, TIMINGS_ARTIFACT))
+        segments = [(text, None, None) for text in split_transcript_segments(transcript_text)]
+    conn.execute("DELETE FROM transcript_segments WHERE episode_id = ?", (episode_id,))
+    conn.executemany(
+        "INSERT INTO transcript_segments (episode_id, position, text, start_seconds, end_seconds) VALUES (?, ?, ?, ?, ?)",
+        [(episode_id, position, *segment) for position, segment in enumerate(segments)]
+    )
+
+def index_transcript(episode_url, transcription_filepath):
+    """
+    Stores an episode's transcript, compressed, and as searchable segments, replacing any
+    stored before. Timings the transcriber saved alongside it are stored too.
+
+    Returns:
+        bool: True if the transcript was indexed, False if the episode or file is missing.
+    """
+    transcript_text = _read_text_file(transcription_filepath)
+    if transcript_text is None:
+        return False
+    timings_filepath = transcript_timings_filepath(transcription_filepath)
+    timings = None
+    if os.path.exists(timings_filepath):
+        timings_json = _read_text_file(timings_filepath)
+        timings = _read_timings(timings_json, timings_filepath) if timings_json is not None else None
+
+    try:
+        with transaction() as conn:
+            row = conn.execute("SELECT id FROM episodes WHERE episode_url = ?", (episode_url,)).fetchone()
+            if row is None:
+                logger.warning(f"Cannot index transcript of unknown episode: {episode_url}")
+                return False
+            _index_transcript_text(conn, row['id'], transcript_text, timings)
+        logger.info(f"Indexed transcript for episode: {episode_url}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error indexing transcript for episode {episode_url}: {e}")
+        return False
+
+def get_transcript_segments(episode_id, start=None, before=None, limit=None, query=None):
+    """
+    Loads one page of an episode's transcript segments: limit (default
+    TRANSCRIPT_PAGE_SIZE) segments from position start onwards, or those just before
+    position before. Only that page is read, however long the transcript.
+
+    If a search query is given, each segment matching it gets a "highlighted" copy of its
+    text, with matched terms wrapped in SNIPPET_START and SNIPPET_END.
+
+    Returns:
+        dict: "segments" (dicts with position, text, start_seconds, end_seconds and
+            highlighted), "next_start" to pass as start for the following page and
+            "prev_before" to pass as before for the preceding one, each None at the end.
+    """
+    limit = limit or TRANSCRIPT_PAGE_SIZE
+    empty_page = {"segments": [], "next_start": None, "prev_before": None}
+    try:
+        conn = connect_db()
+        if before is not None:
+            rows = conn.execute("""
+                SELECT id, position, text, start_seconds, end_seconds FROM transcript_segments
+                WHERE episode_id = ? AND position < ? ORDER BY position DESC LIMIT ?
+            """, (episode_id, before, limit)).fetchall()[::-1]
+            has_next = True
+        else:
+            rows = conn.execute("""
+                SELECT id, position, text, start_seconds, end_seconds FROM transcript_segments
+                WHERE episode_id = ? AND position >= ? ORDER BY position LIMIT ?
+            """, (episode_id, start or 0, limit + 1)).fetchall()
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+        if not rows:
+            return empty_page
+        segments = {row['id']: dict(row, highlighted=None) for row in rows}
+
+        if query and query.split():
+            placeholders = ", ".join("?" * len(segments))
+            for row in conn.execute(f"""
+                SELECT rowid, highlight(segments_fts, 0, ?, ?) AS highlighted FROM segments_fts
+                WHERE segments_fts MATCH ? AND rowid IN ({placeholders})
+            """, (SNIPPET_START, SNIPPET_END, build_search_query(query), *segments)):
+                segments[row['rowid']]['highlighted'] = row['highlighted']
+    except sqlite3.Error as e:
+        logger.error(f"Error loading transcript segments of episode {episode_id}: {e}")
+        return empty_page
+
+    segments = list(segments.values())
+    for segment in segments:
+        del segment['id']
+    return {
+        "segments": segments,
+        "next_start": segments[-1]['position'] + 1 if has_next else None,
+        "prev_before": segments[0]['position'] if segments[0]['position'] > 0 else None,
+    }
+
+def find_transcript_position(episode_id, seconds):
+    """
+    Returns the position of the transcript segment being spoken at the given time, or
+    None if the episode's segments have no times.
+    """
+    try:
+        row = connect_db().execute("""
+            SELECT position FROM transcript_segments
+            WHERE episode_id = ? AND start_seconds <= ? ORDER BY position DESC LIMIT 1
+        """, (episode_id, seconds)).fetchone()
+        if row is not None:
+            return row['position']
+        # Before the first segment starts, if the transcript is timed at all
+        row = connect_db().execute("""
+            SELECT MIN(position) AS position FROM transcript_segments WHERE episode_id = ? AND start_seconds IS NOT NULL
+        """, (episode_id,)).fetchone()
+        return row['position']
+    except sqlite3.Error as e:
+        logger.error(f"Error finding {seconds}s into the transcript of episode {episode_id}: {e}")
+        return None
+
+def get_transcript_hits(episode_id, query, limit=None):
+    """
+    Finds the segments of an episode's transcript matching a search, in transcript order,
+    using the search index rather than reading the transcript.
+
+    Returns:
+        list: Dicts with the position and start_seconds of up to limit (default
+            TRANSCRIPT_HITS_LIMIT) matching segments.
+    """
+    if not query.split():
+        return []
+    try:
+        rows = connect_db().execute("""
+            SELECT s.position, s.start_seconds FROM segments_fts
+            JOIN transcript_segments s ON s.id = segments_fts.rowid
+            WHERE segments_fts MATCH ? AND s.episode_id = ?
+            ORDER BY s.position LIMIT ?
+        """, (build_search_query(query), episode_id, limit or TRANSCRIPT_HITS_LIMIT)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error searching transcript of episode {episode_id} for '{query}': {e}")
+        return []
+
+def rebuild_search_index():
+    """
+    Rebuilds the full-text search index from scratch: re-splits every episode's transcript
+    (from the artifact store, or its file if it has not been stored yet) into segments,
+    then regenerates both FTS indexes from their content tables.
+
+    Returns:
+        int: The number of episodes whose transcripts were indexed.
+    """
+    indexed = 0
+    last_id = 0
+    try:
+        while True:
+            # Walk episodes by id in batches, so each batch is indexed in a short transaction
+            rows = connect_db().execute(
+                "SELECT id, transcription_filepath FROM episodes WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, BACKFILL_BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                break
+            with transaction() as conn:
+                for row in rows:
+                    transcript_text = get_transcript(row['id'])
+                    if transcript_text is not None:
+                        _index_transcript_text(conn, row['id'], transcript_text, get_transcript_timings(row['id']))
+                        indexed += 1
+            last_id = rows[-1]['id']
+        with transaction() as conn:
+            conn.execute("INSERT INTO episodes_fts (episodes_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO segments_fts (segments_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO episodes_fts (episodes_fts) VALUES ('optimize')")
+            conn.execute("INSERT INTO segments_fts (segments_fts) VALUES ('optimize')")
+        logger.info(f"Rebuilt search index; indexed transcripts of {indexed} episodes.")
+    except sqlite3.Error as e:
+        logger.error(f"Error rebuilding search index: {e}")
+    return indexed
+
+def build_search_query(query):
+    """
+    Turns free text into an FTS5 query matching every word, quoting each so that
+    punctuation and FTS5 operators in user input cannot cause a syntax error.
+    """
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+def search_episodes(query, limit=None):
+    """
+    Searches episode titles, summaries and transcripts, best matches first.
+
+    Each episode appears once, with a snippet from its best-matching title, summary or
+    transcript segment. Matched terms in the snippet are wrapped in SNIPPET_START and
+    SNIPPET_END, leaving escaping and highlighting to the caller.
+
+    Returns:
+        list: Dicts with the episode's listing columns plus "snippet", "segment_position"
+            (None for a title or summary match) and "rank" (lower is better).
+    """
+    limit = limit or SEARCH_RESULTS_LIMIT
+    match = build_search_query(query)
+    if not match:
+        return []
+    try:
+        rows = connect_db().execute(f"""
+            SELECT * FROM (
+                SELECT e.id, e.podcast_id, e.podcast_url, e.title, e.published_date, e.published_epoch,
+                       snippet(episodes_fts, -1, :start, :end, '…', 24) AS snippet,
+                       NULL AS segment_position, bm25(episodes_fts, 10.0, 2.0) AS rank
+                FROM episodes_fts JOIN episodes e ON e.id = episodes_fts.rowid
+                WHERE episodes_fts MATCH :match
+                UNION ALL
+                SELECT e.id, e.podcast_id, e.podcast_url, e.title, e.published_date, e.published_epoch,
+                       snippet(segments_fts, 0, :start, :end, '…', 24) AS snippet,
+                       s.position AS segment_position, bm25(segments_fts) AS rank
+                FROM segments_fts
+                JOIN transcript_segments s ON s.id = segments_fts.rowid
+                JOIN episodes e ON e.id = s.episode_id
+                WHERE segments_fts MATCH :match
+            )
+            ORDER BY rank LIMIT :fetch
+        """, {"match": match, "start": SNIPPET_START, "end": SNIPPET_END, "fetch": limit * 5}).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error searching episodes for '{query}': {e}")
+        return []
+
+    results = {}
+    for row in rows:
+        if row['id'] not in results:
+            results[row['id']] = dict(row)
+    return list(results.values())[:limit]
+
+@cached_read
+def get_episode_by_id(episode_id):
+    """
+    Retrieves an episode record by its ID.
+    """
+    try:
+        row = connect_db().execute("SELECT * FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving episode by ID {episode_id}: {e}")
+        return None
+
+def update_episode_summary(episode_id, summary_text):
+    """
+    Replaces the stored summary of an episode, with its rendered HTML, and refreshes its
+    processed timestamp.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                UPDATE episodes SET summary_text = ?, summary_html = ?, summary_html_version = ?, processed_timestamp = ?
+                WHERE id = ?
+            """, (summary_text, render_summary_html(summary_text), SUMMARY_RENDERER_VERSION, datetime.now().isoformat(), episode_id))
+        logger.info(f"Updated summary for episode with ID: {episode_id}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error updating summary for episode with ID {episode_id}: {e}")
+        return False
+
+def save_summary_variant(episode_url, variant, summary_text):
+    """
+    Stores (or replaces) one summary variant of an episode, e.g. 'short' or 'long-paragraphs'.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO summary_variants (episode_url, variant, summary_text, summary_html, summary_html_version, created_timestamp)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (episode_url, variant) DO UPDATE SET
+                    summary_text = excluded.summary_text,
+                    summary_html = excluded.summary_html,
+                    summary_html_version = excluded.summary_html_version,
+                    created_timestamp = excluded.created_timestamp
+            """, (episode_url, variant, summary_text, render_summary_html(summary_text), SUMMARY_RENDERER_VERSION,
+                  datetime.now().isoformat()))
+        logger.info(f"Saved '{variant}' summary variant for episode {episode_url}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error saving summary variant '{variant}' for episode {episode_url}: {e}")
+        return False
+
+def replace_summary_variants(episode_url, variants):
+    """
+    Stores an episode's summary variants (a dict of variant -> summary text) in place of
+    all those stored before, e.g. after it is re-summarized.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("DELETE FROM summary_variants WHERE episode_url = ?", (episode_url,))
+            for variant, summary_text in variants.items():
+                if not save_summary_variant(episode_url, variant, summary_text):
+                    raise sqlite3.Error(f"Could not save '{variant}' summary variant")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error replacing summary variants for episode {episode_url}: {e}")
+        return False
+
+def get_summary_variants(episode_url):
+    """
+    Retrieves all stored summary variants for an episode as a dict of variant -> summary text.
+    """
+    try:
+        rows = connect_db().execute(
+            "SELECT variant, summary_text FROM summary_variants WHERE episode_url = ? ORDER BY variant", (episode_url,)
+        ).fetchall()
+        return {row['variant']: row['summary_text'] for row in rows}
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving summary variants for episode {episode_url}: {e}")
+        return {}
+
+def get_summary_html(episode):
+    """
+    Returns an episode's summary as sanitized HTML. The HTML is rendered when the summary
+    is stored, and re-rendered at startup by rerender_stale_summaries() for a new renderer
+    version. One still unrendered, e.g. stored meanwhile by a process running older code,
+    is rendered here but not saved, as a write would change the data version.
+    """
+    if episode.get('summary_html') is not None and episode.get('summary_html_version') == SUMMARY_RENDERER_VERSION:
+        return episode['summary_html']
+    return render_summary_html(episode.get('summary_text'))
+
+def get_summary_variants_html(episode_url):
+    """
+    Retrieves an episode's summary variants as a dict of variant -> sanitized HTML,
+    rendering any not yet rendered by the current renderer, as get_summary_html() does.
+    """
+    try:
+        rows = connect_db().execute("""
+            SELECT variant, summary_text, summary_html, summary_html_version FROM summary_variants
+            WHERE episode_url = ? ORDER BY variant
+        """, (episode_url,)).fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving rendered summary variants for episode {episode_url}: {e}")
+        return {}
+    variants = {}
+    for row in rows:
+        if row['summary_html'] is not None and row['summary_html_version'] == SUMMARY_RENDERER_VERSION:
+            variants[row['variant']] = row['summary_html']
+        else:
+            variants[row['variant']] = render_summary_html(row['summary_text'])
+    return variants
+
+def enqueue_email(email_data):
+    """
+    Queues an episode summary email in the outbox for delivery by the retrying sender.
+    email_data is a dictionary with episode_url, recipient_email, subject, podcast_name,
+    episode_title, published_date, summary_text and, if already rendered, summary_html.
+    An empty recipient means the default one.
+    """
+    try:
+        now = datetime.now().isoformat()
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO outbox (
+                    episode_url, recipient_email, subject, podcast_name, episode_title,
+                    published_date, summary_text, summary_html, next_attempt_at, created_timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                email_data.get('episode_url'),
+                email_data.get('recipient_email') or '',
+                email_data.get('subject'),
+                email_data.get('podcast_name'),
+                email_data.get('episode_title'),
+                email_data.get('published_date'),
+                email_data.get('summary_text'),
+                email_data.get('summary_html'),
+                now,
+                now
+            ))
+        logger.info(f"Queued email '{email_data.get('subject')}' in outbox.")
+        return True
+    except sqlite3.IntegrityError:
+        logger.warning(f"Email for episode {email_data.get('episode_url')} to '{email_data.get('recipient_email')}' is already queued. Skipping.")
+        return False
+    except sqlite3.Error as e:
+        logger.error(f"Error queueing email in outbox: {e}")
+        return False
+
+def get_due_emails(now=None, limit=50):
+    """
+    Retrieves pending outbox emails whose next attempt is due, oldest first.
+    Emails to recipients who receive digests are left for the digest scheduler.
+    """
+    now = now or datetime.now()
+    try:
+        rows = connect_db().execute("""
+            SELECT outbox.* FROM outbox
+            LEFT JOIN recipients ON recipients.email = outbox.recipient_email
+            WHERE outbox.status = 'pending' AND outbox.next_attempt_at <= ?
+                AND COALESCE(recipients.digest_frequency, 'immediate') = 'immediate'
+            ORDER BY outbox.next_attempt_at, outbox.id
+            LIMIT ?
+        """, (now.isoformat(), limit)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving due emails from outbox: {e}")
+        return []
+
+def mark_emails_sent(outbox_ids):
+    """
+    Marks outbox emails as delivered.
+    """
+    try:
+        sent_at = datetime.now().isoformat()
+        with transaction() as conn:
+            conn.executemany("""
+                UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_timestamp = ?, last_error = NULL
+                WHERE id = ?
+            """, [(sent_at, outbox_id) for outbox_id in outbox_ids])
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error marking outbox emails {outbox_ids} as sent: {e}")
+        return False
+
+def mark_email_failed(outbox_id, error, next_attempt_at=None):
+    """
+    Records a failed delivery attempt. The email is retried at next_attempt_at,
+    or marked as permanently failed if next_attempt_at is None.
+    """
+    try:
+        with transaction() as conn:
+            if next_attempt_at:
+                conn.execute("""
+                    UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+                    WHERE id = ?
+                """, (error, next_attempt_at.isoformat(), outbox_id))
+            else:
+                conn.execute("""
+                    UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ?
+                    WHERE id = ?
+                """, (error, outbox_id))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error recording failed delivery of outbox email {outbox_id}: {e}")
+        return False
+
+def create_pipeline_job(job_data):
+    """
+    Starts tracking an episode through the pipeline, at job_data["stage"] (default
+    "discovered"). An episode that already has a job keeps it.
+
+    Returns:
+        dict: The episode's job, or None on error.
+    """
+    stage = job_data.get('stage', PIPELINE_STAGES[0])
+    now = datetime.now().isoformat()
+    try:
+        with transaction() as conn:
+            conn.execute(f"""
+                INSERT INTO pipeline_jobs (
+                    episode_url, podcast_id, podcast_name, rss_feed_url, title, published_date,
+                    stage, next_attempt_at, audio_filepath, {stage}_timestamp
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (episode_url) DO NOTHING
+            """, (
+                job_data['episode_url'], job_data.get('podcast_id'), job_data.get('podcast_name'),
+                job_data.get('rss_feed_url'), job_data.get('title'), job_data.get('published_date'),
+                stage, now, job_data.get('audio_filepath'), now
+            ))
+        return get_pipeline_job_by_url(job_data['episode_url'])
+    except (sqlite3.Error, KeyError) as e:
+        logger.error(f"Error creating pipeline job for {job_data.get('episode_url')}: {e}")
+        return None
+
+def get_pipeline_job(job_id):
+    """Retrieves a pipeline job by its ID."""
+    try:
+        row = connect_db().execute("SELECT * FROM pipeline_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving pipeline job {job_id}: {e}")
+        return None
+
+def get_pipeline_job_by_url(episode_url):
+    """Retrieves the pipeline job of an episode, if it has one."""
+    try:
+        row = connect_db().execute("SELECT * FROM pipeline_jobs WHERE episode_url = ?", (episode_url,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving pipeline job for {episode_url}: {e}")
+        return None
+
+def get_due_pipeline_jobs(now=None, limit=50):
+    """Retrieves unfinished pipeline jobs that are ready to run, oldest first."""
+    now = now or datetime.now()
+    try:
+        rows = connect_db().execute("""
+            SELECT * FROM pipeline_jobs WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, id LIMIT ?
+        """, (now.isoformat(), limit)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving due pipeline jobs: {e}")
+        return []
+
+def advance_pipeline_job(job_id, stage, fields=None, worker_id=None):
+    """
+    Records that a job has completed the given stage, along with any fields the stage
+    produced (see PIPELINE_JOB_FIELDS), and releases its lease. The attempt count and
+    error are reset for the next stage; a job that reaches the last stage is done.
+
+    If worker_id is given, the update only applies while that worker holds the job's
+    lease, so a worker whose lease expired can't overwrite the work of its successor.
+
+    Returns:
+        dict: The updated job, or None on error or if the lease was lost.
+    """
+    fields = dict(fields or {})
+    unknown = set(fields) - PIPELINE_JOB_FIELDS
+    if stage not in PIPELINE_STAGES or unknown:
+        raise ValueError(f"Invalid pipeline job update: stage {stage}, fields {sorted(unknown)}")
+    now = datetime.now().isoformat()
+    assignments = "".join(f", {name} = ?" for name in fields)
+    try:
+        with transaction() as conn:
+            cursor = conn.execute(f"""
+                UPDATE pipeline_jobs SET stage = ?, status = ?, attempts = 0, last_error = NULL,
+                    next_attempt_at = ?, {stage}_timestamp = ?, lease_owner = NULL, lease_expires_at = NULL{assignments}
+                WHERE id = ? AND (? IS NULL OR lease_owner = ?)
+            """, [stage, 'done' if stage == PIPELINE_STAGES[-1] else 'pending', now, now, *fields.values(),
+                  job_id, worker_id, worker_id])
+        if cursor.rowcount == 0:
+            logger.warning(f"Pipeline job {job_id} was not advanced to {stage}: its lease is no longer held by {worker_id}.")
+            return None
+        return get_pipeline_job(job_id)
+    except sqlite3.Error as e:
+        logger.error(f"Error advancing pipeline job {job_id} to {stage}: {e}")
+        return None
+
+def mark_pipeline_job_failed(job_id, error, next_attempt_at=None, worker_id=None):
+    """
+    Records a failed attempt at a job's next stage and releases its lease. The stage is
+    retried at next_attempt_at, or the job is marked as permanently failed if
+    next_attempt_at is None. As with advance_pipeline_job, a worker_id restricts the
+    update to the lease holder.
+    """
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE pipeline_jobs SET status = ?, attempts = attempts + 1, last_error = ?,
+                    next_attempt_at = COALESCE(?, next_attempt_at), lease_owner = NULL, lease_expires_at = NULL
+                WHERE id = ? AND (? IS NULL OR lease_owner = ?)
+            """, ('pending' if next_attempt_at else 'failed', error,
+                  next_attempt_at.isoformat() if next_attempt_at else None, job_id, worker_id, worker_id))
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error recording failure of pipeline job {job_id}: {e}")
+        return False
+
+def claim_pipeline_job(stages, worker_id, lease_seconds, now=None, job_id=None):
+    """
+    Leases the oldest due job waiting at one of the given stages (or the given job), so
+    that no other worker runs its next stage until the lease is released or expires.
+
+    The job is picked and leased in a single write transaction, so concurrent workers in
+    any number of processes sharing the database never claim the same job.
+
+    Returns:
+        dict: The claimed job, or None if none is available.
+    """
+    now = now or datetime.now()
+    placeholders = ", ".join("?" * len(stages))
+    try:
+        with transaction() as conn:
+            row = conn.execute(f"""
+                SELECT id FROM pipeline_jobs
+                WHERE status = 'pending' AND stage IN ({placeholders}) AND next_attempt_at <= ?
+                    AND (lease_expires_at IS NULL OR lease_expires_at <= ?) AND (? IS NULL OR id = ?)
+                ORDER BY next_attempt_at, id LIMIT 1
+            """, (*stages, now.isoformat(), now.isoformat(), job_id, job_id)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE pipeline_jobs SET lease_owner = ?, lease_expires_at = ? WHERE id = ?",
+                         (worker_id, (now + timedelta(seconds=lease_seconds)).isoformat(), row['id']))
+        return get_pipeline_job(row['id'])
+    except sqlite3.Error as e:
+        logger.error(f"Error claiming pipeline job for {worker_id}: {e}")
+        return None
 
+def renew_pipeline_job_lease(job_id, worker_id, lease_seconds):
+    """
+    Extends a worker's lease on a job (a heartbeat).
+
+    Returns:
+        bool: False if the worker no longer holds the lease.
+    """
+    now = datetime.now()
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE pipeline_jobs SET lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ? AND lease_expires_at > ?
+            """, ((now + timedelta(seconds=lease_seconds)).isoformat(), job_id, worker_id, now.isoformat()))
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error renewing lease on pipeline job {job_id}: {e}")
+        return False
+
+def claim_periodic_task(name, worker_id, interval_seconds, now=None):
+    """
+    Claims the right to run a cluster-wide periodic task, such as polling feeds or
+    delivering the outbox, for the next interval_seconds. Only one worker among all
+    processes sharing the database succeeds per interval.
+
+    Returns:
+        bool: True if this worker should run the task now.
+    """
+    now = now or datetime.now()
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE leases.expires_at <= ?
+            """, (name, worker_id, (now + timedelta(seconds=interval_seconds)).isoformat(), now.isoformat()))
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error claiming periodic task {name} for {worker_id}: {e}")
+        return False
+
+def set_recipient_digest_frequency(email, digest_frequency):
+    """
+    Sets how often a recipient is emailed: 'immediate' (one email per episode), 'hourly' or 'daily' digests.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO recipients (email, digest_frequency) VALUES (?, ?)
+                ON CONFLICT (email) DO UPDATE SET digest_frequency = excluded.digest_frequency
+            """, (email, digest_frequency))
+        logger.info(f"Set digest frequency for {email} to {digest_frequency}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error setting digest frequency for {email}: {e}")
+        return False
+
+def get_recipient(email):
+    """
+    Retrieves a recipient's delivery preferences by email address.
+    """
+    try:
+        row = connect_db().execute("SELECT * FROM recipients WHERE email = ?", (email,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving recipient {email}: {e}")
+        return None
+
+def get_digest_recipients():
+    """
+    Retrieves recipients who receive digests and have at least one pending email.
+    """
+    try:
+        rows = connect_db().execute("""
+            SELECT * FROM recipients
+            WHERE digest_frequency != 'immediate'
+                AND EXISTS (SELECT 1 FROM outbox WHERE outbox.recipient_email = recipients.email AND outbox.status = 'pending')
+        """).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving digest recipients: {e}")
+        return []
+
+def get_pending_emails_for_recipient(email, now=None):
+    """
+    Retrieves a recipient's pending outbox emails that are due, oldest first.
+    """
+    now = now or datetime.now()
+    try:
+        rows = connect_db().execute("""
+            SELECT * FROM outbox
+            WHERE recipient_email = ? AND status = 'pending' AND next_attempt_at <= ?
+            ORDER BY created_timestamp, id
+        """, (email, now.isoformat())).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving pending emails for {email}: {e}")
+        return []
+
+def mark_digest_sent(email, outbox_ids, sent_at=None):
+    """
+    Marks the outbox emails included in a digest as sent and records when the recipient's digest went out.
+    """
+    sent_at = (sent_at or datetime.now()).isoformat()
+    try:
+        with transaction() as conn:
+            conn.executemany("""
+                UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_timestamp = ?, last_error = NULL
+                WHERE id = ?
+            """, [(sent_at, outbox_id) for outbox_id in outbox_ids])
+            conn.execute("UPDATE recipients SET last_digest_timestamp = ? WHERE email = ?", (sent_at, email))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error marking digest for {email} as sent: {e}")
+        return False
+
+def is_valid_summary_variant(summary_variant):
+    """Returns True if summary_variant is None (the full summary) or a variant the summarizer can produce."""
+    try:
+        return summary_variant is None or bool(parse_variant(summary_variant))
+    except ValueError:
+        return False
+
+def add_subscription(podcast_id, email, summary_variant=None):
+    """
+    Subscribes a recipient (created if new) to a podcast.
+    summary_variant selects the summary they are emailed; None means the full summary.
+    Called inside another transaction(), the subscription becomes part of it.
+    """
+    if not is_valid_summary_variant(summary_variant):
+        logger.error(f"Not subscribing {email} to podcast with ID {podcast_id}: unknown summary variant '{summary_variant}'")
+        return False
+    try:
+        with transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO recipients (email) VALUES (?)", (email,))
+            conn.execute("""
+                INSERT INTO subscriptions (podcast_id, recipient_id, summary_variant)
+                SELECT ?, id, ? FROM recipients WHERE email = ?
+                ON CONFLICT (podcast_id, recipient_id) DO UPDATE SET summary_variant = excluded.summary_variant
+            """, (podcast_id, summary_variant, email))
+        logger.info(f"Subscribed {email} to podcast with ID: {podcast_id}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error subscribing {email} to podcast with ID {podcast_id}: {e}")
+        return False
+
+def remove_subscription(podcast_id, email):
+    """
+    Unsubscribes a recipient from a podcast.
+    """
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                DELETE FROM subscriptions
+                WHERE podcast_id = ? AND recipient_id = (SELECT id FROM recipients WHERE email = ?)
+            """, (podcast_id, email))
+        logger.info(f"Unsubscribed {email} from podcast with ID: {podcast_id}")
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error unsubscribing {email} from podcast with ID {podcast_id}: {e}")
+        return False
+
+def get_subscribers(podcast_id):
+    """
+    Retrieves the recipients subscribed to a podcast, with their summary variant and digest frequency.
+    """
+    try:
+        rows = connect_db().execute("""
+            SELECT recipients.email, recipients.digest_frequency, subscriptions.summary_variant
+            FROM subscriptions JOIN recipients ON recipients.id = subscriptions.recipient_id
+            WHERE subscriptions.podcast_id = ?
+            ORDER BY recipients.email
+        """, (podcast_id,)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving subscribers for podcast with ID {podcast_id}: {e}")
+        return []
+
+@cached_read
+def get_subscriptions_by_podcast():
+    """
+    Retrieves every subscription in one query, as a dict of podcast ID -> list of subscribers.
+    """
+    try:
+        rows = connect_db().execute("""
+            SELECT subscriptions.podcast_id, recipients.email, recipients.digest_frequency, subscriptions.summary_variant
+            FROM subscriptions JOIN recipients ON recipients.id = subscriptions.recipient_id
+            ORDER BY recipients.email
+        """).fetchall()
+        subscriptions = {}
+        for row in rows:
+            subscriber = dict(row)
+            subscriptions.setdefault(subscriber.pop('podcast_id'), []).append(subscriber)
+        return subscriptions
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving subscriptions: {e}")
+        return {}
+
+def add_podcast_config(name, rss_feed_url, recipient_email=None, summary_variant=None):
+    """
+    Adds a new podcast configuration to the database, subscribing recipient_email to it if given.
+    summary_variant selects the summary the recipient is emailed; None means the full summary.
+    """
+    if not is_valid_summary_variant(summary_variant):
+        logger.error(f"Not adding podcast config '{name}': unknown summary variant '{summary_variant}'")
+        return False
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                INSERT INTO podcast_configs (name, rss_feed_url, recipient_email, summary_variant) VALUES (?, ?, ?, ?)
+            """, (name, rss_feed_url, recipient_email, summary_variant))
+            # Re-adding a feed reclaims the episodes already stored for it
+            conn.execute("UPDATE episodes SET podcast_id = ? WHERE podcast_url = ? AND podcast_id IS NULL",
+                         (cursor.lastrowid, rss_feed_url))
+            if recipient_email and not add_subscription(cursor.lastrowid, recipient_email, summary_variant):
+                raise sqlite3.Error(f"Could not subscribe {recipient_email}")
+        logger.info(f"Added podcast config: {name} - {rss_feed_url}")
+        return True
+    except sqlite3.IntegrityError:
+        logger.warning(f"Podcast config '{name}' (URL: {rss_feed_url}) already exists in database. Skipping.")
+        return False
+    except sqlite3.Error as e:
+        logger.error(f"Error adding podcast config: {e}")
+        return False
+
+@cached_read
+def get_all_podcast_configs():
+    """
+    Retrieves all podcast configurations from the database.
+    """
+    try:
+        return [dict(row) for row in connect_db().execute("SELECT * FROM podcast_configs").fetchall()]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving all podcast configs: {e}")
+        return []
+
+def delete_podcast_config(podcast_id):
+    """
+    Deletes a podcast configuration (and its subscriptions) from the database by its ID.
+    """
+    try:
+        with transaction() as conn:
+            conn.execute("DELETE FROM subscriptions WHERE podcast_id = ?", (podcast_id,))
+            conn.execute("DELETE FROM podcast_configs WHERE id = ?", (podcast_id,))
+        logger.info(f"Deleted podcast config with ID: {podcast_id}")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error deleting podcast config: {e}")
+        return False
+
+@cached_read
 def get_podcast_config_by_id(podcast_id):
     """
     Retrieves a podcast configuration by its ID.
     """
-    conn = connect_db()
-    if conn:
+    try:
+        row = connect_db().execute("SELECT * FROM podcast_configs WHERE id = ?", (podcast_id,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving podcast config by ID {podcast_id}: {e}")
+        return None
+
+def set_retention_rule(podcast_id, kind, keep_days):
+    """
+    Sets how many days a podcast's episodes keep their audio, transcript or summary
+    (see RETENTION_KINDS), overriding the default. keep_days None means forever.
+    """
+    if kind not in RETENTION_KINDS:
+        logger.error(f"Unknown retention kind '{kind}'")
+        return False
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO retention_rules (podcast_id, kind, keep_days) VALUES (?, ?, ?)
+                ON CONFLICT (podcast_id, kind) DO UPDATE SET keep_days = excluded.keep_days
+            """, (podcast_id, kind, keep_days))
+        logger.info(f"Set {kind} retention for podcast {podcast_id} to {keep_days if keep_days is not None else 'forever'} days")
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error setting {kind} retention for podcast {podcast_id}: {e}")
+        return False
+
+def get_retention_rules():
+    """Retrieves every retention override, as a dict of podcast ID -> {kind: keep_days}."""
+    try:
+        rules = {}
+        for row in connect_db().execute("SELECT podcast_id, kind, keep_days FROM retention_rules"):
+            rules.setdefault(row['podcast_id'], {})[row['kind']] = row['keep_days']
+        return rules
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving retention rules: {e}")
+        return {}
+
+def get_expired_episodes(podcast_id, kind, published_before, limit=None):
+    """
+    Retrieves episodes of a podcast (or of no podcast, if podcast_id is None) published
+    before the given Unix time that still hold data of the given retention kind.
+    """
+    conditions = {
+        "audio": "audio_filepath IS NOT NULL",
+        "transcript": f"""(transcription_filepath IS NOT NULL OR EXISTS (
+            SELECT 1 FROM episode_artifacts WHERE episode_id = episodes.id AND kind = '{TRANSCRIPT_ARTIFACT}'))""",
+        "summary": "1",
+    }
+    try:
+        rows = connect_db().execute(f"""
+            SELECT id, episode_url, audio_filepath, transcription_filepath FROM episodes
+            WHERE podcast_id IS ? AND published_epoch < ? AND {conditions[kind]}
+            ORDER BY published_epoch LIMIT ?
+        """, (podcast_id, published_before, limit or RETENTION_BATCH_SIZE)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving episodes with expired {kind}: {e}")
+        return []
+
+def clear_episode_audio(episode_ids):
+    """Forgets the audio files of the given episodes, once they have been deleted."""
+    try:
+        with transaction() as conn:
+            conn.executemany("UPDATE episodes SET audio_filepath = NULL WHERE id = ?", [(i,) for i in episode_ids])
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error clearing episode audio: {e}")
+        return False
+
+def delete_episode_transcripts(episode_ids):
+    """
+    Deletes the stored transcripts of the given episodes and their search segments, and
+    forgets their transcription files. Artifacts no longer referenced are deleted too.
+    """
+    params = [(i,) for i in episode_ids]
+    try:
+        with transaction() as conn:
+            conn.executemany(f"DELETE FROM episode_artifacts WHERE episode_id = ? AND kind IN ('{TRANSCRIPT_ARTIFACT}', '{TIMINGS_ARTIFACT}')", params)
+            conn.executemany("DELETE FROM transcript_segments WHERE episode_id = ?", params)
+            conn.executemany("UPDATE episodes SET transcription_filepath = NULL WHERE id = ?", params)
+        delete_unreferenced_artifacts()
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error deleting episode transcripts: {e}")
+        return False
+
+def connect_archive_db():
+    """
+    Opens the archive database, creating its table if needed. The archive is written
+    rarely, so each caller opens (and closes) its own connection.
+    """
+    conn = sqlite3.connect(ARCHIVE_DATABASE_NAME)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archived_episodes (
+            id INTEGER PRIMARY KEY,
+            episode_url TEXT NOT NULL UNIQUE,
+            podcast_id INTEGER,
+            title TEXT,
+            published_epoch INTEGER,
+            archived_timestamp TEXT NOT NULL,
+            codec TEXT NOT NULL,
+            record BLOB NOT NULL
+        )
+    """)
+    return conn
+
+def archive_episodes(episode_ids):
+    """
+    Moves episodes to the archive database. Each is archived as one compressed record of
+    its row, summary variants and transcript, then deleted from the live database with
+    everything that refers to it, leaving a note in archived_episodes.
+
+    The archive is written first, and re-archiving an episode replaces its record, so an
+    interrupted run loses nothing and is completed by the next one.
+
+    Returns:
+        int: The number of episodes archived.
+    """
+    now = datetime.now().isoformat()
+    try:
+        conn = connect_db()
+        records = []
+        for episode_id in episode_ids:
+            row = conn.execute("SELECT * FROM episodes WHERE id = ?", (episode_id,)).fetchone()
+            if row is None:
+                continue
+            record = dict(row)
+            record['summary_variants'] = get_summary_variants(record['episode_url'])
+            record['transcript'] = get_episode_artifact(episode_id, TRANSCRIPT_ARTIFACT)
+            codec, body = _compress(json.dumps(record))
+            records.append((record['id'], record['episode_url'], record['podcast_id'], record['title'],
+                            record['published_epoch'], now, codec, body))
+        if not records:
+            return 0
+
+        archive = connect_archive_db()
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM podcast_configs WHERE id = ?", (podcast_id,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving podcast config by ID {podcast_id}: {e}")
-            return None
+            with archive:
+                archive.executemany("INSERT OR REPLACE INTO archived_episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
         finally:
-            conn.close()
+            archive.close()
 
-def get_podcast_config_by_id(podcast_id):
+        with transaction() as conn:
+            conn.executemany("INSERT OR REPLACE INTO archived_episodes (episode_url, podcast_id, archived_timestamp) VALUES (?, ?, ?)",
+                             [(r[1], r[2], now) for r in records])
+            conn.executemany("DELETE FROM summary_variants WHERE episode_url = ?", [(r[1],) for r in records])
+            conn.executemany("DELETE FROM episodes WHERE id = ?", [(r[0],) for r in records])
+        delete_unreferenced_artifacts()
+        logger.info(f"Archived {len(records)} episodes.")
+        return len(records)
+    except sqlite3.Error as e:
+        logger.error(f"Error archiving episodes: {e}")
+        return 0
+
+def get_archived_episode(episode_url):
     """
-    Retrieves a podcast configuration by its ID.
+    Retrieves an archived episode's record, including its summary variants and transcript.
     """
-    conn = connect_db()
-    if conn:
+    try:
+        archive = connect_archive_db()
         try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM podcast_configs WHERE id = ?", (podcast_id,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
-        except sqlite3.Error as e:
-            logger.error(f"Error retrieving podcast config by ID {podcast_id}: {e}")
-            return None
+            row = archive.execute("SELECT codec, record FROM archived_episodes WHERE episode_url = ?", (episode_url,)).fetchone()
         finally:
-            conn.close()
+            archive.close()
+        return json.loads(_decompress(row['codec'], row['record'])) if row else None
+    except (sqlite3.Error, zlib.error, ValueError) as e:
+        logger.error(f"Error retrieving archived episode {episode_url}: {e}")
+        return None
+
+def compact_database(max_pages=None):
+    """
+    Refreshes the query planner's statistics with a sampled ANALYZE, then returns free
+    pages to the filesystem with an incremental VACUUM (at most max_pages of them, or all).
+
+    Databases created before incremental vacuuming was enabled get a one-off full VACUUM.
+
+    Returns:
+        int: The number of bytes reclaimed.
+    """
+    try:
+        conn = connect_db()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = conn.execute("PRAGMA page_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            logger.info("Enabling incremental vacuum with a one-off full VACUUM.")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+        conn.execute("ANALYZE")
+        # incremental_vacuum frees one page per step, so is run to completion as a script
+        conn.executescript(f"PRAGMA incremental_vacuum({max_pages or 0})")
+        return (pages_before - conn.execute("PRAGMA page_count").fetchone()[0]) * page_size
+    except sqlite3.Error as e:
+        logger.error(f"Error compacting database: {e}")
+        return 0
+
+def record_retention_run(report):
+    """Logs a retention run's report (see retention.run_retention) for monitoring."""
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO retention_runs (
+                    started_timestamp, duration_seconds, audio_files_deleted, transcripts_deleted,
+                    episodes_archived, file_bytes_reclaimed, database_bytes_reclaimed
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (report['started_timestamp'], report['duration_seconds'], report['audio_files_deleted'],
+                  report['transcripts_deleted'], report['episodes_archived'], report['file_bytes_reclaimed'],
+                  report['database_bytes_reclaimed']))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error recording retention run: {e}")
+        return False
+
+def get_retention_runs(limit=10):
+    """Retrieves the most recent retention runs, newest first."""
+    try:
+        rows = connect_db().execute("SELECT * FROM retention_runs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving retention runs: {e}")
+        return []
+
+def enqueue_episode_task(episode_id, action):
+    """
+    Queues a background task on an episode, unless one is already queued or running for
+    it, in which case that task is returned instead, so repeated clicks start one job.
+
+    Returns:
+        dict: The episode's active task, with "created" True if it was queued by this
+            call, or None on error.
+    """
+    if action not in EPISODE_TASK_ACTIONS:
+        logger.error(f"Unknown episode task action '{action}'")
+        return None
+    now = datetime.now()
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                UPDATE episode_tasks SET status = 'failed', error = 'Timed out', finished_timestamp = ?
+                WHERE episode_id = ? AND status = 'running' AND started_timestamp < ?
+            """, (now.isoformat(), episode_id, (now - timedelta(seconds=EPISODE_TASK_TIMEOUT_SECONDS)).isoformat()))
+            inserted = conn.execute("""
+                INSERT INTO episode_tasks (episode_id, action, created_timestamp) VALUES (?, ?, ?)
+                ON CONFLICT (episode_id) WHERE status IN ('queued', 'running') DO NOTHING
+            """, (episode_id, action, now.isoformat()))
+            row = conn.execute("""
+                SELECT * FROM episode_tasks WHERE episode_id = ? AND status IN ('queued', 'running')
+            """, (episode_id,)).fetchone()
+        return dict(row, created=inserted.rowcount > 0)
+    except sqlite3.Error as e:
+        logger.error(f"Error queueing {action} task for episode {episode_id}: {e}")
+        return None
+
+def get_episode_task(task_id):
+    """Retrieves a background episode task by its ID."""
+    try:
+        row = connect_db().execute("SELECT * FROM episode_tasks WHERE id = ?", (task_id,)).fetchone()
+        return dict(row) if row else None
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving episode task {task_id}: {e}")
+        return None
+
+def get_queued_episode_tasks():
+    """Retrieves tasks still waiting to run, oldest first, e.g. to resume them after a restart."""
+    try:
+        rows = connect_db().execute("SELECT * FROM episode_tasks WHERE status = 'queued' ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving queued episode tasks: {e}")
+        return []
+
+def start_episode_task(task_id):
+    """
+    Marks a queued task as running.
+
+    Returns:
+        bool: True if the caller should run the task; False if it is not queued, e.g.
+            because another thread has already started it.
+    """
+    try:
+        with transaction() as conn:
+            cursor = conn.execute("""
+                UPDATE episode_tasks SET status = 'running', started_timestamp = ? WHERE id = ? AND status = 'queued'
+            """, (datetime.now().isoformat(), task_id))
+        return cursor.rowcount > 0
+    except sqlite3.Error as e:
+        logger.error(f"Error starting episode task {task_id}: {e}")
+        return False
+
+def finish_episode_task(task_id, error=None):
+    """Marks a running task as done, or as failed with the given error."""
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                UPDATE episode_tasks SET status = ?, error = ?, finished_timestamp = ? WHERE id = ? AND status = 'running'
+            """, ('failed' if error else 'done', error, datetime.now().isoformat(), task_id))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error finishing episode task {task_id}: {e}")
+        return False
+
+def record_stage_run(job_id, stage, worker_id, duration_seconds, error=None, now=None):
+    """
+    Logs a run of a pipeline stage (named after the stage it advances a job to), and
+    prunes that stage's runs older than STAGE_RUN_WINDOW_DAYS.
+    """
+    now = now or datetime.now()
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO pipeline_stage_runs (job_id, stage, worker_id, finished_epoch, duration_seconds, error)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (job_id, stage, worker_id, int(now.timestamp()), duration_seconds, error))
+            conn.execute("DELETE FROM pipeline_stage_runs WHERE stage = ? AND finished_epoch < ?",
+                         (stage, int((now - timedelta(days=STAGE_RUN_WINDOW_DAYS)).timestamp())))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error recording {stage} run of pipeline job {job_id}: {e}")
+        return False
+
+def record_feed_poll(podcast_id, error=None, now=None):
+    """Records that a podcast's feed was polled, and the error if the poll failed."""
+    now = (now or datetime.now()).isoformat()
+    try:
+        with transaction() as conn:
+            conn.execute("""
+                INSERT INTO feed_polls (podcast_id, last_polled_timestamp, last_success_timestamp, last_error)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (podcast_id) DO UPDATE SET
+                    last_polled_timestamp = excluded.last_polled_timestamp,
+                    last_success_timestamp = COALESCE(excluded.last_success_timestamp, feed_polls.last_success_timestamp),
+                    last_error = excluded.last_error
+            """, (podcast_id, now, None if error else now, error))
+        return True
+    except sqlite3.Error as e:
+        logger.error(f"Error recording poll of podcast {podcast_id}: {e}")
+        return False
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest-rank percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+def get_pipeline_status(now=None):
+    """
+    Summarizes the pipeline for the status page. Every figure comes from an index: jobs
+    are counted by status and stage, in-flight jobs by their leases, and durations read
+    from the last STAGE_RUN_WINDOW_DAYS of stage runs.
+
+    Returns:
+        dict: Per stage (keyed by the stage a job is waiting to reach), the jobs waiting,
+            in flight and permanently failed, and the p50/p95 durations of successful runs;
+            each feed's last poll; recent failures; and the emails waiting in the outbox.
+            None on error.
+    """
+    now = now or datetime.now()
+    window_start = int((now - timedelta(days=STAGE_RUN_WINDOW_DAYS)).timestamp())
+    steps = PIPELINE_STAGES[1:]
+    stages = {step: {"waiting": 0, "in_flight": 0, "failed": 0, "runs": 0, "p50_seconds": None, "p95_seconds": None}
+              for step in steps}
+    try:
+        conn = connect_db()
+        # A job's stage is the last one it completed; it is waiting for the next
+        next_step = dict(zip(PIPELINE_STAGES, steps))
+        for row in conn.execute("""
+            SELECT status, stage, COUNT(*) AS count FROM pipeline_jobs
+            WHERE status IN ('pending', 'failed') GROUP BY status, stage
+        """):
+            key = "waiting" if row['status'] == 'pending' else "failed"
+            if row['stage'] in next_step:
+                stages[next_step[row['stage']]][key] += row['count']
+        for row in conn.execute("""
+            SELECT stage, COUNT(*) AS count FROM pipeline_jobs
+            WHERE lease_owner IS NOT NULL AND lease_expires_at > ? GROUP BY stage
+        """, (now.isoformat(),)):
+            if row['stage'] in next_step:
+                stages[next_step[row['stage']]]["in_flight"] += row['count']
+                stages[next_step[row['stage']]]["waiting"] -= row['count']
+
+        for step in steps:
+            durations = [row[0] for row in conn.execute("""
+                SELECT duration_seconds FROM pipeline_stage_runs
+                WHERE stage = ? AND finished_epoch >= ? AND error IS NULL ORDER BY duration_seconds
+            """, (step, window_start))]
+            stages[step].update(runs=len(durations), p50_seconds=percentile(durations, 0.5),
+                                p95_seconds=percentile(durations, 0.95))
+
+        feeds = [dict(row) for row in conn.execute("""
+            SELECT podcast_configs.id AS podcast_id, podcast_configs.name, podcast_configs.rss_feed_url,
+                feed_polls.last_polled_timestamp, feed_polls.last_success_timestamp, feed_polls.last_error
+            FROM podcast_configs LEFT JOIN feed_polls ON feed_polls.podcast_id = podcast_configs.id
+            ORDER BY podcast_configs.name
+        """)]
+        failures = [dict(row) for row in conn.execute("""
+            SELECT pipeline_stage_runs.job_id, pipeline_stage_runs.stage, pipeline_stage_runs.worker_id,
+                pipeline_stage_runs.finished_epoch, pipeline_stage_runs.error, pipeline_jobs.title, pipeline_jobs.podcast_name
+            FROM pipeline_stage_runs LEFT JOIN pipeline_jobs ON pipeline_jobs.id = pipeline_stage_runs.job_id
+            WHERE pipeline_stage_runs.error IS NOT NULL
+            ORDER BY pipeline_stage_runs.finished_epoch DESC LIMIT ?
+        """, (RECENT_FAILURES_LIMIT,))]
+        outbox_pending = conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        return {"stages": stages, "feeds": feeds, "recent_failures": failures, "outbox_pending": outbox_pending,
+                "window_days": STAGE_RUN_WINDOW_DAYS}
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving pipeline status: {e}")
+        return None
 
 def clear_all_data():
     """
     Clears all data from the episodes and podcast_configs tables.
     """
-    conn = connect_db()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute("DROP TABLE IF EXISTS episodes")
-            cursor.execute("DROP TABLE IF EXISTS podcast_configs")
-            conn.commit()
-            logger.info("All data cleared from episodes and podcast_configs tables.")
-        except sqlite3.Error as e:
-            logger.error(f"Error clearing all data: {e}")
-        finally:
-            conn.close()
+    try:
+        with transaction() as conn:
+            conn.execute("DROP TABLE IF EXISTS episodes_fts")
+            conn.execute("DROP TABLE IF EXISTS segments_fts")
+            conn.execute("DROP TABLE IF EXISTS transcript_segments")
+            conn.execute("DROP TABLE IF EXISTS episode_artifacts")
+            conn.execute("DROP TABLE IF EXISTS artifacts")
+            conn.execute("DROP TABLE IF EXISTS episode_tasks")
+            conn.execute("DROP TABLE IF EXISTS episodes")
+            conn.execute("DROP TABLE IF EXISTS summary_variants")
+            conn.execute("DROP TABLE IF EXISTS outbox")
+            conn.execute("DROP TABLE IF EXISTS pipeline_jobs")
+            conn.execute("DROP TABLE IF EXISTS leases")
+            conn.execute("DROP TABLE IF EXISTS retention_rules")
+            conn.execute("DROP TABLE IF EXISTS archived_episodes")
+            conn.execute("DROP TABLE IF EXISTS retention_runs")
+            conn.execute("DROP TABLE IF EXISTS pipeline_stage_runs")
+            conn.execute("DROP TABLE IF EXISTS feed_polls")
+            conn.execute("DROP TABLE IF EXISTS subscriptions")
+            conn.execute("DROP TABLE IF EXISTS recipients")
+            conn.execute("DROP TABLE IF EXISTS podcast_configs")
+            conn.execute("PRAGMA user_version = 0")
+            # The data version is kept, and bumped, so results cached in any process are invalidated
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'data_version'").fetchone():
+                conn.execute("UPDATE data_version SET version = version + 1")
+        logger.info("All data cleared from episodes and podcast_configs tables.")
+    except sqlite3.Error as e:
+        logger.error(f"Error clearing all data: {e}")
 
 if __name__ == "__main__":
     # Example Usage
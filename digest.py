@@ -0,0 +1,63 @@
+import logging
+from datetime import datetime, timedelta
+import database_manager
+import email_renderer
+from send_email import send_html_email, email_retry_delay, MAX_EMAIL_ATTEMPTS
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+# How long each digest frequency collects summaries before sending them as one email.
+DIGEST_WINDOWS = {
+    "hourly": timedelta(hours=1),
+    "daily": timedelta(days=1),
+}
+DIGEST_FREQUENCIES = ["immediate"] + list(DIGEST_WINDOWS)
+
+def digest_is_due(recipient, now):
+    """Returns True if the recipient's digest window has elapsed since their last digest."""
+    window = DIGEST_WINDOWS.get(recipient["digest_frequency"])
+    if window is None:
+        logger.warning(f"Unknown digest frequency '{recipient['digest_frequency']}' for {recipient['email']}")
+        return False
+    if not recipient["last_digest_timestamp"]:
+        return True
+    return now - datetime.fromisoformat(recipient["last_digest_timestamp"]) >= window
+
+def deliver_digests(now=None):
+    """
+    Sends one digest email to each digest recipient whose window has elapsed, covering
+    every summary queued for them since their last digest. API calls and rendering
+    therefore scale with recipients rather than with episodes.
+    """
+    now = now or datetime.now()
+    for recipient in database_manager.get_digest_recipients():
+        if not digest_is_due(recipient, now):
+            continue
+
+        emails = database_manager.get_pending_emails_for_recipient(recipient["email"], now)
+        if not emails:
+            continue
+
+        subject = f"Summacast digest: {len(emails)} new episode summar{'y' if len(emails) == 1 else 'ies'}"
+        html_body = email_renderer.render_digest_email(emails)
+        if send_html_email(subject, html_body, recipient["email"]):
+            database_manager.mark_digest_sent(recipient["email"], [email["id"] for email in emails], now)
+            logger.info(f"Sent digest of {len(emails)} episodes to {recipient['email']}.")
+            continue
+
+        # Failed digests back off like outbox emails, keeping their emails together for the retry
+        attempts = max(email["attempts"] for email in emails) + 1
+        if attempts >= MAX_EMAIL_ATTEMPTS:
+            for email in emails:
+                database_manager.mark_email_failed(email["id"], "digest send failed")
+            logger.error(f"Giving up on digest of {len(emails)} episodes to {recipient['email']} after {attempts} attempts.")
+        else:
+            next_attempt_at = now + email_retry_delay(attempts)
+            for email in emails:
+                database_manager.mark_email_failed(email["id"], "digest send failed", next_attempt_at)
+            logger.warning(f"Failed to send digest to {recipient['email']} (attempt {attempts}); retrying at {next_attempt_at}.")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    deliver_digests()
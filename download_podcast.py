@@ -1,18 +1,27 @@
 import feedparser
 import requests
 import os
+import re
 import logging
+from urllib.parse import urlparse
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
-def download_latest_podcast_episode(rss_feed_url, download_directory="podcasts"):
+# Suffix of the file an episode is downloaded to before being moved into place.
+PARTIAL_SUFFIX = ".part"
+
+def discover_latest_episode(rss_feed_url, download_directory="podcasts"):
     """
-    Downloads the latest episode from a given podcast RSS feed.
+    Finds the latest episode in a podcast's RSS feed, without downloading it.
 
     Args:
         rss_feed_url (str): The URL of the podcast's RSS feed.
-        download_directory (str): The directory where the podcast episode will be saved.
+        download_directory (str): The directory the episode would be saved in.
+
+    Returns:
+        dict: The episode's title, audio URL, published date and the local file path it
+            downloads to, or None if the feed has no usable episode.
     """
     logger.info(f"Parsing RSS feed from: {rss_feed_url}")
     try:
@@ -43,60 +52,93 @@ def download_latest_podcast_episode(rss_feed_url, download_directory="podcasts")
     logger.info(f"Found latest episode: {episode_title}")
     logger.info(f"Download URL: {episode_url}")
 
-    # Create the download directory if it doesn't exist
-    if not os.path.exists(download_directory):
-        try:
-            os.makedirs(download_directory)
-            logger.info(f"Created directory: {download_directory}")
-        except OSError as e:
-            logger.error(f"Error creating directory {download_directory}: {e}")
-            return None
-
     # Construct the filename
     # Sanitize the title to create a valid filename
-    import re
     filename = re.sub(r'[<>:"/\\|?*!]', '', episode_title).strip()
-    
+
     # Get file extension from the URL, removing any query parameters
-    from urllib.parse import urlparse
     parsed_url = urlparse(episode_url)
     path_without_query = parsed_url.path
     file_extension = os.path.splitext(path_without_query)[1]
-    
+
     if not file_extension:
         # Fallback if extension is not in URL, e.g., .mp3
         file_extension = ".mp3"
-    
-    file_path = os.path.join(download_directory, f"{filename}{file_extension}")
-
-    is_new_download = False
-    if os.path.exists(file_path):
-        logger.info(f"File already exists: {file_path}. Skipping download.")
-    else:
-        logger.info(f"Downloading '{episode_title}' to '{file_path}'...")
-        try:
-            response = requests.get(episode_url, stream=True)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            logger.info(f"Successfully downloaded: {file_path}")
-            is_new_download = True
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error downloading episode: {e}")
-            return None # Indicate failure to download
-        except IOError as e:
-            logger.error(f"Error writing episode to file {file_path}: {e}")
-            return None
-
-    published_date = getattr(latest_episode, 'published', None)
 
     return {
         "episode_title": episode_title,
         "episode_url": episode_url,
-        "file_path": file_path,
-        "is_new_download": is_new_download,
-        "published_date": published_date
+        "file_path": os.path.join(download_directory, f"{filename}{file_extension}"),
+        "published_date": getattr(latest_episode, 'published', None)
     }
+
+def remove_partial_download(partial_path):
+    try:
+        os.remove(partial_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove partial download {partial_path}: {e}")
+
+def download_episode(episode_url, file_path):
+    """
+    Downloads an episode's audio to file_path, unless it is already there.
+
+    Returns:
+        bool: True if the file was downloaded, False if it already existed, or None on failure.
+    """
+    # Create the download directory if it doesn't exist
+    download_directory = os.path.dirname(file_path)
+    if download_directory and not os.path.exists(download_directory):
+        try:
+            os.makedirs(download_directory)
+            logger.info(f"Created directory: {download_directory}")
+        except OSError as e:
+            logger.error(f"Error creating directory {download_directory}: {e}")
+            return None
+
+    if os.path.exists(file_path):
+        logger.info(f"File already exists: {file_path}. Skipping download.")
+        return False
+
+    # Audio is streamed to a .part file and only moved into place once complete, so a
+    # downloader that dies mid-transfer never leaves a truncated file that looks finished.
+    # A .part file left by such a downloader is overwritten by whichever worker takes over.
+    partial_path = file_path + PARTIAL_SUFFIX
+    logger.info(f"Downloading '{episode_url}' to '{file_path}'...")
+    try:
+        response = requests.get(episode_url, stream=True)
+        response.raise_for_status()  # Raise an exception for HTTP errors
+
+        with open(partial_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=8192):
+                f.write(chunk)
+        os.replace(partial_path, file_path)
+        logger.info(f"Successfully downloaded: {file_path}")
+        return True
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error downloading episode: {e}")
+        remove_partial_download(partial_path)
+        return None # Indicate failure to download
+    except IOError as e:
+        logger.error(f"Error writing episode to file {file_path}: {e}")
+        remove_partial_download(partial_path)
+        return None
+
+def download_latest_podcast_episode(rss_feed_url, download_directory="podcasts"):
+    """
+    Downloads the latest episode from a given podcast RSS feed.
+
+    Args:
+        rss_feed_url (str): The URL of the podcast's RSS feed.
+        download_directory (str): The directory where the podcast episode will be saved.
+    """
+    episode = discover_latest_episode(rss_feed_url, download_directory)
+    if not episode:
+        return None
+
+    is_new_download = download_episode(episode["episode_url"], episode["file_path"])
+    if is_new_download is None:
+        return None
+    return dict(episode, is_new_download=is_new_download)
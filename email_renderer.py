@@ -0,0 +1,76 @@
+import os
+import functools
+import logging
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+from summary_renderer import render_summary_html
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SUMMARY_TEMPLATE = "email_summary_template.html"
+DIGEST_TEMPLATE = "email_digest_template.html"
+
+@functools.lru_cache(maxsize=None)
+def get_environment():
+    """
+    Returns the shared Jinja environment used for email templates.
+
+    The environment is independent of the Flask app, so sending email does not import
+    the web module. Templates are compiled on first use and never re-checked on disk.
+    """
+    return Environment(
+        loader=FileSystemLoader(TEMPLATES_DIRECTORY),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+    )
+
+def get_template(name):
+    """Returns a compiled email template from the shared environment."""
+    return get_environment().get_template(name)
+
+def summary_to_html(summary_content):
+    """
+    Returns a summary's HTML: summary_content as is if it is Markup (a summary's stored,
+    already-rendered HTML), otherwise rendered from Markdown.
+    """
+    return summary_content if isinstance(summary_content, Markup) else render_summary_html(summary_content)
+
+# typed, so Markup and Markdown with the same text are cached separately
+@functools.lru_cache(maxsize=32, typed=True)
+def render_summary_email(podcast_name, episode_title, published_date, summary_content):
+    """
+    Renders the HTML body of an episode summary email. summary_content is Markdown, or
+    the summary's stored HTML as Markup.
+
+    Results are cached, so an episode's email is rendered once and the same HTML is
+    reused for every recipient it is sent to.
+    """
+    logger.info(f"Rendering summary email for '{podcast_name} - {episode_title}'")
+    return get_template(SUMMARY_TEMPLATE).render(
+        podcast_name=podcast_name,
+        episode_title=episode_title,
+        published_date=published_date,
+        summary_content=summary_to_html(summary_content)
+    )
+
+def render_digest_email(entries):
+    """
+    Renders the HTML body of a digest email covering several episode summaries.
+
+    Args:
+        entries (list): Dicts with podcast_name, episode_title, published_date and
+            summary_text (Markdown) for each episode in the digest, and summary_html if
+            the summary has been rendered already.
+    """
+    logger.info(f"Rendering digest email of {len(entries)} episodes")
+    return get_template(DIGEST_TEMPLATE).render(entries=[
+        {
+            "podcast_name": entry["podcast_name"],
+            "episode_title": entry["episode_title"],
+            "published_date": entry.get("published_date"),
+            "summary_content": entry.get("summary_html") or render_summary_html(entry["summary_text"]),
+        }
+        for entry in entries
+    ])
@@ -0,0 +1,83 @@
+import os
+import gzip
+import zlib
+import functools
+from datetime import datetime, timezone
+from flask import Response, make_response, request
+import database_manager
+
+try:
+    import brotli # Optional: preferred over gzip by browsers that accept it
+except ImportError:
+    brotli = None
+
+# Responses of these types and at least this size are compressed for clients that accept it.
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json"}
+MIN_COMPRESS_BYTES = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Part of every ETag, so pages are re-rendered after a restart that may have changed templates.
+BOOT_ID = os.urandom(4).hex()
+
+def conditional(view):
+    """
+    Makes a view's responses revalidate against the database's data version: they carry
+    an ETag and Last-Modified, and a request whose validators still match gets a bodiless
+    304 without the view running at all.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = database_manager.get_data_version_info()
+        if version is None:
+            return view(*args, **kwargs)
+        etag = f"{version['version']}-{BOOT_ID}"
+        last_modified = datetime.fromtimestamp(version['modified_epoch'], timezone.utc)
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = request.if_modified_since is not None and request.if_modified_since >= last_modified
+        response = Response(status=304) if not_modified else make_response(view(*args, **kwargs))
+        if response.status_code in (200, 304):
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True # Always revalidate, which is cheap
+        return response
+    return wrapper
+
+def gzip_stream(chunks):
+    """Gzips a streamed response body chunk by chunk."""
+    compressor = zlib.compressobj(GZIP_LEVEL, wbits=31) # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def compress_response(response):
+    """
+    Compresses HTML and JSON responses with brotli or gzip, as the client accepts.
+    Streamed responses are gzipped as they stream.
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.is_streamed:
+        if 'gzip' in request.accept_encodings:
+            response.response = gzip_stream(response.response)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.headers.pop('Content-Length', None)
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    if brotli is not None and 'br' in request.accept_encodings:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -1,29 +1,366 @@
 import os
 import json
 import time
+import queue
+import socket
+import argparse
+import threading
 import logging
-from download_podcast import download_latest_podcast_episode
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from markupsafe import Markup
+from download_podcast import discover_latest_episode, download_episode
 from transcribe_podcast import transcribe_audio
-from summarize_podcast import summarize_text
-from send_email import send_email
+from summarize_podcast import summarize_transcript, summarize_variants, strip_summary_label, parse_variant
+from send_email import send_email, email_retry_delay, AHASEND_MAX_RECIPIENTS, MAX_EMAIL_ATTEMPTS
 import database_manager
+from digest import deliver_digests
+from retention import run_retention
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Upper bound on outbox rows fetched per delivery run.
+OUTBOX_BATCH_LIMIT = 1000
+# Failed pipeline stages (transcription, summarization, ...) back off from five minutes up to six hours.
+JOB_RETRY_BASE_SECONDS = 5 * 60
+JOB_RETRY_MAX_SECONDS = 6 * 60 * 60
+MAX_JOB_ATTEMPTS = 5
+
+# Workers lease a job while running one of its stages, renewing the lease with a heartbeat.
+# A worker that dies stops renewing, and its job is taken over once the lease expires.
+LEASE_SECONDS = 2 * 60
+HEARTBEAT_SECONDS = 30
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+WORKER_IDLE_SECONDS = 5
+POLL_INTERVAL_SECONDS = 5 * 60
+OUTBOX_INTERVAL_SECONDS = 60
+DIGEST_INTERVAL_SECONDS = 5 * 60
+RETENTION_INTERVAL_SECONDS = 24 * 60 * 60
+
+# Worker roles, and the pipeline stage each one picks jobs up from.
+WORKER_ROLES = ["poller", "downloader", "transcriber", "summarizer", "mailer", "janitor"]
+ROLE_STAGES = {
+    "downloader": "discovered",
+    "transcriber": "downloaded",
+    "summarizer": "transcribed",
+    "mailer": "summarized",
+}
+
+# Run in a single process, the pipeline gives each stage its own pool of threads, sized
+# to the resource the stage uses (the network, the GPU running Whisper, the summarizer
+# LLM, the mail API). Stages hand jobs on through bounded queues, so a stage that falls
+# behind blocks the stages feeding it rather than letting work pile up.
+STAGE_POOL_SIZES = {
+    "downloader": 4,
+    "transcriber": 1,
+    "summarizer": 2,
+    "mailer": 2,
+}
+STAGE_QUEUE_SIZE = 4
+
 
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 import atexit
 
-def process_podcasts():
+class PipelineStageError(Exception):
+    """Raised when a pipeline stage cannot be completed and should be retried later."""
+
+def get_recipients(config):
+    """Returns the subscribers to email for a podcast, as dicts with email and summary_variant."""
+    subscribers = database_manager.get_subscribers(config["id"]) if config.get("id") else []
+    if not subscribers:
+        # Podcasts without subscriptions email their configured (or the default) recipient
+        subscribers = [{"email": config.get("recipient_email"), "summary_variant": config.get("summary_variant")}]
+    return subscribers
+
+def transcribe_stage(job, config):
+    transcription_file_path = transcribe_audio(job["audio_filepath"])
+    if not transcription_file_path:
+        raise PipelineStageError(f"Could not transcribe episode: {job['title']}")
+    return {"transcription_filepath": transcription_file_path}
+
+def requested_summary_variants(config, title):
+    """Returns the valid summary variants a podcast's subscribers ask for, sorted."""
+    requested_variants = []
+    for summary_variant in sorted({s["summary_variant"] for s in get_recipients(config) if s.get("summary_variant")}):
+        try:
+            parse_variant(summary_variant)
+            requested_variants.append(summary_variant)
+        except ValueError as e:
+            # One bad subscription mustn't hold up the episode for everyone; it gets the full summary
+            logging.warning(f"Skipping summary variant for '{title}' ({e}); its subscribers get the full summary instead.")
+    return requested_variants
+
+def summarize_episode(episode_url, title, transcription_file_path, config, summary=None):
+    """
+    Summarizes an episode in full and in each summary variant its podcast's subscribers
+    ask for, and stores the variants in place of any from an earlier summary. Used by
+    the pipeline and when the web app re-summarizes an episode.
+
+    Args:
+        summary (str): A full summary already produced (e.g. streamed to a browser), so
+            only the variants need generating.
+
+    Returns:
+        str: The full summary, or None if it could not be produced.
+    """
+    requested_variants = requested_summary_variants(config, title)
+    if summary is None:
+        # The full summary and the variants share one map pass over the transcript, so each costs only a reduce step
+        summary, variants = summarize_transcript(transcription_file_path, requested_variants)
+        if not summary:
+            return None
+    else:
+        summary = strip_summary_label(summary)
+        variants = summarize_variants(transcription_file_path, requested_variants) if requested_variants else {}
+    database_manager.replace_summary_variants(episode_url, variants)
+    for summary_variant in set(requested_variants) - set(variants):
+        logging.warning(f"Could not produce '{summary_variant}' summary for {title}; sending the full summary instead.")
+    return summary
+
+def summarize_stage(job, config):
+    summary = summarize_episode(job["episode_url"], job["title"], job["transcription_filepath"], config)
+    if not summary:
+        raise PipelineStageError(f"Could not summarize episode: {job['title']}")
+    return {"summary_text": summary}
+
+def email_stage(job, config):
+    podcast_name = config.get("name", "Unknown Podcast")
+    summary = job["summary_text"]
+    transcription_file_path = job["transcription_filepath"]
+    episode_data = {
+        "podcast_url": job["rss_feed_url"],
+        "episode_url": job["episode_url"],
+        "title": job["title"],
+        "published_date": job["published_date"],
+        "audio_filepath": job["audio_filepath"],
+        "transcription_filepath": transcription_file_path,
+        "summary_filepath": os.path.splitext(transcription_file_path)[0] + ".summary.txt",
+        "summary_text": summary
+    }
+    # Record the episode before emailing, so an email outage never causes it to be reprocessed.
+    # It may already be recorded if a previous attempt stopped part-way through this stage.
+    if not database_manager.add_episode(episode_data) and not database_manager.episode_exists(job["episode_url"]):
+        raise PipelineStageError(f"Failed to record episode in database: {job['title']}")
+    database_manager.index_transcript(job["episode_url"], transcription_file_path)
+
+    # Fan out to every subscriber; deliver_outbox batches recipients of identical emails.
+    # Re-queuing after a partial attempt is harmless, as the outbox holds one email per recipient.
+    subscribers = get_recipients(config)
+    summaries = database_manager.get_summary_variants(job["episode_url"])
+    summaries_html = database_manager.get_summary_variants_html(job["episode_url"])
+    episode = database_manager.get_episode_by_url(job["episode_url"])
+    summary_html = database_manager.get_summary_html(episode) if episode else None
+    for subscriber in subscribers:
+        database_manager.enqueue_email({
+            "episode_url": job["episode_url"],
+            "recipient_email": subscriber["email"],
+            "subject": f"Summacast: {podcast_name} - {job['title']}",
+            "podcast_name": podcast_name,
+            "episode_title": job["title"],
+            "published_date": job["published_date"],
+            "summary_text": summaries.get(subscriber.get("summary_variant"), summary),
+            "summary_html": summaries_html.get(subscriber.get("summary_variant"), summary_html)
+        })
+    logging.info(f"Episode '{job['title']}' processed, added to database and queued for {len(subscribers)} recipient(s).")
+    return {}
+
+def download_stage(job, config):
+    if download_episode(job["episode_url"], job["audio_filepath"]) is None:
+        raise PipelineStageError(f"Could not download episode: {job['title']}")
+    return {"audio_filepath": job["audio_filepath"]}
+
+# The work that takes a job from each stage to the next.
+STAGE_HANDLERS = {
+    "discovered": download_stage,
+    "downloaded": transcribe_stage,
+    "transcribed": summarize_stage,
+    "summarized": email_stage,
+}
+
+def job_retry_delay(attempts):
+    """Returns the backoff before retrying a pipeline stage after the given number of failures."""
+    return timedelta(seconds=min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS))
+
+@contextmanager
+def hold_lease(job_id, worker_id):
+    """
+    Keeps a worker's lease on a job alive with periodic heartbeats while the enclosed
+    stage runs, however long transcription or summarization takes. If the worker dies,
+    the heartbeats stop and the lease expires, so another worker can take the job over.
+    """
+    stop = threading.Event()
+
+    def heartbeat():
+        try:
+            while not stop.wait(HEARTBEAT_SECONDS):
+                if not database_manager.renew_pipeline_job_lease(job_id, worker_id, LEASE_SECONDS):
+                    logging.warning(f"Worker {worker_id} lost its lease on pipeline job {job_id}.")
+                    return
+        finally:
+            database_manager.close_connection()
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+def run_stage(job, config, worker_id):
+    """
+    Runs the next stage of a job the worker has leased, then records the result and
+    releases the lease. Failed stages are retried with exponential backoff.
+
+    Returns:
+        dict: The advanced job, or None if the stage failed or the lease was lost.
+    """
+    stage = job["stage"]
+    next_stage = database_manager.PIPELINE_STAGES[database_manager.PIPELINE_STAGES.index(stage) + 1]
+    start_time = time.monotonic()
+    try:
+        with hold_lease(job["id"], worker_id):
+            fields = STAGE_HANDLERS[stage](job, config)
+    except Exception as e:
+        database_manager.record_stage_run(job["id"], next_stage, worker_id, time.monotonic() - start_time, str(e))
+        attempts = job["attempts"] + 1
+        if attempts >= MAX_JOB_ATTEMPTS:
+            database_manager.mark_pipeline_job_failed(job["id"], str(e), worker_id=worker_id)
+            logging.error(f"Giving up on episode '{job['title']}' at stage '{next_stage}' after {attempts} attempts: {e}")
+        else:
+            next_attempt_at = datetime.now() + job_retry_delay(attempts)
+            database_manager.mark_pipeline_job_failed(job["id"], str(e), next_attempt_at, worker_id=worker_id)
+            logging.warning(f"{e} (attempt {attempts}); retrying at {next_attempt_at}.")
+        return None
+    database_manager.record_stage_run(job["id"], next_stage, worker_id, time.monotonic() - start_time)
+    return database_manager.advance_pipeline_job(job["id"], next_stage, fields, worker_id)
+
+class StagedPipeline:
+    """
+    Runs pipeline jobs through per-stage thread pools connected by bounded queues, so
+    every stage works on a different episode at once and throughput approaches that of
+    the slowest stage. A worker that finishes a stage hands the job to the next stage's
+    queue, blocking while that queue is full, so backpressure flows upstream.
+
+    Each stage is run with the job leased from the database, as role workers do, and is
+    recorded before the job moves on, so an interrupted job resumes from its last
+    completed stage and the pipeline can run alongside role workers in other processes.
+    """
+
+    def __init__(self, worker_id=None, pool_sizes=None, queue_size=STAGE_QUEUE_SIZE):
+        self.worker_id = worker_id or WORKER_ID
+        self.pool_sizes = dict(STAGE_POOL_SIZES, **(pool_sizes or {}))
+        if min(self.pool_sizes.values()) < 1:
+            raise ValueError(f"Every stage needs at least one worker: {self.pool_sizes}")
+        self.queues = {stage: queue.Queue(maxsize=queue_size) for stage in STAGE_HANDLERS}
+        self.active = set() # Jobs queued for, or running, a stage
+        self.idle = threading.Condition()
+        self.threads = []
+
+    def start(self):
+        for role, stage in ROLE_STAGES.items():
+            for i in range(self.pool_sizes[role]):
+                thread = threading.Thread(target=self.stage_worker, args=(stage,), name=f"{role}-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        logging.info(f"Pipeline {self.worker_id} started with {', '.join(f'{size} {role}(s)' for role, size in self.pool_sizes.items())}.")
+
+    def submit(self, job, config=None):
+        """
+        Queues a job for its next stage, with its podcast config (looked up if not given),
+        unless it is already in the pipeline or has no stage left to run. Blocks while
+        the stage's queue is full.
+
+        Returns:
+            bool: True if the job was queued.
+        """
+        if not job or job["status"] != "pending" or job["stage"] not in self.queues:
+            return False
+        with self.idle:
+            if job["id"] in self.active:
+                return False
+            self.active.add(job["id"])
+        self.queues[job["stage"]].put((job, config))
+        return True
+
+    def finish(self, job_id):
+        with self.idle:
+            self.active.discard(job_id)
+            self.idle.notify_all()
+
+    def stage_worker(self, stage):
+        try:
+            while (item := self.queues[stage].get()) is not None:
+                job, config = item
+                try:
+                    self.run(job, config)
+                except Exception:
+                    logging.exception(f"Pipeline worker failed on job {job['id']}")
+                    self.finish(job["id"])
+        finally:
+            database_manager.close_connection()
+
+    def run(self, job, config):
+        """Runs a job's next stage, then hands it on to the following stage or lets it leave the pipeline."""
+        claimed = database_manager.claim_pipeline_job([job["stage"]], self.worker_id, LEASE_SECONDS, datetime.now(), job_id=job["id"])
+        if claimed is None:
+            self.finish(job["id"]) # Not due yet, or being worked on elsewhere
+            return
+        config = config or get_job_config(claimed)
+        advanced = run_stage(claimed, config, self.worker_id)
+        if advanced and advanced["status"] == "pending" and advanced["stage"] in self.queues:
+            self.queues[advanced["stage"]].put((advanced, config)) # Blocks while the next stage is backed up
+        else:
+            self.finish(job["id"])
+
+    def wait_until_idle(self):
+        """Blocks until every job in the pipeline has left it."""
+        with self.idle:
+            self.idle.wait_for(lambda: not self.active)
+
+    def stop(self):
+        """Lets the jobs already queued finish, then stops the workers, upstream stages first."""
+        for role, stage in ROLE_STAGES.items():
+            for _ in range(self.pool_sizes[role]):
+                self.queues[stage].put(None)
+            for thread in self.threads:
+                if thread.name.startswith(f"{role}-"):
+                    thread.join()
+
+def get_job_config(job):
+    """Returns the podcast config for a job, or a stand-in if its podcast has since been deleted."""
+    config = database_manager.get_podcast_config_by_id(job["podcast_id"]) if job.get("podcast_id") else None
+    return config or {"name": job["podcast_name"], "rss_feed_url": job["rss_feed_url"]}
+
+def process_podcasts(pool_sizes=None):
+    """
+    Checks every podcast for a new episode and runs new and resumable jobs through a
+    StagedPipeline, so episodes download, transcribe and summarize side by side.
+    Returns once every job has finished or failed its current stage.
+    """
     database_manager.create_table() # Ensure database table exists
     podcast_configs = database_manager.get_all_podcast_configs()
     if not podcast_configs:
         logging.error("No podcast configurations loaded. Skipping podcast processing.")
         return
 
+    pipeline = StagedPipeline(pool_sizes=pool_sizes)
+    pipeline.start()
+    try:
+        submit_podcast_jobs(podcast_configs, pipeline)
+        pipeline.wait_until_idle()
+    finally:
+        pipeline.stop()
+
+def submit_podcast_jobs(podcast_configs, pipeline):
+    """
+    Finds each podcast's latest episode and submits it, if new, to the pipeline's
+    downloaders, then submits any other jobs that are due to resume.
+    """
     for config in podcast_configs:
         podcast_name = config.get("name", "Unknown Podcast")
         rss_feed_url = config.get("rss_feed_url")
@@ -33,65 +370,191 @@ def process_podcasts():
             continue
 
         logging.info(f"\nChecking for new episodes for '{podcast_name}' from {rss_feed_url}...")
-        episode_info = download_latest_podcast_episode(rss_feed_url)
+        episode_info = discover_latest_episode(rss_feed_url)
+        if config.get("id"):
+            database_manager.record_feed_poll(config["id"], None if episode_info else "No episode information returned")
 
         if episode_info:
             episode_id = episode_info["episode_url"]
             if not database_manager.episode_exists(episode_id):
-                if episode_info["is_new_download"]:
+                job = database_manager.get_pipeline_job_by_url(episode_id)
+                if job is None:
                     logging.info(f"New episode detected for '{podcast_name}': {episode_info['episode_title']}")
-
-                    audio_file_path = episode_info["file_path"]
-                    transcription_file_path = transcribe_audio(audio_file_path)
-
-                    if transcription_file_path:
-                        summary = summarize_text(transcription_file_path)
-                        if summary:
-                            if summary.lower().startswith('summary:'):
-                                summary = summary[len('summary:'):].lstrip()
-                            subject = f"Summacast: {podcast_name} - {episode_info['episode_title']}"
-                            text_body = summary
-                            recipient_email = config.get("recipient_email")
-                            if send_email(subject, text_body, summary, podcast_name, episode_info['episode_title'], episode_info['published_date'], recipient_email):
-                                episode_data = {
-                                    "podcast_url": rss_feed_url,
-                                    "episode_url": episode_id,
-                                    "title": episode_info["episode_title"],
-                                    "published_date": episode_info["published_date"],
-                                    "audio_filepath": audio_file_path,
-                                    "transcription_filepath": transcription_file_path,
-                                    "summary_filepath": os.path.splitext(transcription_file_path)[0] + ".summary.txt",
-                                    "summary_text": summary
-                                }
-                                database_manager.add_episode(episode_data)
-                                logging.info(f"Episode '{episode_info['episode_title']}' processed and added to database.")
-                            else:
-                                logging.error(f"Failed to send email for episode: {episode_info['episode_title']}")
-                        else:
-                            logging.warning(f"Could not summarize episode: {episode_info['episode_title']}")
-                    else:
-                        logging.warning(f"Could not transcribe episode: {episode_info['episode_title']}")
-                else:
-                    logging.info(f"Latest episode for '{podcast_name}' ({episode_info['episode_title']}) already exists locally.")
+                    job = database_manager.create_pipeline_job({
+                        "episode_url": episode_id,
+                        "podcast_id": config.get("id"),
+                        "podcast_name": podcast_name,
+                        "rss_feed_url": rss_feed_url,
+                        "title": episode_info["episode_title"],
+                        "published_date": episode_info["published_date"],
+                        "audio_filepath": episode_info["file_path"],
+                    })
+                pipeline.submit(job, config) # Blocks while the downloaders are backed up
             else:
                 logging.info(f"Episode '{episode_info['episode_title']}' for '{podcast_name}' already processed (found in DB).")
         else:
-            logging.warning(f"No episode information returned for '{podcast_name}' or an error occurred during download.")
+            logging.warning(f"No episode information returned for '{podcast_name}' or an error occurred while reading its feed.")
 
-if __name__ == "__main__":
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(process_podcasts, IntervalTrigger(minutes=5)) # Run every 5 minutes
-    scheduler.start()
-    logging.info("Scheduler started. Press Ctrl+C to exit.")
+    # Resume jobs left part-way through by a crash, and retry failed stages whose backoff has elapsed
+    configs_by_url = {config.get("rss_feed_url"): config for config in podcast_configs}
+    for job in database_manager.get_due_pipeline_jobs(datetime.now()):
+        config = configs_by_url.get(job["rss_feed_url"]) or {"name": job["podcast_name"], "rss_feed_url": job["rss_feed_url"]}
+        if pipeline.submit(job, config):
+            logging.info(f"Resuming episode '{job['title']}' after stage '{job['stage']}'.")
 
-    # Shut down the scheduler when exiting the app
-    atexit.register(lambda: scheduler.shutdown())
+def poll_feeds():
+    """
+    Finds each podcast's latest episode and queues any new one for download.
 
+    Returns:
+        int: The number of new episodes queued.
+    """
+    queued = 0
+    for config in database_manager.get_all_podcast_configs():
+        if not config.get("rss_feed_url"):
+            continue
+        episode_info = discover_latest_episode(config["rss_feed_url"])
+        database_manager.record_feed_poll(config["id"], None if episode_info else "No episode information returned")
+        if not episode_info or database_manager.episode_exists(episode_info["episode_url"]):
+            continue
+        if database_manager.get_pipeline_job_by_url(episode_info["episode_url"]) is None:
+            logging.info(f"New episode detected for '{config['name']}': {episode_info['episode_title']}")
+            database_manager.create_pipeline_job({
+                "episode_url": episode_info["episode_url"],
+                "podcast_id": config.get("id"),
+                "podcast_name": config.get("name"),
+                "rss_feed_url": config["rss_feed_url"],
+                "title": episode_info["episode_title"],
+                "published_date": episode_info["published_date"],
+                "audio_filepath": episode_info["file_path"],
+            })
+            queued += 1
+    return queued
+
+def work(role, worker_id):
+    """
+    Does one unit of work for a worker role.
+
+    Pollers, mailers and janitors run their periodic tasks at most once per interval across all
+    workers; downloaders, transcribers, summarizers and mailers each lease the next job
+    waiting at their stage.
+
+    Returns:
+        bool: True if there was work to do.
+    """
+    did_work = False
+    if role == "poller":
+        if database_manager.claim_periodic_task("poll_feeds", worker_id, POLL_INTERVAL_SECONDS):
+            poll_feeds()
+            did_work = True
+        return did_work
+    if role == "janitor":
+        if database_manager.claim_periodic_task("run_retention", worker_id, RETENTION_INTERVAL_SECONDS):
+            run_retention()
+            did_work = True
+        return did_work
+    if role == "mailer":
+        if database_manager.claim_periodic_task("deliver_outbox", worker_id, OUTBOX_INTERVAL_SECONDS):
+            deliver_outbox()
+            did_work = True
+        if database_manager.claim_periodic_task("deliver_digests", worker_id, DIGEST_INTERVAL_SECONDS):
+            deliver_digests()
+            did_work = True
+
+    job = database_manager.claim_pipeline_job([ROLE_STAGES[role]], worker_id, LEASE_SECONDS)
+    if job:
+        run_stage(job, get_job_config(job), worker_id)
+        did_work = True
+    return did_work
+
+def run_worker(roles, worker_id=None, drain=False):
+    """
+    Runs a worker process for the given roles until interrupted, or with drain=True until
+    there is no work left for it. Any number of workers, on any number of machines sharing
+    the database, can run side by side; leases ensure each job stage runs once.
+    """
+    worker_id = worker_id or WORKER_ID
+    logging.info(f"Worker {worker_id} started with roles: {', '.join(roles)}")
+    while True:
+        did_work = [work(role, worker_id) for role in roles]
+        if not any(did_work):
+            if drain:
+                return
+            time.sleep(WORKER_IDLE_SECONDS)
+
+def deliver_outbox(now=None):
+    """
+    Sends every due email in the outbox, rescheduling failures with exponential backoff.
+    Runs independently of process_podcasts, so an email outage never blocks or repeats
+    transcription and summarization. Recipients of identical emails (same episode and
+    summary) are batched into as few AhaSend requests as its recipient limit allows.
+    """
+    now = now or datetime.now()
+    batches = {}
+    for email in database_manager.get_due_emails(now, limit=OUTBOX_BATCH_LIMIT):
+        batches.setdefault((email["episode_url"], email["subject"], email["summary_text"]), []).append(email)
+
+    for emails in batches.values():
+        for start in range(0, len(emails), AHASEND_MAX_RECIPIENTS):
+            batch = emails[start:start + AHASEND_MAX_RECIPIENTS]
+            first = batch[0]
+            recipients = [email["recipient_email"] or None for email in batch]
+            # Emails carry the summary's HTML rendered when it was stored; older ones render it from Markdown
+            summary_content = Markup(first["summary_html"]) if first.get("summary_html") else first["summary_text"]
+            if send_email(first["subject"], first["summary_text"], summary_content, first["podcast_name"], first["episode_title"], first["published_date"], recipients):
+                database_manager.mark_emails_sent([email["id"] for email in batch])
+                logging.info(f"Delivered email '{first['subject']}' to {len(batch)} recipient(s).")
+                continue
+
+            for email in batch:
+                attempts = email["attempts"] + 1
+                if attempts >= MAX_EMAIL_ATTEMPTS:
+                    database_manager.mark_email_failed(email["id"], "send_email failed")
+                    logging.error(f"Giving up on email '{email['subject']}' to {email['recipient_email'] or 'default recipient'} after {attempts} attempts.")
+                else:
+                    next_attempt_at = now + email_retry_delay(attempts)
+                    database_manager.mark_email_failed(email["id"], "send_email failed", next_attempt_at)
+                    logging.warning(f"Failed to send email '{email['subject']}' to {email['recipient_email'] or 'default recipient'} (attempt {attempts}); retrying at {next_attempt_at}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Summacast pipeline.")
+    parser.add_argument("--role", action="append", choices=WORKER_ROLES,
+                        help="Run as a worker with this role (repeatable). Without it, runs the whole pipeline on a schedule.")
+    parser.add_argument("--worker-id", help="Identifies this worker in job leases (default: host:pid).")
+    parser.add_argument("--drain", action="store_true", help="Exit once there is no work left for this worker's roles.")
+    parser.add_argument("--pool", action="append", default=[], metavar="ROLE=N",
+                        help="Without --role, run N threads for this pipeline stage (repeatable; e.g. transcriber=2).")
+    args = parser.parse_args()
     try:
-        # This is needed to keep the main thread alive for the scheduler to run
-        while True:
-            time.sleep(2)
-    except (KeyboardInterrupt, SystemExit):
-        pass
+        stage_pool_sizes = {role: int(size) for role, size in (pool.split("=", 1) for pool in args.pool)}
+    except ValueError:
+        parser.error("--pool must be given as ROLE=N")
+    if set(stage_pool_sizes) - set(STAGE_POOL_SIZES):
+        parser.error(f"--pool roles must be among: {', '.join(STAGE_POOL_SIZES)}")
+    if any(size < 1 for size in stage_pool_sizes.values()):
+        parser.error("--pool sizes must be at least 1")
+
+    if args.role:
+        database_manager.create_table() # Ensure database tables exist
+        try:
+            run_worker(args.role, args.worker_id, args.drain)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+    else:
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(process_podcasts, IntervalTrigger(minutes=5), kwargs={"pool_sizes": stage_pool_sizes}) # Run every 5 minutes
+        scheduler.add_job(deliver_outbox, IntervalTrigger(minutes=1)) # Retry queued emails every minute
+        scheduler.add_job(deliver_digests, IntervalTrigger(minutes=5)) # Send hourly/daily digests as they fall due
+        scheduler.add_job(run_retention, IntervalTrigger(hours=24)) # Expire old data and compact the database daily
+        scheduler.start()
+        logging.info("Scheduler started. Press Ctrl+C to exit.")
 
+        # Shut down the scheduler when exiting the app
+        atexit.register(lambda: scheduler.shutdown())
 
+        try:
+            # This is needed to keep the main thread alive for the scheduler to run
+            while True:
+                time.sleep(2)
+        except (KeyboardInterrupt, SystemExit):
+            pass
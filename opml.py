@@ -0,0 +1,173 @@
+import sys
+import argparse
+import logging
+import xml.etree.ElementTree as ElementTree
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from concurrent.futures import ThreadPoolExecutor
+import feedparser
+import requests
+import database_manager
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+# Feeds in an imported OPML file are fetched and validated this many at a time, each
+# given this long to respond and read up to this many bytes.
+VALIDATION_WORKERS = 8
+FEED_TIMEOUT_SECONDS = 15
+MAX_FEED_BYTES = 10 * 1024 * 1024
+
+class FeedValidationError(Exception):
+    """Raised when a feed can't be fetched, isn't a feed, or has no audio episodes."""
+
+def parse_opml(opml_text):
+    """
+    Reads the feeds listed in an OPML document, including those in nested outlines
+    (folders). A feed listed twice is returned once.
+
+    Returns:
+        list: Dicts with name and rss_feed_url, in document order.
+
+    Raises:
+        ValueError: If the document isn't OPML.
+    """
+    try:
+        root = ElementTree.fromstring(opml_text)
+    except ElementTree.ParseError as e:
+        raise ValueError(f"Not a valid OPML file: {e}") from e
+    if root.tag != "opml" or root.find("body") is None:
+        raise ValueError("Not a valid OPML file: no <opml> document with a <body>")
+
+    feeds = {}
+    for outline in root.find("body").iter("outline"):
+        url = (outline.get("xmlUrl") or "").strip()
+        if url and url not in feeds:
+            feeds[url] = {"name": (outline.get("title") or outline.get("text") or url).strip(), "rss_feed_url": url}
+    return list(feeds.values())
+
+def export_opml(podcast_configs):
+    """Writes podcast configurations as an OPML 2.0 document, one outline per feed."""
+    root = ElementTree.Element("opml", version="2.0")
+    head = ElementTree.SubElement(root, "head")
+    ElementTree.SubElement(head, "title").text = "Summacast podcasts"
+    ElementTree.SubElement(head, "dateCreated").text = format_datetime(datetime.now(timezone.utc))
+    body = ElementTree.SubElement(root, "body")
+    for config in podcast_configs:
+        ElementTree.SubElement(body, "outline", type="rss", text=config["name"], title=config["name"],
+                               xmlUrl=config["rss_feed_url"])
+    ElementTree.indent(root)
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + ElementTree.tostring(root, encoding="unicode") + "\n"
+
+def fetch_feed(url):
+    """
+    Downloads a feed, reading at most MAX_FEED_BYTES.
+
+    Raises:
+        FeedValidationError: If the feed can't be fetched or is too large.
+    """
+    try:
+        with requests.get(url, timeout=FEED_TIMEOUT_SECONDS, stream=True) as response:
+            if response.status_code != 200:
+                raise FeedValidationError(f"HTTP {response.status_code}")
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > MAX_FEED_BYTES:
+                    raise FeedValidationError(f"Feed is larger than {MAX_FEED_BYTES} bytes")
+            return bytes(body)
+    except requests.RequestException as e:
+        raise FeedValidationError(f"Unreachable: {e}") from e
+
+def validate_feed(url):
+    """
+    Checks that a feed is reachable, parses as RSS or Atom and has episodes with audio
+    enclosures.
+
+    Returns:
+        str: The feed's title, or None if it has none.
+
+    Raises:
+        FeedValidationError: If the feed fails any check.
+    """
+    feed = feedparser.parse(fetch_feed(url))
+    if feed.bozo and not feed.entries:
+        raise FeedValidationError(f"Not a valid feed: {getattr(feed, 'bozo_exception', 'unparseable')}")
+    if not any(link.get("type", "").startswith("audio/") for entry in feed.entries for link in entry.get("links", [])):
+        raise FeedValidationError("No episodes with audio enclosures")
+    return feed.feed.get("title")
+
+def check_feed(feed):
+    """Validates one feed for import, returning its report entry."""
+    try:
+        title = validate_feed(feed["rss_feed_url"])
+        # Name feeds the OPML file left untitled after the feed itself
+        name = title if feed["name"] == feed["rss_feed_url"] and title else feed["name"]
+        return dict(feed, name=name, status="valid", error=None)
+    except FeedValidationError as e:
+        return dict(feed, status="invalid", error=str(e))
+    except Exception as e:
+        logger.exception(f"Unexpected error validating {feed['rss_feed_url']}")
+        return dict(feed, status="invalid", error=f"Validation failed: {e}")
+
+def import_opml(opml_text, workers=VALIDATION_WORKERS):
+    """
+    Imports the feeds in an OPML document. Feeds not already configured are validated
+    concurrently, at most workers at a time, and the valid ones are added in a single
+    transaction.
+
+    Returns:
+        list: A report entry per feed: a dict with name, rss_feed_url, status ("added",
+            "exists" or "invalid", or "failed" if the insert failed) and error.
+
+    Raises:
+        ValueError: If the document isn't OPML.
+    """
+    feeds = parse_opml(opml_text)
+    configured = {config["rss_feed_url"] for config in database_manager.get_all_podcast_configs()}
+    new_feeds = [feed for feed in feeds if feed["rss_feed_url"] not in configured]
+    logger.info(f"Validating {len(new_feeds)} of {len(feeds)} feeds from OPML ({len(feeds) - len(new_feeds)} already configured)")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        checked = {result["rss_feed_url"]: result for result in executor.map(check_feed, new_feeds)}
+
+    valid = [result for result in checked.values() if result["status"] == "valid"]
+    added = database_manager.add_podcast_configs(valid) if valid else 0
+    report = []
+    for feed in feeds:
+        result = checked.get(feed["rss_feed_url"])
+        if result is None:
+            report.append(dict(feed, status="exists", error=None))
+        elif result["status"] == "valid":
+            report.append(dict(result, status="added" if added is not None else "failed",
+                               error=None if added is not None else "Could not save podcast"))
+        else:
+            report.append(result)
+    logger.info(f"Imported OPML: {sum(r['status'] == 'added' for r in report)} added, "
+                f"{sum(r['status'] == 'exists' for r in report)} already configured, "
+                f"{sum(r['status'] == 'invalid' for r in report)} invalid.")
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Import or export Summacast's podcast feeds as OPML.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Validate and add the feeds in an OPML file.")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--workers", type=int, default=VALIDATION_WORKERS)
+    export_parser = subparsers.add_parser("export", help="Write the configured feeds as OPML.")
+    export_parser.add_argument("-o", "--output", help="File to write (default: standard output).")
+    args = parser.parse_args()
+
+    database_manager.create_table()
+    if args.command == "import":
+        with open(args.file, "rb") as f:
+            opml_report = import_opml(f.read(), args.workers)
+        for entry in opml_report:
+            print(f"{entry['status']:8} {entry['name']} <{entry['rss_feed_url']}>" + (f": {entry['error']}" if entry['error'] else ""))
+    else:
+        opml_text = export_opml(database_manager.get_all_podcast_configs())
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(opml_text)
+        else:
+            sys.stdout.write(opml_text)
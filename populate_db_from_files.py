@@ -1,18 +1,117 @@
 import os
+import argparse
+import logging
+from pathlib import Path
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from concurrent.futures import ThreadPoolExecutor
 import database_manager
 
-def populate_db_from_files(podcasts_dir='podcasts', db_name='summacast.db'):
-    """Scans the specified directory and adds any subdirectories as podcasts to the database."""
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {".mp3", ".m4a", ".aac", ".ogg", ".opus", ".wav", ".flac"}
+TRANSCRIPT_SUFFIX = ".txt"
+SUMMARY_SUFFIX = ".summary.txt"
+# Episodes are inserted in transactions of this many, so a large archive never holds the write lock for long.
+IMPORT_BATCH_SIZE = 500
+IMPORT_WORKERS = 8
+
+def find_episode_files(podcast_path):
+    """
+    Walks a podcast's directory, pairing each audio file with the transcript and summary
+    that share its name (as written by transcribe_podcast and summarize_podcast).
+
+    Returns:
+        list: One dict per episode, with audio, transcript and summary paths (each may be None).
+    """
+    episodes = {}
+    for dirpath, _, filenames in os.walk(podcast_path):
+        for filename in filenames:
+            lower = filename.lower()
+            if lower.endswith(SUMMARY_SUFFIX):
+                kind, stem = "summary", filename[:-len(SUMMARY_SUFFIX)]
+            elif lower.endswith(TRANSCRIPT_SUFFIX):
+                kind, stem = "transcript", filename[:-len(TRANSCRIPT_SUFFIX)]
+            elif os.path.splitext(lower)[1] in AUDIO_EXTENSIONS:
+                kind, stem = "audio", os.path.splitext(filename)[0]
+            else:
+                continue
+            episode = episodes.setdefault(os.path.join(dirpath, stem), {"audio": None, "transcript": None, "summary": None})
+            episode[kind] = os.path.join(dirpath, filename)
+    # A lone summary isn't an episode; it needs audio or a transcript alongside it
+    return [dict(episode, stem=stem) for stem, episode in sorted(episodes.items()) if episode["audio"] or episode["transcript"]]
+
+def _read_text(filepath):
+    if not filepath:
+        return None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"Could not read {filepath}: {e}")
+        return None
+
+def load_episode(podcast_name, files):
+    """
+    Builds the database record for one episode found on disk, reading, hashing and
+    compressing its transcript. Runs on a worker thread.
+
+    Files carry no feed metadata, so the episode URL is the primary file's file:// URI and
+    the published date is that file's modification time.
+    """
+    primary = files["audio"] or files["transcript"]
+    transcript_text = _read_text(files["transcript"])
+    modified = datetime.fromtimestamp(os.path.getmtime(primary), timezone.utc)
+    return {
+        "podcast_url": podcast_name,
+        "episode_url": Path(primary).resolve().as_uri(),
+        "title": os.path.basename(files["stem"]),
+        "published_date": format_datetime(modified),
+        "audio_filepath": files["audio"],
+        "transcription_filepath": files["transcript"],
+        "summary_filepath": files["summary"],
+        "summary_text": _read_text(files["summary"]),
+        "transcript": database_manager.prepare_artifact(transcript_text) if transcript_text else None,
+    }
+
+def populate_db_from_files(podcasts_dir='podcasts', db_name='summacast.db', workers=IMPORT_WORKERS):
+    """
+    Imports an existing podcasts/ tree: each subdirectory becomes a podcast config and each
+    audio file (with its transcript and summary, if present) becomes an episode. Files are
+    scanned and read in parallel and written in batched transactions; re-running skips
+    podcasts and episodes already imported.
+
+    Returns:
+        dict: The number of podcasts and episodes added, or None if the directory is missing.
+    """
     database_manager.DATABASE_NAME = db_name
     if not os.path.exists(podcasts_dir):
         print(f"Directory not found: {podcasts_dir}")
-        return
+        return None
+    database_manager.create_table()
+
+    podcast_names = sorted(name for name in os.listdir(podcasts_dir) if os.path.isdir(os.path.join(podcasts_dir, name)))
+    # We don't have the RSS feed URL, so we'll use the podcast name as a placeholder
+    podcasts_added = database_manager.add_podcast_configs(
+        [{"name": name, "rss_feed_url": name, "recipient_email": ""} for name in podcast_names])
+
+    episodes_added = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        podcast_files = executor.map(find_episode_files, [os.path.join(podcasts_dir, name) for name in podcast_names])
+        jobs = [(name, files) for name, episodes in zip(podcast_names, podcast_files) for files in episodes]
+        # Load one batch at a time, so memory stays bounded however large the archive is
+        for start in range(0, len(jobs), IMPORT_BATCH_SIZE):
+            batch = list(executor.map(lambda job: load_episode(*job), jobs[start:start + IMPORT_BATCH_SIZE]))
+            episodes_added += database_manager.add_episodes(batch) or 0
 
-    for podcast_name in os.listdir(podcasts_dir):
-        podcast_path = os.path.join(podcasts_dir, podcast_name)
-        if os.path.isdir(podcast_path):
-            # We don't have the RSS feed URL, so we'll use the podcast name as a placeholder
-            database_manager.add_podcast_config(podcast_name, podcast_name, "")
+    print(f"Imported {podcasts_added or 0} podcasts and {episodes_added} episodes from {podcasts_dir}.")
+    return {"podcasts": podcasts_added or 0, "episodes": episodes_added}
 
 if __name__ == '__main__':
-    populate_db_from_files()
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Import an existing podcasts directory into the Summacast database.")
+    parser.add_argument("--podcasts-dir", default="podcasts")
+    parser.add_argument("--db", default="summacast.db")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    args = parser.parse_args()
+    populate_db_from_files(args.podcasts_dir, args.db, args.workers)
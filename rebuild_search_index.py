@@ -0,0 +1,13 @@
+import logging
+import database_manager
+
+def rebuild_search_index(db_name='summacast.db'):
+    """Re-indexes every episode's title, summary and transcript for full-text search."""
+    database_manager.DATABASE_NAME = db_name
+    database_manager.create_table() # Ensure the search tables exist
+    indexed = database_manager.rebuild_search_index()
+    print(f"Search index rebuilt; indexed transcripts of {indexed} episodes.")
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    rebuild_search_index()
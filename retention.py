@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+from datetime import datetime, timedelta
+import database_manager
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+# How many days episodes keep each kind of data, unless their feed overrides it with
+# database_manager.set_retention_rule(). None means forever. Expired audio and
+# transcripts are deleted; an expired summary moves, with the rest of the episode, to
+# the archive database.
+DEFAULT_RETENTION_DAYS = {
+    "audio": 7,
+    "transcript": 365,
+    "summary": None,
+}
+
+# Files written next to a transcript (its summary, word timings and cached chunk
+# summaries), deleted along with it.
+TRANSCRIPT_SIDECAR_SUFFIXES = [".summary.txt", ".timings.json", ".chunks.json"]
+
+def get_retention_policy(podcast_id, rules):
+    """Returns the days each kind of data is kept for a podcast, given the overrides in rules."""
+    return dict(DEFAULT_RETENTION_DAYS, **rules.get(podcast_id, {}))
+
+def delete_file(filepath):
+    """Deletes a file if it exists, returning the number of bytes freed."""
+    if not filepath or not os.path.exists(filepath):
+        return 0
+    try:
+        size = os.path.getsize(filepath)
+        os.remove(filepath)
+        return size
+    except OSError as e:
+        logger.warning(f"Could not delete {filepath}: {e}")
+        return 0
+
+def delete_transcript_files(transcription_filepath):
+    """Deletes a transcript and the files written next to it, returning the number of bytes freed."""
+    if not transcription_filepath:
+        return 0
+    stem = os.path.splitext(transcription_filepath)[0]
+    return delete_file(transcription_filepath) + sum(delete_file(stem + suffix) for suffix in TRANSCRIPT_SIDECAR_SUFFIXES)
+
+def expire_audio(podcast_id, published_before):
+    """Deletes the audio files of a podcast's episodes published before the cutoff."""
+    deleted = bytes_freed = 0
+    while episodes := database_manager.get_expired_episodes(podcast_id, "audio", published_before):
+        bytes_freed += sum(delete_file(episode["audio_filepath"]) for episode in episodes)
+        if not database_manager.clear_episode_audio([episode["id"] for episode in episodes]):
+            break
+        deleted += len(episodes)
+    return deleted, bytes_freed
+
+def expire_transcripts(podcast_id, published_before):
+    """Deletes the transcripts of a podcast's episodes published before the cutoff."""
+    deleted = bytes_freed = 0
+    while episodes := database_manager.get_expired_episodes(podcast_id, "transcript", published_before):
+        bytes_freed += sum(delete_transcript_files(episode["transcription_filepath"]) for episode in episodes)
+        if not database_manager.delete_episode_transcripts([episode["id"] for episode in episodes]):
+            break
+        deleted += len(episodes)
+    return deleted, bytes_freed
+
+def archive_summaries(podcast_id, published_before):
+    """
+    Moves a podcast's episodes published before the cutoff to the archive database, and
+    deletes their local files; the archive keeps their transcripts.
+    """
+    archived = bytes_freed = 0
+    while episodes := database_manager.get_expired_episodes(podcast_id, "summary", published_before):
+        count = database_manager.archive_episodes([episode["id"] for episode in episodes])
+        if not count:
+            break
+        for episode in episodes:
+            bytes_freed += delete_file(episode["audio_filepath"]) + delete_transcript_files(episode["transcription_filepath"])
+        archived += count
+    return archived, bytes_freed
+
+RETENTION_ACTIONS = {
+    "audio": expire_audio,
+    "transcript": expire_transcripts,
+    "summary": archive_summaries,
+}
+
+def apply_retention(now=None):
+    """
+    Applies each feed's retention policy, deleting or archiving data that has outlived it.
+    Episodes whose podcast has been deleted follow the default policy.
+
+    Returns:
+        dict: Counts of audio files deleted, transcripts deleted and episodes archived,
+            and the bytes freed on disk.
+    """
+    now = now or datetime.now()
+    rules = database_manager.get_retention_rules()
+    counts = {"audio": 0, "transcript": 0, "summary": 0}
+    file_bytes_reclaimed = 0
+    podcast_ids = [config["id"] for config in database_manager.get_all_podcast_configs()] + [None]
+    for podcast_id in podcast_ids:
+        for kind, keep_days in get_retention_policy(podcast_id, rules).items():
+            if keep_days is None:
+                continue
+            published_before = int((now - timedelta(days=keep_days)).timestamp())
+            count, bytes_freed = RETENTION_ACTIONS[kind](podcast_id, published_before)
+            counts[kind] += count
+            file_bytes_reclaimed += bytes_freed
+    return {
+        "audio_files_deleted": counts["audio"],
+        "transcripts_deleted": counts["transcript"],
+        "episodes_archived": counts["summary"],
+        "file_bytes_reclaimed": file_bytes_reclaimed,
+    }
+
+def run_retention(now=None):
+    """
+    Applies the retention policies, then compacts the database, and records and logs a
+    report of what was removed, the bytes reclaimed and how long the run took.
+    """
+    started = datetime.now()
+    start_time = time.monotonic()
+    report = apply_retention(now)
+    report["database_bytes_reclaimed"] = database_manager.compact_database()
+    report["started_timestamp"] = started.isoformat()
+    report["duration_seconds"] = round(time.monotonic() - start_time, 3)
+    database_manager.record_retention_run(report)
+    logger.info(
+        f"Retention run: deleted {report['audio_files_deleted']} audio files and {report['transcripts_deleted']} transcripts, "
+        f"archived {report['episodes_archived']} episodes, reclaimed {report['file_bytes_reclaimed']} bytes on disk and "
+        f"{report['database_bytes_reclaimed']} bytes of database in {report['duration_seconds']}s."
+    )
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    database_manager.create_table()
+    run_retention()
@@ -2,37 +2,54 @@ import os
 import requests
 from dotenv import load_dotenv
 import logging
+from datetime import timedelta
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-from flask import render_template
-from app import app
-import markdown
+import email_renderer
+
+# AhaSend delivers a separate copy of the message to each entry in 'recipients', up to this many per request.
+AHASEND_MAX_RECIPIENTS = 100
+# Failed emails and digests are retried with backoff growing exponentially from one
+# minute up to six hours, and given up on after this many attempts.
+EMAIL_RETRY_BASE_SECONDS = 60
+EMAIL_RETRY_MAX_SECONDS = 6 * 60 * 60
+MAX_EMAIL_ATTEMPTS = 10
+
+def email_retry_delay(attempts):
+    """Returns the backoff before the next delivery attempt after the given number of failures."""
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS))
 
 def send_email(subject, text_body, summary_content, podcast_name, episode_title, published_date, recipient_email=None):
+    # Render the HTML email template (cached, so repeat sends of an episode reuse it)
+    html_body = email_renderer.render_summary_email(podcast_name, episode_title, published_date, summary_content)
+    return send_html_email(subject, html_body, recipient_email)
+
+def send_html_email(subject, html_body, recipient_email=None):
+    """
+    Sends an already-rendered HTML email through the AhaSend API.
+    recipient_email may be a single address or a list of up to AHASEND_MAX_RECIPIENTS
+    addresses, each of whom receives their own copy; empty entries mean the default recipient.
+    """
     api_key = os.getenv("AHASEND_API_KEY")
     sender_email = os.getenv("SENDER_EMAIL")
     default_recipient_email = os.getenv("RECIPIENT_EMAIL")
     sender_name = "Summacast" # Default sender name
 
-    recipient = recipient_email if recipient_email else default_recipient_email
-
     if not all([api_key, sender_email, default_recipient_email]):
         logger.error("Error: Missing environment variables. Please check your .env file.")
         return False
 
-    # Render the HTML email template within the application context
-    with app.app_context():
-        html_body = render_template(
-            'email_summary_template.html',
-            podcast_name=podcast_name,
-            episode_title=episode_title,
-            published_date=published_date,
-            summary_content=markdown.markdown(summary_content)
-        )
+    if isinstance(recipient_email, (list, tuple)):
+        recipients = [recipient or default_recipient_email for recipient in recipient_email]
+    else:
+        recipients = [recipient_email if recipient_email else default_recipient_email]
+    if len(recipients) > AHASEND_MAX_RECIPIENTS:
+        logger.error(f"Error: {len(recipients)} recipients exceeds the AhaSend limit of {AHASEND_MAX_RECIPIENTS} per request.")
+        return False
 
     email = {
         'from': {
@@ -44,6 +61,7 @@ def send_email(subject, text_body, summary_content, podcast_name, episode_title,
                 'name': 'Podcast Listener', # This could be customized later
                 'email': recipient,
             }
+            for recipient in recipients
         ],
         'content': {
             'subject': subject,
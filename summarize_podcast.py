@@ -1,10 +1,98 @@
 import os
+import json
+import codecs
+import hashlib
 import subprocess
+import threading
 import logging
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+GEMINI_COMMAND = ["cmd.exe", "/c", "gemini", "--model", "gemini-2.5-flash"]
+
+# Boilerplate the Gemini CLI sometimes prints ahead of the actual summary.
+CLI_PREAMBLES = ("Loaded cached credentials.", "Here's a summary of the podcast transcript:")
+
+# Transcripts are split into chunks of roughly this many words for the map stage.
+CHUNK_WORDS = 3000
+
+# Summary variants are named "<length>" or "<length>-<format>", e.g. "short" or "long-paragraphs".
+SUMMARY_LENGTHS = {
+    "short": "no more than 100 words",
+    "medium": "around 300 words",
+    "long": "around 800 words",
+}
+SUMMARY_FORMATS = {
+    "bullets": "a Markdown bulleted list of key points",
+    "paragraphs": "flowing prose paragraphs, without bullet points",
+}
+DEFAULT_SUMMARY_FORMAT = "bullets"
+SUMMARY_VARIANTS = [f"{length}-{form}" for length in SUMMARY_LENGTHS for form in SUMMARY_FORMATS]
+
+class SummarizationError(Exception):
+    """Raised when a streamed summarization cannot be completed."""
+
+# What the full summary (as opposed to a shorter variant) contains, whether it is written
+# from the transcript itself or from notes on its chunks.
+FULL_SUMMARY_INSTRUCTIONS = "The summary should be a detailed list, with each point illustrated by at least one concrete example. Ignore episode credits and advertising in this summary. Once you have done this, please then highlight a key quote from the episode, under the heading '## Key Quote'. Once you have done that, please list some limitations of the arguments made in the transcript, and potential divergent viewpoints, under the heading '## Potential Limitations and Divergent Views'. This section should be a bulleted list. Limit this section to a maximum of 250 words, and a maximum of 4 points."
+
+def build_prompt(text_content):
+    """Builds the summarization prompt sent to Gemini for a transcript."""
+    return f"""Produce a summary of the key points in this podcast transcript. {FULL_SUMMARY_INSTRUCTIONS}
+
+{text_content}
+"""
+
+def strip_summary_label(summary):
+    """Removes a leading "Summary:" label the model sometimes puts before the summary."""
+    if summary.lower().startswith('summary:'):
+        summary = summary[len('summary:'):].lstrip()
+    return summary
+
+def clean_summary(summary):
+    """Strips surrounding whitespace and any Gemini CLI preamble from a summary."""
+    summary = summary.strip()
+    for preamble in CLI_PREAMBLES:
+        if summary.startswith(preamble):
+            summary = summary.replace(preamble, "", 1).strip()
+    return summary
+
+def _strip_preamble(text):
+    """Removes CLI preamble from the start of a partial stream, keeping trailing whitespace."""
+    stripped = text.lstrip()
+    for preamble in CLI_PREAMBLES:
+        if stripped.startswith(preamble):
+            stripped = stripped[len(preamble):].lstrip()
+    return stripped
+
+def save_summary(text_filepath, summary):
+    """Writes a summary next to its transcription and returns the summary file path."""
+    summary_filepath = os.path.splitext(text_filepath)[0] + ".summary.txt"
+    with open(summary_filepath, "w", encoding="utf-8") as f:
+        f.write(summary)
+    logger.info(f"Summary saved to {summary_filepath}")
+    return summary_filepath
+
+def run_gemini(prompt):
+    """
+    Sends a prompt to the Gemini CLI and returns the cleaned response, or None on failure.
+    """
+    try:
+        process = subprocess.Popen(GEMINI_COMMAND, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+    except OSError as e:
+        logger.error(f"Could not run the Gemini CLI: {e}")
+        return None
+    stdout, stderr = process.communicate(input=prompt)
+
+    if process.returncode != 0:
+        error_message = f"Gemini CLI command failed with exit code {process.returncode}.\nStdout: {stdout}\nStderr: {stderr}"
+        logger.error(error_message)
+        return None
+
+    # Remove the CLI preamble ("Loaded cached credentials." etc.) if present
+    return clean_summary(stdout)
+
 def summarize_text(text_filepath):
     """
     Summarizes the content of a given text file using the Gemini CLI.
@@ -25,37 +113,13 @@ def summarize_text(text_filepath):
         target_words = max(50, len(text_content.split()) // 10) # At least 50 words
 
         # Construct the full prompt to send to Gemini
-        full_prompt = f"""Produce a summary of the key points in this podcast transcript. The summary should be a detailed list, with each point illustrated by at least one concrete example. Ignore episode credits and advertising in this summary. Once you have done this, please then highlight a key quote from the episode, under the heading '## Key Quote'. Once you have done that, please list some limitations of the arguments made in the transcript, and potential divergent viewpoints, under the heading '## Potential Limitations and Divergent Views'. This section should be a bulleted list. Limit this section to a maximum of 250 words, and a maximum of 4 points.
-
-{text_content}
-"""
-
-        # Construct the Gemini CLI command to read from stdin
-        command = ["cmd.exe", "/c", "gemini", "--model", "gemini-2.5-flash"]
+        full_prompt = build_prompt(text_content)
 
         # Execute the command, piping the full prompt to stdin
-        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
-        stdout, stderr = process.communicate(input=full_prompt)
-
-        if process.returncode != 0:
-            error_message = f"Gemini CLI command failed with exit code {process.returncode}.\nStdout: {stdout}\nStderr: {stderr}"
-            logger.error(error_message)
+        summary = run_gemini(full_prompt)
+        if summary is None:
             return None
-
-        # Remove "Loaded cached credentials." if present at the beginning of stdout
-        summary = stdout.strip()
-        if summary.startswith("Loaded cached credentials."):
-            summary = summary.replace("Loaded cached credentials.", "", 1).strip()
-
-        # Remove the specific repetitive phrase if present
-        repetitive_phrase = "Here's a summary of the podcast transcript:"
-        if summary.startswith(repetitive_phrase):
-            summary = summary.replace(repetitive_phrase, "", 1).strip()
-
-        summary_filepath = os.path.splitext(text_filepath)[0] + ".summary.txt"
-        with open(summary_filepath, "w", encoding="utf-8") as f:
-            f.write(summary)
-        logger.info(f"Summary saved to {summary_filepath}")
+        save_summary(text_filepath, summary)
         return summary
 
     except FileNotFoundError:
@@ -68,6 +132,252 @@ def summarize_text(text_filepath):
         logger.error(f"An error occurred during summarization: {e}")
         return None
 
+def stream_summary(text_filepath, chunk_size=256):
+    """
+    Summarizes a transcript with the Gemini CLI, yielding the summary text as it is generated.
+
+    The CLI preamble is held back until it can be stripped, so the concatenated chunks
+    match what summarize_text would return (modulo trailing whitespace). Once the stream
+    is exhausted the full summary is saved to the usual .summary.txt file.
+
+    Args:
+        text_filepath (str): The path to the text file to summarize.
+        chunk_size (int): The maximum number of bytes read from the CLI per chunk.
+
+    Yields:
+        str: Successive pieces of the summary text.
+
+    Raises:
+        SummarizationError: If the transcript is missing or the CLI fails.
+    """
+    try:
+        with open(text_filepath, 'r', encoding='utf-8') as f:
+            text_content = f.read()
+    except FileNotFoundError:
+        logger.error(f"Text file not found: {text_filepath}")
+        raise SummarizationError(f"Text file not found: {text_filepath}")
+
+    try:
+        process = subprocess.Popen(GEMINI_COMMAND, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        logger.error(f"Could not run the Gemini CLI: {e}")
+        raise SummarizationError(f"Could not run the Gemini CLI: {e}") from e
+
+    # Feed the prompt from a separate thread so a large transcript can't deadlock
+    # against the CLI filling its stdout pipe before it has read all of stdin.
+    def write_prompt():
+        try:
+            process.stdin.write(build_prompt(text_content).encode('utf-8'))
+            process.stdin.close()
+        except OSError:
+            # The CLI exited (or was killed) before reading the whole prompt.
+            pass
+    writer = threading.Thread(target=write_prompt, daemon=True)
+    writer.start()
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    preamble_window = max(len(p) for p in CLI_PREAMBLES) * 2
+    pending = ""
+    emitted = []
+    started = False
+    finished = False
+    try:
+        while True:
+            data = process.stdout.read1(chunk_size)
+            text = decoder.decode(data, final=not data)
+            if started:
+                if text:
+                    emitted.append(text)
+                    yield text
+            else:
+                pending += text
+                if len(pending) >= preamble_window or not data:
+                    pending = clean_summary(pending) if not data else _strip_preamble(pending)
+                    started = True
+                    if pending:
+                        emitted.append(pending)
+                        yield pending
+            if not data:
+                finished = True
+                break
+    finally:
+        if not finished and process.poll() is None:
+            # The consumer went away mid-stream (e.g. the browser tab was closed).
+            process.kill()
+        process.wait()
+        writer.join()
+        stderr_reader.join()
+
+    stderr = b"".join(stderr_chunks).decode('utf-8', errors='replace')
+    if process.returncode != 0:
+        error_message = f"Gemini CLI command failed with exit code {process.returncode}.\nStderr: {stderr}"
+        logger.error(error_message)
+        raise SummarizationError(error_message)
+
+    save_summary(text_filepath, "".join(emitted).strip())
+
+def split_transcript(text_content, chunk_words=None):
+    """Splits a transcript into consecutive chunks of at most chunk_words (default CHUNK_WORDS) words."""
+    chunk_words = chunk_words or CHUNK_WORDS
+    words = text_content.split()
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)]
+
+def parse_variant(variant):
+    """
+    Splits a variant name into its (length, format) parts.
+
+    Raises:
+        ValueError: If the variant is not a known length/format combination.
+    """
+    length, _, form = variant.partition("-")
+    form = form or DEFAULT_SUMMARY_FORMAT
+    if length not in SUMMARY_LENGTHS or form not in SUMMARY_FORMATS:
+        raise ValueError(f"Unknown summary variant: {variant}")
+    return length, form
+
+def read_chunk_cache(chunks_filepath, transcript_hash):
+    """Returns the cached chunk summaries of a transcript with the given hash, or None on a miss."""
+    try:
+        with open(chunks_filepath, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable chunk cache {chunks_filepath}: {e}")
+        return None
+    # A cache of an older transcript (e.g. before re-transcription), or older format, is stale
+    if not isinstance(cache, dict) or cache.get("transcript_sha256") != transcript_hash or cache.get("chunk_words") != CHUNK_WORDS:
+        return None
+    return cache.get("chunk_summaries")
+
+def write_chunk_cache(chunks_filepath, transcript_hash, chunk_summaries):
+    """Saves chunk summaries atomically, so a crash mid-write never leaves a partial cache."""
+    temporary_filepath = chunks_filepath + ".tmp"
+    try:
+        with open(temporary_filepath, 'w', encoding='utf-8') as f:
+            json.dump({"transcript_sha256": transcript_hash, "chunk_words": CHUNK_WORDS, "chunk_summaries": chunk_summaries}, f)
+        os.replace(temporary_filepath, chunks_filepath)
+    except OSError as e:
+        logger.warning(f"Could not cache chunk summaries in {chunks_filepath}: {e}")
+
+def map_transcript(text_filepath):
+    """
+    Runs the map stage: summarizes each chunk of a transcript independently.
+
+    The chunk summaries are cached in a .chunks.json file next to the transcript, keyed
+    by a hash of its text, so every summary variant of an episode shares a single pass
+    over the full transcript until it is re-transcribed.
+
+    Returns:
+        list: The chunk summaries, or None if any chunk could not be summarized.
+    """
+    try:
+        with open(text_filepath, 'r', encoding='utf-8') as f:
+            text_content = f.read()
+    except FileNotFoundError:
+        logger.error(f"Text file not found: {text_filepath}")
+        return None
+
+    chunks_filepath = os.path.splitext(text_filepath)[0] + ".chunks.json"
+    transcript_hash = hashlib.sha256(text_content.encode('utf-8')).hexdigest()
+    chunk_summaries = read_chunk_cache(chunks_filepath, transcript_hash)
+    if chunk_summaries is not None:
+        return chunk_summaries
+
+    chunks = split_transcript(text_content)
+    chunk_summaries = []
+    for index, chunk in enumerate(chunks, start=1):
+        logger.info(f"Summarizing chunk {index}/{len(chunks)} of {text_filepath}")
+        prompt = f"""This is part {index} of {len(chunks)} of a podcast transcript. Write detailed notes on the key points made in this part, keeping concrete examples and any memorable quotes verbatim. Ignore episode credits and advertising.
+
+{chunk}
+"""
+        chunk_summary = run_gemini(prompt)
+        if chunk_summary is None:
+            return None
+        chunk_summaries.append(chunk_summary)
+
+    write_chunk_cache(chunks_filepath, transcript_hash, chunk_summaries)
+    return chunk_summaries
+
+def reduce_summaries(chunk_summaries, variant=None):
+    """
+    Runs the reduce stage: combines chunk summaries into a single summary variant, or
+    into the full summary if variant is None.
+
+    Returns:
+        str: The summary, or None if the Gemini CLI failed.
+    """
+    notes = "\n\n".join(f"Part {i}:\n{s}" for i, s in enumerate(chunk_summaries, start=1))
+    if variant is None:
+        instructions = f"Combine them into a summary of the key points of the whole episode. {FULL_SUMMARY_INSTRUCTIONS}"
+    else:
+        length, form = parse_variant(variant)
+        instructions = f"Combine them into a single summary of the whole episode, written as {SUMMARY_FORMATS[form]}, of {SUMMARY_LENGTHS[length]}."
+    prompt = f"""Below are notes on consecutive parts of a podcast transcript. {instructions}
+
+{notes}
+"""
+    return run_gemini(prompt)
+
+def reduce_variants(chunk_summaries, variants, text_filepath):
+    """Reduces chunk summaries into each variant, returning a dict of those that succeeded."""
+    summaries = {}
+    for variant in variants:
+        summary = reduce_summaries(chunk_summaries, variant)
+        if summary is not None:
+            summaries[variant] = summary
+        else:
+            logger.warning(f"Could not produce '{variant}' summary for {text_filepath}")
+    return summaries
+
+def summarize_variants(text_filepath, variants):
+    """
+    Produces several summary variants of a transcript from one shared map stage.
+
+    Args:
+        text_filepath (str): The path to the transcript to summarize.
+        variants (list): Variant names such as "short" or "long-paragraphs".
+
+    Returns:
+        dict: Maps each successfully generated variant to its summary text.
+    """
+    for variant in variants:
+        parse_variant(variant)
+    chunk_summaries = map_transcript(text_filepath)
+    if chunk_summaries is None:
+        return {}
+    return reduce_variants(chunk_summaries, variants, text_filepath)
+
+def summarize_transcript(text_filepath, variants=()):
+    """
+    Produces a transcript's full summary and any summary variants from a single map
+    stage, so each summary costs only its reduce step. The full summary is saved to the
+    usual .summary.txt file.
+
+    Args:
+        text_filepath (str): The path to the transcript to summarize.
+        variants (list): Variant names such as "short" or "long-paragraphs".
+
+    Returns:
+        tuple: The full summary (or None if it could not be produced) and a dict mapping
+            each successfully generated variant to its summary text.
+    """
+    for variant in variants:
+        parse_variant(variant)
+    chunk_summaries = map_transcript(text_filepath)
+    if chunk_summaries is None:
+        return None, {}
+    summary = reduce_summaries(chunk_summaries)
+    if summary is None:
+        return None, {}
+    summary = strip_summary_label(summary)
+    save_summary(text_filepath, summary)
+    return summary, reduce_variants(chunk_summaries, variants, text_filepath)
+
 if __name__ == "__main__":
     # Example usage (replace with actual path to a transcription file)
     # For testing, you might want to create a dummy transcription file
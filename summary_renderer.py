@@ -0,0 +1,110 @@
+import re
+import threading
+import logging
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+import markdown
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+# Bump whenever rendering changes (Markdown extensions, the sanitizer's allowlist...) so
+# that summaries stored with an older rendering are re-rendered at the next startup.
+SUMMARY_RENDERER_VERSION = 1
+
+# Summaries come from an LLM, so the HTML Markdown produces from them is reduced to
+# these tags and attributes before it is shown on the web or emailed.
+ALLOWED_TAGS = {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "strong", "em", "b", "i", "del", "sup", "sub",
+    "code", "pre", "blockquote", "ul", "ol", "li", "a", "table", "thead", "tbody", "tr", "th", "td",
+}
+ALLOWED_ATTRIBUTES = {"a": {"href", "title"}, "ol": {"start"}, "th": {"align"}, "td": {"align"}}
+ALLOWED_URL_SCHEMES = {"", "http", "https", "mailto"}
+VOID_TAGS = {"br", "hr"}
+# Tags dropped together with everything inside them.
+DROPPED_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+
+# A single Markdown converter is reused for every render; it keeps state between
+# calls, so it is reset before each conversion and guarded against concurrent use.
+_markdown_converter = markdown.Markdown()
+_markdown_lock = threading.Lock()
+
+def is_safe_url(url):
+    """Returns True if a link URL uses an allowed scheme (relative links are allowed)."""
+    # Browsers ignore whitespace and control characters in URLs, e.g. "java\tscript:"
+    return urlparse(re.sub(r"[\x00-\x20]", "", url)).scheme.lower() in ALLOWED_URL_SCHEMES
+
+class HtmlSanitizer(HTMLParser):
+    """
+    Rewrites HTML keeping only allowlisted tags and attributes. Other tags are removed
+    but their text is kept (escaped); comments and dropped-content tags vanish entirely.
+    Tags left open are closed, so a summary can never break the page around it.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.output = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, set())
+        attributes = "".join(
+            f' {name}="{escape(value)}"' for name, value in attrs
+            if name in allowed and value is not None and (name != "href" or is_safe_url(value))
+        )
+        self.output.append(f"<{tag}{attributes}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.output.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.output.append(escape(data, quote=False))
+
+    def handle_entityref(self, name):
+        if not self.dropping:
+            self.output.append(f"&{name};")
+
+    def handle_charref(self, name):
+        if not self.dropping:
+            self.output.append(f"&#{name};")
+
+    def sanitize(self, html):
+        self.feed(html)
+        self.close()
+        self.output.extend(f"</{tag}>" for tag in reversed(self.open_tags))
+        return "".join(self.output)
+
+def sanitize_html(html):
+    """Returns html reduced to ALLOWED_TAGS and ALLOWED_ATTRIBUTES."""
+    return HtmlSanitizer().sanitize(html)
+
+def markdown_to_html(text):
+    """Converts Markdown to HTML with the shared converter, without sanitizing it."""
+    with _markdown_lock:
+        return _markdown_converter.reset().convert(text)
+
+def render_summary_html(summary_text):
+    """
+    Renders a Markdown summary as sanitized HTML. database_manager calls this whenever a
+    summary is stored, and the stored HTML is what the web pages, API and emails use.
+    """
+    return sanitize_html(markdown_to_html(summary_text or ""))
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sys
+import json
+import gzip
+import logging
+
+# Add the parent directory to the sys.path to allow importing app
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import app
+import database_manager
+
+class TestApi(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+
+        # Clean up any existing database file
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.create_table()
+
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss", "test@example.com")
+        for day in range(1, 6):
+            database_manager.add_episode({
+                "podcast_url": "http://test.com/rss",
+                "episode_url": f"http://test.com/episode{day}.mp3",
+                "title": f"Episode {day}",
+                "published_date": f"2025-07-0{day}T12:00:00",
+                "summary_text": f"Summary of episode {day}.",
+            })
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+
+    def get_json(self, url, status=200, **kwargs):
+        response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, status)
+        self.assertEqual(response.mimetype, 'application/json')
+        return json.loads(response.data)
+
+    def test_list_podcasts(self):
+        podcasts = self.get_json('/api/v1/podcasts')['data']
+        self.assertEqual(len(podcasts), 1)
+        self.assertEqual((podcasts[0]['name'], podcasts[0]['rss_feed_url']), ("Test Podcast", "http://test.com/rss"))
+
+        podcast = self.get_json(f"/api/v1/podcasts/{podcasts[0]['id']}?fields=name")
+        self.assertEqual(podcast, {"name": "Test Podcast"})
+        self.get_json('/api/v1/podcasts/999', status=404)
+
+    def test_list_episodes_by_cursor_with_sparse_fields(self):
+        page = self.get_json('/api/v1/episodes?limit=2')
+        self.assertEqual([e['title'] for e in page['data']], ["Episode 5", "Episode 4"])
+        self.assertNotIn('summary_text', page['data'][0])
+        self.assertIsNone(page['prev_cursor'])
+
+        page = self.get_json(f"/api/v1/episodes?limit=2&after={page['next_cursor']}&fields=title,summary_text")
+        self.assertEqual(page['data'], [
+            {"title": "Episode 3", "summary_text": "Summary of episode 3."},
+            {"title": "Episode 2", "summary_text": "Summary of episode 2."},
+        ])
+        page = self.get_json(f"/api/v1/episodes?limit=2&after={page['next_cursor']}")
+        self.assertEqual([e['title'] for e in page['data']], ["Episode 1"])
+        self.assertIsNone(page['next_cursor'])
+
+        self.assertIn("Unknown fields", self.get_json('/api/v1/episodes?fields=secret', status=400)['error'])
+        self.get_json('/api/v1/episodes?limit=1000', status=400)
+        self.get_json('/api/v1/episodes?after=bogus', status=400)
+
+    def test_episode_summary_transcript_and_job(self):
+        episode = self.get_json('/api/v1/episodes')['data'][0]
+        summary = self.get_json(f"/api/v1/episodes/{episode['id']}/summary")
+        self.assertEqual(summary['summary_text'], "Summary of episode 5.")
+        self.assertEqual(summary['summary_html'], "<p>Summary of episode 5.</p>")
+        self.assertEqual(summary['summary_variants'], {})
+        self.get_json(f"/api/v1/episodes/{episode['id']}/transcript", status=404)
+        self.get_json('/api/v1/episodes/999', status=404)
+
+        job = database_manager.create_pipeline_job({
+            "episode_url": "http://test.com/episode5.mp3", "podcast_name": "Test Podcast", "title": "Episode 5", "stage": "emailed",
+        })
+        self.assertEqual(self.get_json(f"/api/v1/episodes/{episode['id']}/job")['id'], job['id'])
+        self.assertEqual(self.get_json(f"/api/v1/jobs/{job['id']}")['stage'], "emailed")
+        self.get_json('/api/v1/tasks/999', status=404)
+
+    def test_conditional_requests_and_compression(self):
+        response = self.client.get('/api/v1/episodes')
+        response = self.client.get('/api/v1/episodes', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/api/v1/episodes?fields=title,summary_text', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.data))['data']), 5)
+
+if __name__ == '__main__':
+    unittest.main()
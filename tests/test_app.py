@@ -3,11 +3,16 @@ from unittest.mock import patch, MagicMock
 import os
 import sys
 import json
+import io
+import gzip
 import logging
+import sqlite3
+import threading
 
 # Add the parent directory to the sys.path to allow importing app
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import app as app_module
 from app import app
 import database_manager
 
@@ -20,6 +25,7 @@ class TestApp(unittest.TestCase):
         self.client = app.test_client()
 
         # Clean up any existing database file
+        database_manager.close_all_connections()
         if os.path.exists(database_manager.DATABASE_NAME):
             os.remove(database_manager.DATABASE_NAME)
         database_manager.create_table()
@@ -29,25 +35,39 @@ class TestApp(unittest.TestCase):
         # Re-enable logging after tests
         logging.disable(logging.NOTSET)
         # Clean up any created files and database
+        database_manager.close_all_connections()
         if os.path.exists(database_manager.DATABASE_NAME):
             os.remove(database_manager.DATABASE_NAME)
 
-    @patch('database_manager.get_all_episodes')
+    @patch('database_manager.list_episodes')
     @patch('database_manager.get_all_podcast_configs')
-    def test_index_page(self, mock_get_all_podcast_configs, mock_get_all_episodes):
-        mock_get_all_episodes.return_value = []
+    def test_index_page(self, mock_get_all_podcast_configs, mock_list_episodes):
+        mock_list_episodes.return_value = {'episodes': [], 'next_cursor': None, 'prev_cursor': None}
         mock_get_all_podcast_configs.return_value = []
         response = self.client.get('/')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'No podcasts configured yet.', response.data)
         self.assertIn(b'No episodes processed yet.', response.data)
 
+    def test_requests_on_separate_threads_reuse_connections(self):
+        database_manager.close_all_connections()
+        statuses = []
+        with patch('database_manager.sqlite3.connect', wraps=sqlite3.connect) as mock_connect:
+            # The development server runs each request on a thread of its own
+            for _ in range(3):
+                thread = threading.Thread(target=lambda: statuses.append(self.client.get('/').status_code))
+                thread.start()
+                thread.join()
+        self.assertEqual(statuses, [200, 200, 200])
+        # Each request hands its connection back at teardown for the next one
+        self.assertEqual(mock_connect.call_count, 1)
+
     @patch('database_manager.get_all_podcast_configs')
     @patch('database_manager.add_podcast_config')
-    @patch('database_manager.get_all_episodes')
-    def test_add_podcast_post(self, mock_get_all_episodes, mock_add_podcast_config, mock_get_all_podcast_configs):
+    @patch('database_manager.list_episodes')
+    def test_add_podcast_post(self, mock_list_episodes, mock_add_podcast_config, mock_get_all_podcast_configs):
         mock_add_podcast_config.return_value = True
-        mock_get_all_episodes.return_value = []
+        mock_list_episodes.return_value = {'episodes': [], 'next_cursor': None, 'prev_cursor': None}
         
         # First, mock the initial state of podcast_configs for the GET request to '/'
         mock_get_all_podcast_configs.return_value = []
@@ -67,7 +87,7 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'<h3>Test Podcast</h3>', response.data)
         self.assertIn(b'<p>Recipient Email: test@example.com</p>', response.data)
-        mock_add_podcast_config.assert_called_once_with('Test Podcast', 'http://test.com/rss', 'test@example.com')
+        mock_add_podcast_config.assert_called_once_with('Test Podcast', 'http://test.com/rss', 'test@example.com', None)
 
     @patch('database_manager.get_episode_by_id')
     def test_view_summary_page(self, mock_get_episode_by_id):
@@ -80,58 +100,79 @@ class TestApp(unittest.TestCase):
             'audio_filepath': 'audio.mp3',
             'transcription_filepath': 'transcription.txt',
             'summary_filepath': 'summary.txt',
-            'summary_text': 'This is a test summary.'
+            'summary_text': 'This is a **test** summary. <script>alert(1)</script>'
         }
         mock_get_episode_by_id.return_value = mock_episode
         response = self.client.get('/summaries/1')
         self.assertEqual(response.status_code, 200)
         self.assertIn(b'Summary for Test Episode', response.data)
-        self.assertIn(b'This is a test summary.', response.data)
+        # Markdown is shown as sanitized HTML
+        self.assertIn(b'<p>This is a <strong>test</strong> summary. </p>', response.data)
+        self.assertNotIn(b'alert(1)', response.data)
 
-    @patch('database_manager.get_episode_by_id')
+    @patch('app.task_executor')
     @patch('transcribe_podcast.transcribe_audio')
-    @patch('summarize_podcast.summarize_text')
-    @patch('database_manager.connect_db')
-    def test_resummarize_episode_success(self, mock_connect_db, mock_summarize_text, mock_transcribe_audio, mock_get_episode_by_id):
-        mock_episode = {
-            'id': 1,
-            'title': 'Old Episode',
+    @patch('main_workflow.summarize_transcript')
+    def test_resummarize_episode_runs_in_background(self, mock_summarize_transcript, mock_transcribe_audio, mock_task_executor):
+        database_manager.add_podcast_config('Podcast', 'http://test.com/podcast', 'short@example.com', 'short')
+        database_manager.add_episode({
             'podcast_url': 'http://test.com/podcast',
             'episode_url': 'http://test.com/old_episode.mp3',
+            'title': 'Old Episode',
             'published_date': '2025-01-01',
             'audio_filepath': 'podcasts/old_episode.mp3',
             'transcription_filepath': 'transcriptions/old_episode.txt',
-            'summary_filepath': 'summaries/old_episode.summary.txt',
             'summary_text': 'This is an old summary.'
-        }
+        })
+        episode_id = database_manager.list_episodes()['episodes'][0]['id']
         mock_transcribe_audio.return_value = 'transcriptions/old_episode.txt'
-        new_summary_text = 'This is a new summary.'
-        mock_summarize_text.return_value = new_summary_text
-
-        # Mock database update
-        mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_conn.cursor.return_value = mock_cursor
-        mock_connect_db.return_value = mock_conn
+        database_manager.save_summary_variant('http://test.com/old_episode.mp3', 'short', 'Old short summary.')
+        database_manager.save_summary_variant('http://test.com/old_episode.mp3', 'long', 'Old long summary.')
+        mock_summarize_transcript.return_value = ('This is a new summary.', {'short': 'New short summary.'})
 
-        # Prepare the updated episode for the second call to get_episode_by_id (after redirect)
-        updated_mock_episode = mock_episode.copy()
-        updated_mock_episode['summary_text'] = new_summary_text
-        mock_get_episode_by_id.side_effect = [mock_episode.copy(), updated_mock_episode.copy()]
+        response = self.client.post(f'/resummarize/{episode_id}')
+        self.assertEqual(response.status_code, 202)
+        task = json.loads(response.data)
+        self.assertEqual((task['action'], task['status'], task['created']), ('resummarize', 'queued', True))
+        self.assertEqual(response.headers['Location'], f"/tasks/{task['id']}")
 
-        response = self.client.post('/resummarize/1', follow_redirects=True)
-        self.assertEqual(response.status_code, 200)
-        self.assertIn(b'This is a new summary.', response.data)
-        
-        # Assert that get_episode_by_id was called twice (once by resummarize, once by index after redirect)
-        self.assertEqual(mock_get_episode_by_id.call_count, 2)
-        self.assertEqual(mock_get_episode_by_id.call_args_list[0].args[0], 1)
-        self.assertEqual(mock_get_episode_by_id.call_args_list[1].args[0], 1)
+        # Clicking again, even on another action, returns the task already in progress
+        response = self.client.post(f'/retranscribe/{episode_id}')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.data)['id'], task['id'])
+        self.assertFalse(json.loads(response.data)['created'])
+        mock_task_executor.submit.assert_called_once_with(app_module.run_episode_task, task['id'])
 
+        app_module.run_episode_task(task['id'])
+        status = json.loads(self.client.get(f"/tasks/{task['id']}").data)
+        self.assertEqual((status['status'], status['error']), ('done', None))
         mock_transcribe_audio.assert_called_once_with('podcasts/old_episode.mp3')
-        mock_summarize_text.assert_called_once_with('transcriptions/old_episode.txt')
-        mock_cursor.execute.assert_called_once()
-        mock_conn.commit.assert_called_once()
+        mock_summarize_transcript.assert_called_once_with('transcriptions/old_episode.txt', ['short'])
+        self.assertEqual(database_manager.get_episode_by_id(episode_id)['summary_text'], 'This is a new summary.')
+        # Variants are regenerated for the subscribers, and stale ones dropped
+        self.assertEqual(database_manager.get_summary_variants('http://test.com/old_episode.mp3'), {'short': 'New short summary.'})
+
+        # Once it has finished, a new task can be queued
+        response = self.client.post(f'/retranscribe/{episode_id}')
+        self.assertNotEqual(json.loads(response.data)['id'], task['id'])
+
+    @patch('app.task_executor')
+    @patch('transcribe_podcast.transcribe_audio', return_value=None)
+    def test_failed_retranscribe_is_reported(self, mock_transcribe_audio, mock_task_executor):
+        database_manager.add_episode({
+            'podcast_url': 'http://test.com/podcast', 'episode_url': 'http://test.com/episode.mp3', 'title': 'Episode',
+            'audio_filepath': 'podcasts/episode.mp3', 'transcription_filepath': __file__,
+        })
+        episode_id = database_manager.list_episodes()['episodes'][0]['id']
+        task = json.loads(self.client.post(f'/retranscribe/{episode_id}').data)
+
+        app_module.run_episode_task(task['id'])
+
+        # Re-transcribing ignores the existing transcription file
+        mock_transcribe_audio.assert_called_once_with('podcasts/episode.mp3')
+        status = json.loads(self.client.get(f"/tasks/{task['id']}").data)
+        self.assertEqual((status['status'], status['error']), ('failed', 'Failed to re-transcribe audio'))
+        self.assertEqual(self.client.get('/tasks/999').status_code, 404)
 
     @patch('database_manager.get_episode_by_id')
     def test_resummarize_episode_not_found(self, mock_get_episode_by_id):
@@ -140,16 +181,95 @@ class TestApp(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn(b'Episode not found', response.data)
 
+    def add_old_episode(self):
+        database_manager.add_episode({
+            'podcast_url': 'http://test.com/podcast',
+            'episode_url': 'http://test.com/old_episode.mp3',
+            'title': 'Old Episode',
+            'audio_filepath': 'podcasts/old_episode.mp3',
+            'transcription_filepath': 'podcasts/old_episode.txt',
+            'summary_text': 'This is an old summary.'
+        })
+        return database_manager.list_episodes()['episodes'][0]['id']
+
+    @patch('summarize_podcast.stream_summary')
+    @patch('app.os.path.exists')
+    def test_resummarize_episode_stream(self, mock_exists, mock_stream_summary):
+        episode_id = self.add_old_episode()
+        mock_exists.return_value = True
+        mock_stream_summary.return_value = iter(['Summary: First ', 'point.\n'])
+
+        response = self.client.get(f'/resummarize/{episode_id}/stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        body = response.get_data(as_text=True)
+        self.assertIn('data: "Summary: First "\n\n', body)
+        self.assertIn('data: "point.\\n"\n\n', body)
+        self.assertIn(f'event: done\ndata: "/summaries/{episode_id}"', body)
+        mock_stream_summary.assert_called_once_with('podcasts/old_episode.txt')
+        # The stored summary loses the label, as the pipeline's does
+        self.assertEqual(database_manager.get_episode_by_id(episode_id)['summary_text'], 'First point.')
+        # The stream ran as the episode's task, which has now finished, so another can be queued
+        self.assertTrue(database_manager.enqueue_episode_task(episode_id, 'resummarize')['created'])
+
+    @patch('summarize_podcast.stream_summary')
+    @patch('app.time.sleep')
+    def test_resummarize_stream_follows_task_in_progress(self, mock_sleep, mock_stream_summary):
+        episode_id = self.add_old_episode()
+        task = database_manager.enqueue_episode_task(episode_id, 'retranscribe')
+        database_manager.start_episode_task(task['id'])
+        mock_sleep.side_effect = lambda seconds: database_manager.finish_episode_task(task['id'])
+
+        body = self.client.get(f'/resummarize/{episode_id}/stream').get_data(as_text=True)
+
+        # A second summarizer isn't started; the stream reports the running task until it is done
+        mock_stream_summary.assert_not_called()
+        self.assertIn('event: status\ndata: "Re-transcribing (running)..."', body)
+        self.assertIn(f'event: done\ndata: "/summaries/{episode_id}"', body)
+
+    @patch('summarize_podcast.stream_summary')
+    @patch('app.os.path.exists')
+    def test_unread_resummarize_stream_fails_its_task(self, mock_exists, mock_stream_summary):
+        episode_id = self.add_old_episode()
+        mock_exists.return_value = True
+
+        response = self.client.get(f'/resummarize/{episode_id}/stream')
+        task = database_manager.get_episode_task(1)
+        self.assertEqual(task['status'], 'running')
+        response.close()
+
+        # Closing the response without reading it doesn't leave the task running
+        mock_stream_summary.assert_not_called()
+        task = database_manager.get_episode_task(task['id'])
+        self.assertEqual((task['status'], task['error']), ('failed', "Stream closed before the summary was finished"))
+        self.assertTrue(database_manager.enqueue_episode_task(episode_id, 'resummarize')['created'])
+
+    @patch('summarize_podcast.stream_summary')
+    @patch('app.task_executor')
+    @patch('app.time.sleep')
+    def test_resummarize_stream_retranscribes_on_task_executor(self, mock_sleep, mock_task_executor, mock_stream_summary):
+        episode_id = self.add_old_episode() # Its transcription file doesn't exist
+        mock_sleep.side_effect = lambda seconds: (database_manager.start_episode_task(1),
+                                                  database_manager.finish_episode_task(1))
+
+        body = self.client.get(f'/resummarize/{episode_id}/stream').get_data(as_text=True)
+
+        # Transcription isn't run on the request thread; the stream reports the queued task
+        mock_task_executor.submit.assert_called_once_with(app_module.run_episode_task, 1)
+        mock_stream_summary.assert_not_called()
+        self.assertIn('event: status\ndata: "Re-summarizing (queued)..."', body)
+        self.assertIn(f'event: done\ndata: "/summaries/{episode_id}"', body)
+
     @patch('database_manager.get_podcast_config_by_id')
     @patch('database_manager.delete_podcast_config')
     @patch('database_manager.get_all_podcast_configs')
-    @patch('database_manager.get_all_episodes')
-    def test_delete_podcast_post(self, mock_get_all_episodes, mock_get_all_podcast_configs, mock_delete_podcast_config, mock_get_podcast_config_by_id):
+    @patch('database_manager.list_episodes')
+    def test_delete_podcast_post(self, mock_list_episodes, mock_get_all_podcast_configs, mock_delete_podcast_config, mock_get_podcast_config_by_id):
         mock_podcast = {'id': 1, 'name': 'Test Podcast', 'rss_feed_url': 'http://test.com/rss'}
         mock_get_podcast_config_by_id.return_value = mock_podcast
         mock_delete_podcast_config.return_value = True
         mock_get_all_podcast_configs.side_effect = [[], [{'id': 1, 'name': 'Test Podcast', 'rss_feed_url': 'http://test.com/rss'}]]
-        mock_get_all_episodes.return_value = []
+        mock_list_episodes.return_value = {'episodes': [], 'next_cursor': None, 'prev_cursor': None}
 
         response = self.client.post('/delete_podcast/1', follow_redirects=True)
         self.assertEqual(response.status_code, 200)
@@ -157,6 +277,234 @@ class TestApp(unittest.TestCase):
         mock_get_podcast_config_by_id.assert_called_once_with(1)
         mock_delete_podcast_config.assert_called_once_with(1)
 
+    def test_index_page_paginates_episodes(self):
+        database_manager.add_podcast_config('Feed A', 'http://a.com/rss')
+        database_manager.add_podcast_config('Feed B', 'http://b.com/rss')
+        for n in range(5):
+            database_manager.add_episode({
+                'podcast_url': 'http://a.com/rss' if n % 2 == 0 else 'http://b.com/rss',
+                'episode_url': f'http://test.com/{n}.mp3', 'title': f'Episode {n}',
+                'published_date': f'Mon, 0{n + 1} Sep 2025 10:00:00 +0000', 'summary_text': 'Summary',
+            })
+
+        cursor = lambda n: database_manager.encode_episode_cursor(database_manager.get_episode_by_url(f'http://test.com/{n}.mp3'))
+
+        with patch('database_manager.EPISODE_PAGE_SIZE', 2):
+            response = self.client.get('/')
+            self.assertIn(b'Episode 4', response.data)
+            self.assertIn(b'Episode 3', response.data)
+            self.assertNotIn(b'Episode 2', response.data)
+            self.assertNotIn(b'Newer episodes', response.data)
+            self.assertIn(f'after={cursor(3)}'.encode(), response.data)
+
+            response = self.client.get(f'/?after={cursor(3)}')
+            self.assertIn(b'Episode 2', response.data)
+            self.assertIn(b'Episode 1', response.data)
+            self.assertIn(f'before={cursor(2)}'.encode(), response.data)
+            self.assertIn(f'after={cursor(1)}'.encode(), response.data)
+
+            response = self.client.get(f'/?before={cursor(2)}')
+            self.assertIn(b'Episode 4', response.data)
+            self.assertIn(b'Episode 3', response.data)
+            self.assertNotIn(b'Newer episodes', response.data)
+
+            response = self.client.get('/?podcast=1')
+            self.assertIn(b'Episode 4', response.data)
+            self.assertIn(b'Episode 2', response.data)
+            self.assertNotIn(b'Episode 3', response.data)
+
+        self.assertEqual(self.client.get('/?after=bogus').status_code, 400)
+
+    def test_search_page_highlights_matches(self):
+        database_manager.add_episode({
+            'podcast_url': 'http://test.com/rss', 'episode_url': 'http://test.com/1.mp3', 'title': 'Episode <1>',
+            'published_date': 'Mon, 01 Sep 2025 10:00:00 +0000', 'summary_text': 'All about <b>interest</b> rates.',
+        })
+
+        response = self.client.get('/search?q=interest')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Episode &lt;1&gt;', response.data)
+        self.assertIn(b'&lt;b&gt;<mark>interest</mark>&lt;/b&gt;', response.data)
+
+        response = self.client.get('/search?q=inflation')
+        self.assertIn(b'No episodes match', response.data)
+
+    def test_transcript_page_loads_segments_in_pages(self):
+        transcript_path = 'test_app_transcript.txt'
+        with open(transcript_path, 'w', encoding='utf-8') as f:
+            f.write(' '.join(f'word{i}' for i in range(database_manager.SEGMENT_WORDS * 30)) + ' <b>tariffs</b>')
+        self.addCleanup(os.remove, transcript_path)
+        database_manager.add_episode({
+            'podcast_url': 'http://test.com/rss', 'episode_url': 'http://test.com/1.mp3', 'title': 'Long Episode',
+            'published_date': 'Mon, 01 Sep 2025 10:00:00 +0000', 'summary_text': 'Summary.',
+        })
+        database_manager.index_transcript('http://test.com/1.mp3', transcript_path)
+        episode_id = database_manager.get_episode_by_url('http://test.com/1.mp3')['id']
+
+        response = self.client.get(f'/transcripts/{episode_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'id="segment-0"', response.data)
+        self.assertNotIn(f'id="segment-{database_manager.TRANSCRIPT_PAGE_SIZE}"'.encode(), response.data)
+        self.assertIn(f'data-next-start="{database_manager.TRANSCRIPT_PAGE_SIZE}"'.encode(), response.data)
+
+        response = self.client.get(f'/transcripts/{episode_id}/segments?start={database_manager.TRANSCRIPT_PAGE_SIZE}&q=tariffs')
+        self.assertIn(f'id="segment-{database_manager.TRANSCRIPT_PAGE_SIZE}"'.encode(), response.data)
+        self.assertIn(b'&lt;b&gt;<mark>tariffs</mark>&lt;/b&gt;', response.data)
+        self.assertNotIn(b'<html', response.data)
+
+        # Search hits link to their segments
+        response = self.client.get(f'/transcripts/{episode_id}?q=tariffs')
+        self.assertIn(b'1 matches for', response.data)
+        self.assertIn(b'position=30', response.data)
+        self.assertEqual(self.client.get('/transcripts/999').status_code, 404)
+        self.assertEqual(self.client.get('/transcripts/999/segments?start=20').status_code, 404)
+
+    def test_audio_supports_range_requests(self):
+        audio_path = 'test_app_audio.mp3'
+        with open(audio_path, 'wb') as f:
+            f.write(bytes(range(256)) * 40)
+        self.addCleanup(os.remove, audio_path)
+        database_manager.add_episode({
+            'podcast_url': 'http://test.com/rss', 'episode_url': 'http://test.com/1.mp3', 'title': 'Episode',
+            'published_date': 'Mon, 01 Sep 2025 10:00:00 +0000', 'audio_filepath': audio_path, 'summary_text': 'Summary.',
+        })
+        episode_id = database_manager.get_episode_by_url('http://test.com/1.mp3')['id']
+
+        response = self.client.get(f'/audio/{episode_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(response.mimetype, 'audio/mpeg')
+        self.assertEqual(len(response.data), 10240)
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.cache_control.max_age, app_module.AUDIO_MAX_AGE_SECONDS)
+        etag = response.headers['ETag']
+        response.close()
+
+        response = self.client.get(f'/audio/{episode_id}', headers={'Range': 'bytes=256-511'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], 'bytes 256-511/10240')
+        self.assertEqual(response.data, bytes(range(256)))
+        response.close()
+
+        response = self.client.get(f'/audio/{episode_id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response.close()
+
+        # The summary page plays it, from a timestamp if linked to one
+        response = self.client.get(f'/summaries/{episode_id}?t=90')
+        self.assertIn(f'src="/audio/{episode_id}#t=90.0"'.encode(), response.data)
+        self.assertEqual(self.client.get('/audio/999').status_code, 404)
+
+    @patch('opml.validate_feed', return_value="Feed Title")
+    def test_opml_import_and_export(self, mock_validate_feed):
+        document = b'''<opml version="2.0"><body>
+            <outline type="rss" text="First" xmlUrl="http://first.com/rss"/>
+            <outline type="rss" text="Second" xmlUrl="http://second.com/rss"/>
+        </body></opml>'''
+        response = self.client.post('/opml/import', data={'opml_file': (io.BytesIO(document), 'feeds.opml')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'2 of 2 feeds added', response.data)
+
+        response = self.client.get('/opml/export')
+        self.assertEqual(response.mimetype, 'text/x-opml')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        self.assertIn(b'xmlUrl="http://second.com/rss"', response.data)
+
+        response = self.client.post('/opml/import', data={'opml_file': (io.BytesIO(b'nonsense'), 'feeds.opml')},
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 400)
+
+    def test_add_and_remove_subscriber(self):
+        database_manager.add_podcast_config('Test Podcast', 'http://test.com/rss', 'first@example.com')
+        podcast_id = database_manager.get_all_podcast_configs()[0]['id']
+
+        response = self.client.post(f'/podcasts/{podcast_id}/subscribers', data={'email': 'second@example.com', 'summary_variant': 'short'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            [(s['email'], s['summary_variant']) for s in database_manager.get_subscribers(podcast_id)],
+            [('first@example.com', None), ('second@example.com', 'short')]
+        )
+
+        response = self.client.get('/')
+        self.assertIn(b'second@example.com (short, immediate)', response.data)
+
+        response = self.client.post(f'/podcasts/{podcast_id}/subscribers/delete', data={'email': 'first@example.com'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual([s['email'] for s in database_manager.get_subscribers(podcast_id)], ['second@example.com'])
+
+    def test_unknown_summary_variant_rejected(self):
+        database_manager.add_podcast_config('Test Podcast', 'http://test.com/rss')
+        podcast_id = database_manager.get_all_podcast_configs()[0]['id']
+
+        response = self.client.post(f'/podcasts/{podcast_id}/subscribers', data={'email': 'second@example.com', 'summary_variant': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/add_podcast', data={'podcast_name': 'Other Podcast', 'rss_feed_url': 'http://other.com/rss',
+                                                          'recipient_email': 'a@example.com', 'summary_variant': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(database_manager.get_subscribers(podcast_id), [])
+        self.assertEqual(len(database_manager.get_all_podcast_configs()), 1)
+        # The database layer refuses them too
+        self.assertFalse(database_manager.add_subscription(podcast_id, 'second@example.com', 'nonsense'))
+        self.assertFalse(database_manager.add_podcast_config('Other Podcast', 'http://other.com/rss', summary_variant='nonsense'))
+
+    def test_status_page(self):
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss")
+        job = database_manager.create_pipeline_job({"episode_url": "http://test.com/1.mp3", "title": "Stuck Episode",
+                                                    "podcast_name": "Test Podcast", "stage": "downloaded"})
+        database_manager.record_stage_run(job["id"], "transcribed", "worker-1", 42.0, "Whisper crashed")
+        database_manager.record_stage_run(job["id"], "transcribed", "worker-1", 30.0)
+
+        response = self.client.get('/status')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<td>Transcription</td>', response.data)
+        self.assertIn(b'<td>30.0s</td>', response.data)
+        self.assertIn(b'Whisper crashed', response.data)
+        self.assertIn(b'<td>Test Podcast</td>', response.data)
+
+        status = json.loads(self.client.get('/api/v1/status').data)
+        self.assertEqual(status["stages"]["transcribed"]["waiting"], 1)
+
+    def test_cache_stats_report_hit_rate(self):
+        database_manager._read_cache.clear()
+        self.client.get('/')
+        self.client.get('/')
+        stats = json.loads(self.client.get('/cache/stats').data)
+        self.assertEqual(stats["hits"], stats["misses"])
+        self.assertGreater(stats["hit_rate"], 0)
+
+    @patch('database_manager.create_table')
+    def test_repeat_visits_are_revalidated_cheaply(self, mock_create_table):
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss")
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertTrue(response.headers['Last-Modified'])
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+        with patch('database_manager.list_episodes') as mock_list_episodes:
+            response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        mock_list_episodes.assert_not_called()
+        mock_create_table.assert_not_called()
+
+        # Any change to the data changes the ETag
+        database_manager.add_podcast_config("Another Podcast", "http://another.com/rss")
+        response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn(b'Another Podcast', response.data)
+
+    def test_html_is_compressed(self):
+        response = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertIn(b'No podcasts configured yet.', gzip.decompress(response.data))
+
+        response = self.client.get('/')
+        self.assertNotIn('Content-Encoding', response.headers)
+
     @patch('database_manager.get_podcast_config_by_id')
     def test_delete_podcast_not_found(self, mock_get_podcast_config_by_id):
         mock_get_podcast_config_by_id.return_value = None
@@ -0,0 +1,429 @@
+import unittest
+import os
+import sys
+import json
+import sqlite3
+import threading
+import logging
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+# Add the parent directory to the sys.path to allow importing database_manager
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import database_manager
+
+class TestDatabaseManager(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        self.original_database_name = database_manager.DATABASE_NAME
+        database_manager.DATABASE_NAME = "test_database_manager.db"
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.create_table()
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.DATABASE_NAME = self.original_database_name
+
+    def test_connection_is_persistent_per_thread(self):
+        conn = database_manager.connect_db()
+        self.assertIs(database_manager.connect_db(), conn)
+
+        other_thread_connections = []
+        thread = threading.Thread(target=lambda: other_thread_connections.append(database_manager.connect_db()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other_thread_connections[0], conn)
+
+    def test_connection_is_tuned(self):
+        conn = database_manager.connect_db()
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1) # NORMAL
+        self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], database_manager.BUSY_TIMEOUT_MS)
+        self.assertEqual(conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+
+    def test_transaction_rolls_back_on_error(self):
+        with self.assertRaises(sqlite3.IntegrityError):
+            with database_manager.transaction() as conn:
+                conn.execute("INSERT INTO podcast_configs (name, rss_feed_url) VALUES ('A', 'http://a.com/rss')")
+                conn.execute("INSERT INTO podcast_configs (name, rss_feed_url) VALUES ('B', 'http://a.com/rss')")
+        self.assertEqual(database_manager.get_all_podcast_configs(), [])
+
+    def test_reconnects_after_close_or_database_change(self):
+        conn = database_manager.connect_db()
+        conn.close()
+        self.assertTrue(database_manager.add_podcast_config("A", "http://a.com/rss"))
+
+        # Replacing the database file is picked up rather than writing to the old one
+        database_manager.close_all_connections()
+        os.remove(database_manager.DATABASE_NAME)
+        database_manager.create_table()
+        self.assertEqual(database_manager.get_all_podcast_configs(), [])
+
+    def test_concurrent_writers_do_not_fail(self):
+        errors = []
+
+        def add_configs(worker):
+            for n in range(20):
+                if not database_manager.add_podcast_config(f"Podcast {worker}-{n}", f"http://test.com/{worker}/{n}"):
+                    errors.append((worker, n))
+            database_manager.close_connection()
+
+        threads = [threading.Thread(target=add_configs, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(database_manager.get_all_podcast_configs()), 80)
+
+    def test_parse_published_epoch(self):
+        self.assertEqual(database_manager.parse_published_epoch("Mon, 28 Jul 2025 10:00:00 +0000"), 1753696800)
+        self.assertEqual(database_manager.parse_published_epoch("Mon, 28 Jul 2025 11:00:00 +0100"), 1753696800)
+        self.assertEqual(database_manager.parse_published_epoch("2025-07-28T10:00:00"), 1753696800)
+        self.assertIsNone(database_manager.parse_published_epoch("not a date"))
+        self.assertIsNone(database_manager.parse_published_epoch(None))
+
+    def test_migrations_backfill_existing_database(self):
+        # Build a database as it was before migrations existed
+        database_manager.clear_all_data()
+        conn = database_manager.connect_db()
+        conn.execute("""
+            CREATE TABLE episodes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, podcast_url TEXT NOT NULL, episode_url TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL, published_date TEXT, audio_filepath TEXT, transcription_filepath TEXT,
+                summary_filepath TEXT, summary_text TEXT, processed_timestamp TEXT
+            )
+        """)
+        conn.execute("CREATE TABLE podcast_configs (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, rss_feed_url TEXT NOT NULL UNIQUE, recipient_email TEXT)")
+        conn.execute("INSERT INTO podcast_configs (name, rss_feed_url) VALUES ('Feed', 'http://feed.com/rss')")
+        dates = ["Wed, 30 Jul 2025 10:00:00 +0000", "Mon, 28 Jul 2025 10:00:00 +0000", "Tue, 29 Jul 2025 10:00:00 +0000", "unknown"]
+        conn.executemany(
+            "INSERT INTO episodes (podcast_url, episode_url, title, published_date) VALUES (?, ?, ?, ?)",
+            [("http://feed.com/rss", f"http://feed.com/{n}.mp3", f"Episode {n}", date) for n, date in enumerate(dates)]
+        )
+
+        with patch('database_manager.BACKFILL_BATCH_SIZE', 2):
+            database_manager.create_table()
+
+        self.assertEqual(database_manager.get_schema_version(), len(database_manager.MIGRATIONS))
+        episodes = database_manager.list_episodes()["episodes"]
+        # Chronological rather than alphabetical by weekday; the unparseable date sorts last
+        self.assertEqual([e["title"] for e in episodes], ["Episode 0", "Episode 2", "Episode 1", "Episode 3"])
+        self.assertEqual({e["podcast_id"] for e in episodes}, {1})
+
+        # Migrations are not re-applied
+        with patch('database_manager._add_episode_ordering_columns') as mock_migration:
+            database_manager.create_table()
+        mock_migration.assert_not_called()
+
+    def test_new_episodes_are_indexed_by_podcast_and_date(self):
+        database_manager.add_podcast_config("Feed", "http://feed.com/rss")
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3",
+            "title": "Episode 1", "published_date": "Mon, 28 Jul 2025 10:00:00 +0000",
+        })
+        episode = database_manager.get_episode_by_url("http://feed.com/1.mp3")
+        self.assertEqual(episode["published_epoch"], 1753696800)
+        self.assertEqual(episode["podcast_id"], 1)
+
+        plan = " ".join(row[3] for row in database_manager.connect_db().execute(
+            f"EXPLAIN QUERY PLAN SELECT {database_manager.EPISODE_LIST_COLUMNS} FROM episodes WHERE podcast_id = ? ORDER BY published_epoch DESC, id DESC", (1,)))
+        # Listings are read from the index alone
+        self.assertIn("COVERING INDEX idx_episodes_podcast", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_list_episodes_pages_by_keyset(self):
+        for n in range(5):
+            database_manager.add_episode({
+                "podcast_url": "http://feed.com/rss", "episode_url": f"http://feed.com/{n}.mp3", "title": f"Episode {n}",
+                "published_date": f"Mon, 0{n + 1} Sep 2025 10:00:00 +0000", "summary_text": "A long summary",
+            })
+
+        first = database_manager.list_episodes(limit=2)
+        self.assertEqual([e["title"] for e in first["episodes"]], ["Episode 4", "Episode 3"])
+        self.assertNotIn("summary_text", first["episodes"][0])
+        self.assertIsNone(first["prev_cursor"])
+
+        second = database_manager.list_episodes(after=first["next_cursor"], limit=2)
+        third = database_manager.list_episodes(after=second["next_cursor"], limit=2)
+        self.assertEqual([e["title"] for e in second["episodes"]], ["Episode 2", "Episode 1"])
+        self.assertEqual([e["title"] for e in third["episodes"]], ["Episode 0"])
+        self.assertIsNone(third["next_cursor"])
+
+        back = database_manager.list_episodes(before=second["prev_cursor"], limit=2)
+        self.assertEqual(back["episodes"], first["episodes"])
+        self.assertIsNone(back["prev_cursor"])
+
+        with self.assertRaises(ValueError):
+            database_manager.list_episodes(after="bogus")
+
+        plan = " ".join(row[3] for row in database_manager.connect_db().execute(
+            f"EXPLAIN QUERY PLAN SELECT {database_manager.EPISODE_LIST_COLUMNS} FROM episodes WHERE (published_epoch, id) < (?, ?) ORDER BY published_epoch DESC, id DESC LIMIT 3", (0, 0)))
+        self.assertIn("COVERING INDEX idx_episodes_published", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_search_index_is_maintained_incrementally(self):
+        transcript_path = "test_search_transcript.txt"
+        self.addCleanup(os.remove, transcript_path)
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write("intro " * 400 + "the economics of renewable energy storage " + "outro " * 400)
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3", "title": "Batteries",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "summary_text": "A talk about grid storage.",
+            "transcription_filepath": transcript_path,
+        })
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/2.mp3", "title": "Gardening",
+            "published_date": "Mon, 08 Sep 2025 10:00:00 +0000", "summary_text": "Growing tomatoes.",
+        })
+        self.assertTrue(database_manager.index_transcript("http://feed.com/1.mp3", transcript_path))
+
+        # Stemmed transcript match, with the matched term marked in a short snippet
+        results = database_manager.search_episodes("economic")
+        self.assertEqual([r["title"] for r in results], ["Batteries"])
+        self.assertIsNotNone(results[0]["segment_position"])
+        self.assertIn(f"{database_manager.SNIPPET_START}economics{database_manager.SNIPPET_END}", results[0]["snippet"])
+        self.assertLess(len(results[0]["snippet"].split()), 40)
+
+        self.assertEqual([r["title"] for r in database_manager.search_episodes("tomatoes")], ["Gardening"])
+
+        # Re-summarizing updates the index
+        episode = database_manager.get_episode_by_url("http://feed.com/2.mp3")
+        database_manager.update_episode_summary(episode["id"], "Pruning roses.")
+        self.assertEqual(database_manager.search_episodes("tomatoes"), [])
+        self.assertEqual([r["title"] for r in database_manager.search_episodes("roses")], ["Gardening"])
+
+        # Operators and quotes in user input are treated as plain words
+        self.assertEqual(database_manager.search_episodes('grid" OR (NEAR'), [])
+        self.assertEqual(database_manager.search_episodes("   "), [])
+
+        # A full rebuild reproduces the same index
+        self.assertEqual(database_manager.rebuild_search_index(), 1)
+        self.assertEqual([r["title"] for r in database_manager.search_episodes("renewable storage")], ["Batteries"])
+
+    def test_transcripts_are_stored_compressed_and_deduplicated(self):
+        transcript_path = "test_artifact_transcript.txt"
+        self.addCleanup(os.remove, transcript_path)
+        transcript = "A rerun of a popular episode. " * 500
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write(transcript)
+        for n in (1, 2):
+            database_manager.add_episode({
+                "podcast_url": "http://feed.com/rss", "episode_url": f"http://feed.com/{n}.mp3", "title": f"Episode {n}",
+                "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "transcription_filepath": transcript_path,
+            })
+            self.assertTrue(database_manager.index_transcript(f"http://feed.com/{n}.mp3", transcript_path))
+
+        # The transcript is read back from the database even once its file is gone
+        os.remove(transcript_path)
+        open(transcript_path, "w").close()
+        episode = database_manager.get_episode_by_url("http://feed.com/2.mp3")
+        self.assertEqual(database_manager.get_transcript(episode["id"]), transcript)
+        self.assertNotIn("transcript", episode)
+
+        info = database_manager.get_episode_artifact_info(episode["id"])["transcript"]
+        self.assertEqual(info["size"], len(transcript))
+        self.assertLess(info["stored_size"], info["size"] // 10)
+        self.assertEqual(database_manager.connect_db().execute("SELECT COUNT(*) FROM artifacts").fetchone()[0], 1)
+
+        # Artifacts are only deleted once no episode refers to them
+        with database_manager.transaction() as conn:
+            conn.execute("DELETE FROM episodes WHERE id = ?", (episode["id"],))
+        self.assertEqual(database_manager.delete_unreferenced_artifacts(), 0)
+        with database_manager.transaction() as conn:
+            conn.execute("DELETE FROM episodes")
+        self.assertEqual(database_manager.delete_unreferenced_artifacts(), 1)
+
+    def test_migration_imports_transcript_files(self):
+        transcript_path = "test_migration_transcript.txt"
+        self.addCleanup(os.remove, transcript_path)
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write("Imported transcript text.")
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3", "title": "Episode 1",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "transcription_filepath": transcript_path,
+        })
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/2.mp3", "title": "Episode 2",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "transcription_filepath": "missing.txt",
+        })
+
+        # Re-run the import as if upgrading a database from before the artifact store
+        import_version = database_manager.MIGRATIONS.index(database_manager._import_transcript_files) + 1
+        database_manager.connect_db().execute(f"PRAGMA user_version = {import_version - 1}")
+        database_manager.run_migrations()
+
+        self.assertEqual(database_manager.get_schema_version(), len(database_manager.MIGRATIONS))
+        self.assertEqual(database_manager.get_episode_artifact(1, database_manager.TRANSCRIPT_ARTIFACT), "Imported transcript text.")
+        self.assertIsNone(database_manager.get_episode_artifact(2, database_manager.TRANSCRIPT_ARTIFACT))
+
+    def test_summary_html_is_rendered_once_when_stored(self):
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3", "title": "Episode",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "summary_text": "* <script>x</script>**Point**",
+        })
+        database_manager.save_summary_variant("http://feed.com/1.mp3", "short", "_Short_")
+        episode = database_manager.get_episode_by_url("http://feed.com/1.mp3")
+        self.assertEqual(episode["summary_html"], "<ul>\n<li><strong>Point</strong></li>\n</ul>")
+        self.assertEqual(episode["summary_html_version"], database_manager.SUMMARY_RENDERER_VERSION)
+
+        with patch('database_manager.render_summary_html') as mock_render:
+            self.assertEqual(database_manager.get_summary_html(episode), episode["summary_html"])
+            self.assertEqual(database_manager.get_summary_variants_html("http://feed.com/1.mp3"), {"short": "<p><em>Short</em></p>"})
+        mock_render.assert_not_called()
+
+        database_manager.update_episode_summary(episode["id"], "New summary.")
+        self.assertEqual(database_manager.get_episode_by_id(episode["id"])["summary_html"], "<p>New summary.</p>")
+
+    def test_stale_summary_html_is_rerendered_at_startup_not_on_read(self):
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3", "title": "Episode",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "summary_text": "Summary.",
+        })
+        database_manager.save_summary_variant("http://feed.com/1.mp3", "short", "Short.")
+        with database_manager.transaction() as conn:
+            # As left by a summary stored before summaries were rendered, and by an older renderer
+            conn.execute("UPDATE episodes SET summary_html = NULL, summary_html_version = NULL")
+            conn.execute("UPDATE summary_variants SET summary_html = 'old', summary_html_version = 0")
+
+        # Reads render stale HTML without writing, so cached reads and ETags stay valid
+        version = database_manager.get_data_version()
+        episode = database_manager.get_episode_by_url("http://feed.com/1.mp3")
+        self.assertEqual(database_manager.get_summary_html(episode), "<p>Summary.</p>")
+        self.assertEqual(database_manager.get_summary_variants_html("http://feed.com/1.mp3"), {"short": "<p>Short.</p>"})
+        self.assertEqual(database_manager.get_data_version(), version)
+        self.assertIsNone(database_manager.get_episode_by_url("http://feed.com/1.mp3")["summary_html"])
+
+        # Startup renders and saves them, so later reads need no rendering
+        database_manager.create_table()
+        self.assertEqual(database_manager.rerender_stale_summaries(), 0)
+        episode = database_manager.get_episode_by_url("http://feed.com/1.mp3")
+        self.assertEqual(episode["summary_html"], "<p>Summary.</p>")
+        with patch('database_manager.render_summary_html') as mock_render:
+            self.assertEqual(database_manager.get_summary_variants_html("http://feed.com/1.mp3"), {"short": "<p>Short.</p>"})
+        mock_render.assert_not_called()
+
+    def test_pipeline_status(self):
+        database_manager.add_podcast_config("Feed", "http://feed.com/rss")
+        podcast_id = database_manager.get_all_podcast_configs()[0]["id"]
+        for i in range(3):
+            database_manager.create_pipeline_job({"episode_url": f"http://feed.com/{i}.mp3", "title": f"Episode {i}",
+                                                  "stage": "downloaded"})
+        failed = database_manager.create_pipeline_job({"episode_url": "http://feed.com/3.mp3", "title": "Broken"})
+        database_manager.mark_pipeline_job_failed(failed["id"], "404")
+        now = datetime.now()
+        database_manager.claim_pipeline_job(["downloaded"], "worker-1", 60, now)
+
+        for seconds in range(1, 21):
+            database_manager.record_stage_run(1, "transcribed", "worker-1", float(seconds), now=now)
+        database_manager.record_stage_run(failed["id"], "downloaded", "worker-1", 0.5, "404", now=now)
+        # Outside the window, so pruned
+        database_manager.record_stage_run(1, "summarized", "worker-1", 99.0, now=now - timedelta(days=30))
+        database_manager.record_stage_run(1, "summarized", "worker-1", 10.0, now=now)
+        database_manager.record_feed_poll(podcast_id, now=now)
+        database_manager.record_feed_poll(podcast_id, "Timed out", now=now + timedelta(minutes=5))
+
+        status = database_manager.get_pipeline_status(now)
+        self.assertEqual(status["stages"]["transcribed"]["waiting"], 2)
+        self.assertEqual(status["stages"]["transcribed"]["in_flight"], 1)
+        self.assertEqual(status["stages"]["downloaded"]["failed"], 1)
+        self.assertEqual(status["stages"]["transcribed"]["p50_seconds"], 10.0)
+        self.assertEqual(status["stages"]["transcribed"]["p95_seconds"], 19.0)
+        self.assertEqual(status["stages"]["downloaded"]["runs"], 0) # Failed runs don't count
+        self.assertEqual((status["stages"]["summarized"]["runs"], status["stages"]["summarized"]["p95_seconds"]), (1, 10.0))
+        self.assertEqual(status["stages"]["emailed"]["p50_seconds"], None)
+        self.assertEqual(status["recent_failures"][0]["title"], "Broken")
+        feed = status["feeds"][0]
+        self.assertEqual((feed["last_success_timestamp"], feed["last_error"]), (now.isoformat(), "Timed out"))
+
+        # Only runs within the window are kept
+        rows = database_manager.connect_db().execute("SELECT COUNT(*) FROM pipeline_stage_runs WHERE stage = 'summarized'")
+        self.assertEqual(rows.fetchone()[0], 1)
+
+    def test_transcript_is_paged_and_timed(self):
+        transcript_path = "test_timed_transcript.txt"
+        timings_path = "test_timed_transcript.timings.json"
+        timings = [{"start": i * 10.0, "end": i * 10.0 + 10, "text": f"stretch {i} " + "word " * 48} for i in range(30)]
+        with open(transcript_path, "w", encoding="utf-8") as f:
+            f.write(" ".join(timing["text"] for timing in timings) + " the inflation outlook")
+        with open(timings_path, "w", encoding="utf-8") as f:
+            json.dump(timings[:-1] + [dict(timings[-1], text=timings[-1]["text"] + " the inflation outlook")], f)
+        self.addCleanup(os.remove, transcript_path)
+        self.addCleanup(lambda: os.path.exists(timings_path) and os.remove(timings_path))
+        database_manager.add_episode({
+            "podcast_url": "http://feed.com/rss", "episode_url": "http://feed.com/1.mp3", "title": "Episode",
+            "published_date": "Mon, 01 Sep 2025 10:00:00 +0000", "summary_text": "Summary.",
+        })
+        self.assertTrue(database_manager.index_transcript("http://feed.com/1.mp3", transcript_path))
+        episode_id = database_manager.get_episode_by_url("http://feed.com/1.mp3")["id"]
+
+        # 50-word stretches grouped into segments of at least 150 words
+        page = database_manager.get_transcript_segments(episode_id, limit=4)
+        self.assertEqual([(s["position"], s["start_seconds"], s["end_seconds"]) for s in page["segments"]],
+                         [(0, 0.0, 30.0), (1, 30.0, 60.0), (2, 60.0, 90.0), (3, 90.0, 120.0)])
+        self.assertEqual((page["next_start"], page["prev_before"]), (4, None))
+        page = database_manager.get_transcript_segments(episode_id, start=8, limit=4)
+        self.assertEqual([s["position"] for s in page["segments"]], [8, 9])
+        self.assertEqual((page["next_start"], page["prev_before"]), (None, 8))
+        page = database_manager.get_transcript_segments(episode_id, before=8, limit=4)
+        self.assertEqual([s["position"] for s in page["segments"]], [4, 5, 6, 7])
+
+        self.assertEqual(database_manager.find_transcript_position(episode_id, 125), 4)
+        self.assertEqual(database_manager.find_transcript_position(episode_id, 0), 0)
+
+        hits = database_manager.get_transcript_hits(episode_id, "inflation")
+        self.assertEqual(hits, [{"position": 9, "start_seconds": 270.0}])
+        page = database_manager.get_transcript_segments(episode_id, start=9, query="inflation")
+        self.assertIn(f"{database_manager.SNIPPET_START}inflation{database_manager.SNIPPET_END}", page["segments"][0]["highlighted"])
+
+        # Timings survive a rebuild of the search index, which re-splits stored transcripts
+        os.remove(timings_path)
+        database_manager.rebuild_search_index()
+        self.assertEqual(database_manager.find_transcript_position(episode_id, 125), 4)
+
+    def test_reads_are_cached_until_data_changes(self):
+        database_manager.add_podcast_config("Podcast", "http://example.com/feed.xml")
+        database_manager._read_cache.clear()
+
+        first = database_manager.get_all_podcast_configs()
+        self.assertIs(database_manager.get_all_podcast_configs(), first)
+        stats = database_manager.get_read_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+        # A write from another process bumps the data version and invalidates the cache
+        other_process = sqlite3.connect(database_manager.DATABASE_NAME)
+        with other_process:
+            other_process.execute("UPDATE podcast_configs SET name = 'Renamed'")
+        other_process.close()
+        self.assertEqual([c["name"] for c in database_manager.get_all_podcast_configs()], ["Renamed"])
+
+        # Reads inside a write transaction see its uncommitted changes, and aren't cached
+        with self.assertRaises(RuntimeError):
+            with database_manager.transaction() as conn:
+                conn.execute("UPDATE podcast_configs SET name = 'Uncommitted'")
+                self.assertEqual(database_manager.get_all_podcast_configs()[0]["name"], "Uncommitted")
+                raise RuntimeError("roll back")
+        self.assertEqual(database_manager.get_all_podcast_configs()[0]["name"], "Renamed")
+
+    def test_read_cache_evicts_least_recently_used(self):
+        cache = database_manager.ReadCache(maxsize=2)
+        cache.get("a", 1, lambda: "A")
+        cache.get("b", 1, lambda: "B")
+        cache.get("a", 1, lambda: "stale")
+        cache.get("c", 1, lambda: "C")
+        self.assertEqual(cache.get("a", 1, lambda: "reloaded"), "A")
+        self.assertEqual(cache.get("b", 1, lambda: "reloaded"), "reloaded")
+        self.assertEqual(cache.get("a", 2, lambda: "new version"), "new version")
+        self.assertEqual(cache.stats()["size"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
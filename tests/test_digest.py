@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import logging
+from datetime import datetime, timedelta
+
+# Add the parent directory to the sys.path to allow importing digest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from digest import deliver_digests
+from send_email import MAX_EMAIL_ATTEMPTS
+import database_manager
+
+class TestDigest(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        # Clean up any existing database file
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.create_table()
+        database_manager.set_recipient_digest_frequency("digest@example.com", "hourly")
+        for n in (1, 2):
+            database_manager.enqueue_email({
+                "episode_url": f"http://test.com/episode{n}.mp3",
+                "recipient_email": "digest@example.com",
+                "subject": f"Summacast: Podcast - Episode {n}",
+                "podcast_name": "Podcast",
+                "episode_title": f"Episode {n}",
+                "published_date": "2025-07-27",
+                "summary_text": f"Summary {n}"
+            })
+        self.now = datetime.now()
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+
+    @patch('digest.send_html_email')
+    def test_digest_batches_summaries_into_one_email(self, mock_send_html_email):
+        mock_send_html_email.return_value = True
+
+        # Digest recipients are skipped by the per-episode sender
+        self.assertEqual(database_manager.get_due_emails(self.now), [])
+
+        deliver_digests(self.now)
+
+        mock_send_html_email.assert_called_once()
+        subject, html_body, recipient = mock_send_html_email.call_args.args
+        self.assertEqual(subject, "Summacast digest: 2 new episode summaries")
+        self.assertIn("Summary 1", html_body)
+        self.assertIn("Summary 2", html_body)
+        self.assertEqual(recipient, "digest@example.com")
+        self.assertEqual(database_manager.get_pending_emails_for_recipient("digest@example.com", self.now), [])
+
+    @patch('digest.send_html_email')
+    def test_digest_waits_for_window(self, mock_send_html_email):
+        mock_send_html_email.return_value = True
+        deliver_digests(self.now)
+        database_manager.enqueue_email({
+            "episode_url": "http://test.com/episode3.mp3",
+            "recipient_email": "digest@example.com",
+            "subject": "Summacast: Podcast - Episode 3",
+            "podcast_name": "Podcast",
+            "episode_title": "Episode 3",
+            "summary_text": "Summary 3"
+        })
+
+        deliver_digests(self.now + timedelta(minutes=30))
+        self.assertEqual(mock_send_html_email.call_count, 1)
+
+        deliver_digests(self.now + timedelta(hours=1))
+        self.assertEqual(mock_send_html_email.call_count, 2)
+        self.assertIn("Summary 3", mock_send_html_email.call_args.args[1])
+
+    @patch('digest.send_html_email')
+    def test_failed_digest_is_retried(self, mock_send_html_email):
+        mock_send_html_email.return_value = False
+        deliver_digests(self.now)
+        self.assertEqual(database_manager.get_pending_emails_for_recipient("digest@example.com", self.now), [])
+        # Retried with the outbox's backoff, starting at a minute
+        self.assertEqual(len(database_manager.get_pending_emails_for_recipient("digest@example.com", self.now + timedelta(minutes=1))), 2)
+
+        # and given up on after as many attempts as an outbox email
+        for attempt in range(2, MAX_EMAIL_ATTEMPTS + 1):
+            deliver_digests(self.now + timedelta(hours=7 * attempt))
+        self.assertEqual(mock_send_html_email.call_count, MAX_EMAIL_ATTEMPTS)
+        self.assertEqual(database_manager.get_pending_emails_for_recipient("digest@example.com", self.now + timedelta(days=30)), [])
+        statuses = database_manager.connect_db().execute("SELECT status, attempts FROM outbox").fetchall()
+        self.assertEqual([tuple(row) for row in statuses], [("failed", MAX_EMAIL_ATTEMPTS)] * 2)
+
+if __name__ == '__main__':
+    unittest.main()
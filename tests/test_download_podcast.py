@@ -3,11 +3,13 @@ from unittest.mock import patch, mock_open, MagicMock
 import os
 import sys
 import logging
+import tempfile
+import requests
 
 # Add the parent directory to the sys.path to allow importing download_podcast
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from download_podcast import download_latest_podcast_episode
+from download_podcast import download_latest_podcast_episode, download_episode
 from transcribe_podcast import transcribe_audio
 
 class TestDownloadPodcast(unittest.TestCase):
@@ -24,7 +26,8 @@ class TestDownloadPodcast(unittest.TestCase):
     @patch('download_podcast.requests.get')
     @patch('download_podcast.os.path.exists')
     @patch('download_podcast.os.makedirs')
-    def test_download_latest_podcast_episode_success(self, mock_makedirs, mock_exists, mock_requests_get, mock_feedparser_parse):
+    @patch('download_podcast.os.replace')
+    def test_download_latest_podcast_episode_success(self, mock_replace, mock_makedirs, mock_exists, mock_requests_get, mock_feedparser_parse):
         # Mock feedparser.parse to return a sample feed
         mock_entry = MagicMock()
         mock_entry.title = 'Test Episode: The Best One!'
@@ -56,8 +59,9 @@ class TestDownloadPodcast(unittest.TestCase):
             mock_makedirs.assert_called_once_with("test_podcasts")
             mock_requests_get.assert_called_once_with("http://example.com/audio/test_episode.mp3?param=123", stream=True)
 
-            # Check if the file was opened for writing with the correct path and mode
-            mocked_file.assert_called_once_with(expected_filepath, 'wb')
+            # Check the audio was written to a partial file, then moved into place
+            mocked_file.assert_called_once_with(expected_filepath + '.part', 'wb')
+            mock_replace.assert_called_once_with(expected_filepath + '.part', expected_filepath)
 
             # Check if content was written to the file
             mocked_file().write.assert_any_call(b'audio_data_chunk_1')
@@ -151,6 +155,26 @@ class TestDownloadPodcast(unittest.TestCase):
             self.assertEqual(result["file_path"], expected_filepath)
             self.assertFalse(result["is_new_download"])
 
+    @patch('download_podcast.requests.get')
+    def test_interrupted_download_leaves_no_file(self, mock_requests_get):
+        def interrupted_stream(chunk_size):
+            yield b'audio_data_chunk_1'
+            raise requests.exceptions.ConnectionError("Connection reset")
+        mock_requests_get.return_value.iter_content.side_effect = interrupted_stream
+
+        with tempfile.TemporaryDirectory() as download_directory:
+            file_path = os.path.join(download_directory, "episode.mp3")
+            self.assertIsNone(download_episode("http://example.com/audio/episode.mp3", file_path))
+            self.assertEqual(os.listdir(download_directory), [])
+
+            # The next attempt, e.g. by a worker taking over the job, downloads the whole file again
+            mock_requests_get.return_value.iter_content.side_effect = None
+            mock_requests_get.return_value.iter_content.return_value = [b'audio_data_chunk_1', b'audio_data_chunk_2']
+            self.assertTrue(download_episode("http://example.com/audio/episode.mp3", file_path))
+            with open(file_path, 'rb') as f:
+                self.assertEqual(f.read(), b'audio_data_chunk_1audio_data_chunk_2')
+            self.assertEqual(os.listdir(download_directory), ["episode.mp3"])
+
     def test_filename_sanitization(self):
         # This test directly calls the function with a mocked environment to isolate filename sanitization
         # We need to mock os.path.join and os.path.splitext to control their behavior for this specific test
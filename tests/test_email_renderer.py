@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import subprocess
+import logging
+
+# Add the parent directory to the sys.path to allow importing email_renderer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import email_renderer
+
+class TestEmailRenderer(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        email_renderer.render_summary_email.cache_clear()
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        email_renderer.render_summary_email.cache_clear()
+
+    def test_render_summary_email(self):
+        html_body = email_renderer.render_summary_email(
+            "Test Podcast", "Test <Episode>", "2025-01-01", "## Key Quote\n\n* First point"
+        )
+        self.assertIn("<h2>Test Podcast - Test &lt;Episode&gt;</h2>", html_body)
+        self.assertIn("<h2>Key Quote</h2>", html_body)
+        self.assertIn("<li>First point</li>", html_body)
+
+    def test_render_digest_email(self):
+        html_body = email_renderer.render_digest_email([
+            {"podcast_name": "Podcast A", "episode_title": "Episode 1", "published_date": "2025-01-01", "summary_text": "* Point A"},
+            {"podcast_name": "Podcast B", "episode_title": "Episode 2", "published_date": None, "summary_text": "* Point B"},
+        ])
+        self.assertIn("<title>Summacast Digest</title>", html_body)
+        self.assertIn("<h2>Podcast A - Episode 1</h2>", html_body)
+        self.assertIn("<li>Point A</li>", html_body)
+        self.assertIn("<h2>Podcast B - Episode 2</h2>", html_body)
+        self.assertIn("<li>Point B</li>", html_body)
+
+    def test_markdown_converter_is_reset_between_calls(self):
+        # Footnote/reference state from one summary must not leak into the next
+        first = email_renderer.summary_to_html("[link][ref]\n\n[ref]: http://example.com")
+        second = email_renderer.summary_to_html("[link][ref]")
+        self.assertIn('href="http://example.com"', first)
+        self.assertNotIn('href', second)
+
+    def test_render_is_reused_for_every_recipient(self):
+        with patch('email_renderer.render_summary_html', return_value="<p>Summary</p>") as mock_render_summary_html:
+            first = email_renderer.render_summary_email("Podcast", "Episode", "2025-01-01", "Summary")
+            second = email_renderer.render_summary_email("Podcast", "Episode", "2025-01-01", "Summary")
+        self.assertIs(first, second)
+        mock_render_summary_html.assert_called_once_with("Summary")
+
+    def test_does_not_import_flask_app(self):
+        code = "import send_email, sys; assert 'app' not in sys.modules and 'flask' not in sys.modules"
+        repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        result = subprocess.run([sys.executable, "-c", code], cwd=repo_root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+if __name__ == '__main__':
+    unittest.main()
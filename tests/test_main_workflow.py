@@ -4,11 +4,16 @@ import os
 import sys
 import json
 import logging
+import subprocess
+import threading
 
 # Add the parent directory to the sys.path to allow importing main_workflow
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from main_workflow import process_podcasts
+from datetime import datetime, timedelta
+from markupsafe import Markup
+import main_workflow
+from main_workflow import process_podcasts, deliver_outbox, StagedPipeline
 import database_manager
 
 DATABASE_NAME = "summacast.db" # Define the database name for cleanup
@@ -19,26 +24,32 @@ class TestMainWorkflow(unittest.TestCase):
         # Disable logging during tests to prevent clutter
         logging.disable(logging.CRITICAL)
         # Clean up any existing database file
+        database_manager.close_all_connections()
         if os.path.exists(DATABASE_NAME):
             os.remove(DATABASE_NAME)
         database_manager.create_table()
         database_manager.create_podcast_configs_table()
+        # Downloads succeed without touching the network
+        download_patcher = patch('main_workflow.download_episode', return_value=True)
+        self.mock_download_episode = download_patcher.start()
+        self.addCleanup(download_patcher.stop)
 
     def tearDown(self):
         # Re-enable logging after tests
         logging.disable(logging.NOTSET)
         # Clean up any created files and database
+        database_manager.close_all_connections()
         if os.path.exists(DATABASE_NAME):
             os.remove(DATABASE_NAME)
 
-    @patch('main_workflow.download_latest_podcast_episode')
+    @patch('main_workflow.discover_latest_episode')
     @patch('main_workflow.transcribe_audio')
-    @patch('main_workflow.summarize_text')
+    @patch('main_workflow.summarize_transcript')
     @patch('main_workflow.send_email')
     @patch('main_workflow.time.sleep')
     @patch('main_workflow.os.path.exists')
     @patch('builtins.open', new_callable=mock_open)
-    def test_main_workflow_new_episode_processed(self, mock_open_builtin, mock_exists, mock_sleep, mock_send_email, mock_summarize_text, mock_transcribe_audio, mock_download_episode):
+    def test_main_workflow_new_episode_processed(self, mock_open_builtin, mock_exists, mock_sleep, mock_send_email, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
         # Mock podcast_config.json content
         mock_exists.side_effect = [True, True, True] # podcast_config.json, processed_episodes.json, then for each episode
         mock_open_builtin.side_effect = [
@@ -49,16 +60,15 @@ class TestMainWorkflow(unittest.TestCase):
             mock_open().return_value # For processed_episodes.json (save)
         ]
 
-        # Mock download_latest_podcast_episode to return a new episode
-        mock_download_episode.return_value = {
+        # Mock discover_latest_episode to return a new episode
+        mock_discover_episode.return_value = {
             "episode_title": "New Episode",
             "episode_url": "http://test.com/new_episode.mp3",
             "file_path": "podcasts/new_episode.mp3",
-            "is_new_download": True,
             "published_date": "2025-07-27T12:00:00"
         }
         mock_transcribe_audio.return_value = "transcription.txt"
-        mock_summarize_text.return_value = "This is a summary."
+        mock_summarize_transcript.return_value = ("This is a summary.", {})
         mock_send_email.return_value = True # Email sent successfully
 
         # Run main for one iteration
@@ -78,12 +88,14 @@ class TestMainWorkflow(unittest.TestCase):
 
                         try:
                             process_podcasts()
+                            deliver_outbox()
                         except KeyboardInterrupt:
                             pass
 
-                        mock_download_episode.assert_called_once_with("http://test.com/rss")
+                        mock_discover_episode.assert_called_once_with("http://test.com/rss")
+                        self.mock_download_episode.assert_called_once_with("http://test.com/new_episode.mp3", "podcasts/new_episode.mp3")
                         mock_transcribe_audio.assert_called_once_with("podcasts/new_episode.mp3")
-                        mock_summarize_text.assert_called_once_with("transcription.txt")
+                        mock_summarize_transcript.assert_called_once_with("transcription.txt", [])
                         mock_send_email.assert_called_once_with(
                             "Summacast: Test Podcast - New Episode",
                             "This is a summary.",
@@ -91,20 +103,19 @@ class TestMainWorkflow(unittest.TestCase):
                             "Test Podcast",
                             "New Episode",
                             "2025-07-27T12:00:00",
-                            "test@example.com"
+                            ["test@example.com"]
                         )
                         mock_episode_exists.assert_called_once_with("http://test.com/new_episode.mp3")
                         mock_add_episode.assert_called_once()
 
-    @patch('main_workflow.download_latest_podcast_episode')
+    @patch('main_workflow.discover_latest_episode')
     @patch('main_workflow.time.sleep')
-    def test_main_workflow_episode_already_processed(self, mock_sleep, mock_download_episode):
-        # Mock download_latest_podcast_episode to return an existing episode
-        mock_download_episode.return_value = {
+    def test_main_workflow_episode_already_processed(self, mock_sleep, mock_discover_episode):
+        # Mock discover_latest_episode to return an existing episode
+        mock_discover_episode.return_value = {
             "episode_title": "Existing Episode",
             "episode_url": "http://test.com/existing_episode.mp3",
             "file_path": "podcasts/existing_episode.mp3",
-            "is_new_download": False,
             "published_date": "2025-07-27T09:00:00"
         }
 
@@ -123,40 +134,40 @@ class TestMainWorkflow(unittest.TestCase):
 
                         try:
                             process_podcasts()
+                            deliver_outbox()
                         except KeyboardInterrupt:
                             pass
 
-                        mock_download_episode.assert_called_once_with("http://test.com/rss")
+                        mock_discover_episode.assert_called_once_with("http://test.com/rss")
                         mock_episode_exists.assert_called_once_with("http://test.com/existing_episode.mp3")
                         mock_add_episode.assert_not_called() # Should not add if episode already exists
 
-    @patch('main_workflow.download_latest_podcast_episode')
+    @patch('main_workflow.discover_latest_episode')
     @patch('main_workflow.transcribe_audio')
-    @patch('main_workflow.summarize_text')
+    @patch('main_workflow.summarize_transcript')
     @patch('main_workflow.send_email')
     @patch('main_workflow.time.sleep')
-    def test_main_workflow_multiple_podcasts(self, mock_sleep, mock_send_email, mock_summarize_text, mock_transcribe_audio, mock_download_episode):
-        # Mock download_latest_podcast_episode for Podcast A
-        mock_download_episode.side_effect = [
+    def test_main_workflow_multiple_podcasts(self, mock_sleep, mock_send_email, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        # Mock discover_latest_episode for Podcast A
+        mock_discover_episode.side_effect = [
             {
                 "episode_title": "New Episode A",
                 "episode_url": "http://test.com/new_episodeA.mp3",
                 "file_path": "podcasts/new_episodeA.mp3",
-                "is_new_download": True,
-                "published_date": "2025-07-27T10:00:00"
+                    "published_date": "2025-07-27T10:00:00"
             },
-            # Mock download_latest_podcast_episode for Podcast B
+            # Mock discover_latest_episode for Podcast B
             {
                 "episode_title": "New Episode B",
                 "episode_url": "http://test.com/new_episodeB.mp3",
                 "file_path": "podcasts/new_episodeB.mp3",
-                "is_new_download": True,
-                "published_date": "2025-07-27T11:00:00"
+                    "published_date": "2025-07-27T11:00:00"
             }
         ]
-        mock_transcribe_audio.side_effect = ["transcriptionA.txt", "transcriptionB.txt"]
-        mock_summarize_text.side_effect = ["Summary A", "Summary B"]
-        mock_send_email.side_effect = [True, True]
+        # The episodes run through the pipeline side by side, so results are keyed by episode rather than call order
+        mock_transcribe_audio.side_effect = {"podcasts/new_episodeA.mp3": "transcriptionA.txt", "podcasts/new_episodeB.mp3": "transcriptionB.txt"}.get
+        mock_summarize_transcript.side_effect = lambda path, variants: ({"transcriptionA.txt": "Summary A", "transcriptionB.txt": "Summary B"}[path], {})
+        mock_send_email.return_value = True
 
         with patch('database_manager.get_all_podcast_configs') as mock_get_all_podcast_configs:
             with patch('database_manager.episode_exists') as mock_episode_exists:
@@ -167,21 +178,22 @@ class TestMainWorkflow(unittest.TestCase):
                             {"name": "Podcast A", "rss_feed_url": "http://test.com/rssA", "recipient_email": "a@test.com"},
                             {"name": "Podcast B", "rss_feed_url": "http://test.com/rssB", "recipient_email": "b@test.com"}
                         ]
-                        mock_episode_exists.side_effect = [False, False] # Both episodes do not exist in DB
-                        mock_add_episode.side_effect = [True, True] # Both episodes added successfully
+                        mock_episode_exists.return_value = False # Both episodes do not exist in DB
+                        mock_add_episode.return_value = True # Both episodes added successfully
 
                         # To stop the infinite loop after one iteration
                         mock_sleep_inner.side_effect = [KeyboardInterrupt]
 
                         try:
                             process_podcasts()
+                            deliver_outbox()
                         except KeyboardInterrupt:
                             pass
 
                         # Assertions for Podcast A
-                        mock_download_episode.assert_any_call("http://test.com/rssA")
+                        mock_discover_episode.assert_any_call("http://test.com/rssA")
                         mock_transcribe_audio.assert_any_call("podcasts/new_episodeA.mp3")
-                        mock_summarize_text.assert_any_call("transcriptionA.txt")
+                        mock_summarize_transcript.assert_any_call("transcriptionA.txt", [])
                         mock_send_email.assert_any_call(
                             "Summacast: Podcast A - New Episode A",
                             "Summary A",
@@ -189,7 +201,7 @@ class TestMainWorkflow(unittest.TestCase):
                             "Podcast A",
                             "New Episode A",
                             "2025-07-27T10:00:00",
-                            "a@test.com"
+                            ["a@test.com"]
                         )
                         mock_episode_exists.assert_any_call("http://test.com/new_episodeA.mp3")
                         mock_add_episode.assert_any_call({
@@ -204,9 +216,9 @@ class TestMainWorkflow(unittest.TestCase):
                         })
 
                         # Assertions for Podcast B
-                        mock_download_episode.assert_any_call("http://test.com/rssB")
+                        mock_discover_episode.assert_any_call("http://test.com/rssB")
                         mock_transcribe_audio.assert_any_call("podcasts/new_episodeB.mp3")
-                        mock_summarize_text.assert_any_call("transcriptionB.txt")
+                        mock_summarize_transcript.assert_any_call("transcriptionB.txt", [])
                         mock_send_email.assert_any_call(
                             "Summacast: Podcast B - New Episode B",
                             "Summary B",
@@ -214,7 +226,7 @@ class TestMainWorkflow(unittest.TestCase):
                             "Podcast B",
                             "New Episode B",
                             "2025-07-27T11:00:00",
-                            "b@test.com"
+                            ["b@test.com"]
                         )
                         mock_episode_exists.assert_any_call("http://test.com/new_episodeB.mp3")
                         mock_add_episode.assert_any_call({
@@ -230,22 +242,23 @@ class TestMainWorkflow(unittest.TestCase):
 
                         self.assertEqual(mock_add_episode.call_count, 2)
 
-    @patch('main_workflow.download_latest_podcast_episode')
+    @patch('main_workflow.discover_latest_episode')
     @patch('main_workflow.transcribe_audio')
-    @patch('main_workflow.summarize_text')
+    @patch('summarize_podcast.map_transcript', return_value=["Notes"])
+    @patch('summarize_podcast.run_gemini')
+    @patch('summarize_podcast.save_summary')
     @patch('main_workflow.send_email')
     @patch('main_workflow.time.sleep')
-    def test_summary_prefix_stripping(self, mock_sleep, mock_send_email, mock_summarize_text, mock_transcribe_audio, mock_download_episode):
-        # Mock download_latest_podcast_episode to return a new episode
-        mock_download_episode.return_value = {
+    def test_summary_prefix_stripping(self, mock_sleep, mock_send_email, mock_save_summary, mock_run_gemini, mock_map_transcript, mock_transcribe_audio, mock_discover_episode):
+        # Mock discover_latest_episode to return a new episode
+        mock_discover_episode.return_value = {
             "episode_title": "New Episode",
             "episode_url": "http://test.com/new_episode.mp3",
             "file_path": "podcasts/new_episode.mp3",
-            "is_new_download": True,
             "published_date": "2025-07-27T12:00:00"
         }
         mock_transcribe_audio.return_value = "transcription.txt"
-        mock_summarize_text.return_value = "Summary: This is the actual summary content."
+        mock_run_gemini.return_value = "Summary: This is the actual summary content."
         mock_send_email.return_value = True
 
         with patch('database_manager.get_all_podcast_configs') as mock_get_all_podcast_configs:
@@ -261,6 +274,7 @@ class TestMainWorkflow(unittest.TestCase):
 
                         try:
                             process_podcasts()
+                            deliver_outbox()
                         except KeyboardInterrupt:
                             pass
 
@@ -272,5 +286,301 @@ class TestMainWorkflow(unittest.TestCase):
                             "Test Podcast",
                             "New Episode",
                             "2025-07-27T12:00:00",
-                            "test@example.com"
+                            ["test@example.com"]
                         )
+
+    @patch('main_workflow.discover_latest_episode')
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    @patch('main_workflow.send_email')
+    def test_summary_variant_sent_to_recipient(self, mock_send_email, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        mock_discover_episode.return_value = {
+            "episode_title": "New Episode",
+            "episode_url": "http://test.com/new_episode.mp3",
+            "file_path": "podcasts/new_episode.mp3",
+            "published_date": "2025-07-27T12:00:00"
+        }
+        mock_transcribe_audio.return_value = "transcription.txt"
+        mock_summarize_transcript.return_value = ("Full summary.", {"short": "Short summary."})
+        mock_send_email.return_value = True
+
+        with patch('database_manager.get_all_podcast_configs') as mock_get_all_podcast_configs:
+            mock_get_all_podcast_configs.return_value = [
+                {"name": "Test Podcast", "rss_feed_url": "http://test.com/rss", "recipient_email": "test@example.com", "summary_variant": "short"}
+            ]
+            process_podcasts()
+        deliver_outbox()
+
+        mock_summarize_transcript.assert_called_once_with("transcription.txt", ["short"])
+        mock_send_email.assert_called_once_with(
+            "Summacast: Test Podcast - New Episode",
+            "Short summary.",
+            Markup("<p>Short summary.</p>"),
+            "Test Podcast",
+            "New Episode",
+            "2025-07-27T12:00:00",
+            ["test@example.com"]
+        )
+        self.assertEqual(database_manager.get_summary_variants("http://test.com/new_episode.mp3"), {"short": "Short summary."})
+        self.assertEqual(database_manager.get_episode_by_url("http://test.com/new_episode.mp3")["summary_text"], "Full summary.")
+
+    @patch('main_workflow.summarize_transcript')
+    def test_unknown_summary_variant_falls_back_to_full_summary(self, mock_summarize_transcript):
+        mock_summarize_transcript.return_value = ("Full summary.", {})
+        job = {"episode_url": "http://test.com/new_episode.mp3", "title": "New Episode", "transcription_filepath": "transcription.txt"}
+        config = {"name": "Test Podcast", "rss_feed_url": "http://test.com/rss", "summary_variant": "bogus-variant"}
+
+        self.assertEqual(main_workflow.summarize_stage(job, config), {"summary_text": "Full summary."})
+        mock_summarize_transcript.assert_called_once_with("transcription.txt", [])
+
+    @patch('main_workflow.discover_latest_episode')
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    @patch('main_workflow.send_email')
+    def test_email_outage_does_not_reprocess_episode(self, mock_send_email, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        mock_discover_episode.return_value = {
+            "episode_title": "New Episode",
+            "episode_url": "http://test.com/new_episode.mp3",
+            "file_path": "podcasts/new_episode.mp3",
+            "published_date": "2025-07-27T12:00:00"
+        }
+        mock_transcribe_audio.return_value = "transcription.txt"
+        mock_summarize_transcript.return_value = ("This is a summary.", {})
+        mock_send_email.return_value = False # Email provider is down
+
+        with patch('database_manager.get_all_podcast_configs') as mock_get_all_podcast_configs:
+            mock_get_all_podcast_configs.return_value = [
+                {"name": "Test Podcast", "rss_feed_url": "http://test.com/rss", "recipient_email": "test@example.com"}
+            ]
+            process_podcasts()
+            now = datetime.now()
+            deliver_outbox(now)
+            # The next tick finds the episode in the database and doesn't transcribe it again
+            process_podcasts()
+
+        mock_transcribe_audio.assert_called_once()
+        mock_summarize_transcript.assert_called_once()
+        self.assertTrue(database_manager.episode_exists("http://test.com/new_episode.mp3"))
+
+        # The failed email is retried only once its backoff has elapsed
+        self.assertEqual(database_manager.get_due_emails(now), [])
+        self.assertEqual(len(database_manager.get_due_emails(now + timedelta(minutes=1))), 1)
+        deliver_outbox(now + timedelta(seconds=30))
+        self.assertEqual(mock_send_email.call_count, 1)
+
+        mock_send_email.return_value = True
+        deliver_outbox(now + timedelta(minutes=1))
+        self.assertEqual(mock_send_email.call_count, 2)
+        self.assertEqual(database_manager.get_due_emails(now + timedelta(days=1)), [])
+
+    @patch('main_workflow.discover_latest_episode')
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    @patch('main_workflow.send_email')
+    def test_episode_fans_out_to_subscribers(self, mock_send_email, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss", "a@test.com")
+        podcast_id = database_manager.get_all_podcast_configs()[0]["id"]
+        database_manager.add_subscription(podcast_id, "b@test.com")
+        database_manager.add_subscription(podcast_id, "c@test.com", "short")
+
+        mock_discover_episode.return_value = {
+            "episode_title": "New Episode",
+            "episode_url": "http://test.com/new_episode.mp3",
+            "file_path": "podcasts/new_episode.mp3",
+            "published_date": "2025-07-27T12:00:00"
+        }
+        mock_transcribe_audio.return_value = "transcription.txt"
+        mock_summarize_transcript.return_value = ("Full summary.", {"short": "Short summary."})
+        mock_send_email.return_value = True
+
+        process_podcasts()
+        deliver_outbox()
+
+        # One transcription and summarization however many subscribers there are
+        mock_transcribe_audio.assert_called_once()
+        mock_summarize_transcript.assert_called_once_with("transcription.txt", ["short"])
+        # Recipients of the same summary share a single send
+        self.assertEqual(mock_send_email.call_count, 2)
+        mock_send_email.assert_any_call(
+            "Summacast: Test Podcast - New Episode", "Full summary.", Markup("<p>Full summary.</p>"),
+            "Test Podcast", "New Episode", "2025-07-27T12:00:00", ["a@test.com", "b@test.com"]
+        )
+        mock_send_email.assert_any_call(
+            "Summacast: Test Podcast - New Episode", "Short summary.", Markup("<p>Short summary.</p>"),
+            "Test Podcast", "New Episode", "2025-07-27T12:00:00", ["c@test.com"]
+        )
+
+    @patch('main_workflow.discover_latest_episode')
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    def test_interrupted_job_resumes_from_last_completed_stage(self, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss", "test@example.com")
+        # A previous run transcribed the episode, then crashed before summarizing it
+        job = database_manager.create_pipeline_job({
+            "episode_url": "http://test.com/new_episode.mp3", "podcast_name": "Test Podcast", "rss_feed_url": "http://test.com/rss",
+            "title": "New Episode", "published_date": "2025-07-27T12:00:00", "audio_filepath": "podcasts/new_episode.mp3",
+            "stage": "downloaded",
+        })
+        database_manager.advance_pipeline_job(job["id"], "transcribed", {"transcription_filepath": "transcription.txt"})
+        mock_discover_episode.return_value = None
+        mock_summarize_transcript.return_value = ("This is a summary.", {})
+
+        process_podcasts()
+
+        mock_transcribe_audio.assert_not_called()
+        mock_summarize_transcript.assert_called_once_with("transcription.txt", [])
+        job = database_manager.get_pipeline_job(job["id"])
+        self.assertEqual((job["stage"], job["status"]), ("emailed", "done"))
+        self.assertIsNotNone(job["summarized_timestamp"])
+        self.assertTrue(database_manager.episode_exists("http://test.com/new_episode.mp3"))
+        self.assertEqual(len(database_manager.get_due_emails()), 1)
+
+    @patch('main_workflow.discover_latest_episode')
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    def test_failed_stage_is_retried_after_backoff(self, mock_summarize_transcript, mock_transcribe_audio, mock_discover_episode):
+        database_manager.add_podcast_config("Test Podcast", "http://test.com/rss", "test@example.com")
+        mock_discover_episode.return_value = {
+            "episode_title": "New Episode",
+            "episode_url": "http://test.com/new_episode.mp3",
+            "file_path": "podcasts/new_episode.mp3",
+            "published_date": "2025-07-27T12:00:00"
+        }
+        mock_transcribe_audio.return_value = None
+        mock_summarize_transcript.return_value = ("This is a summary.", {})
+
+        process_podcasts()
+        process_podcasts()
+
+        # The second tick falls within the backoff, so transcription isn't retried yet
+        mock_transcribe_audio.assert_called_once_with("podcasts/new_episode.mp3")
+        job = database_manager.get_pipeline_job_by_url("http://test.com/new_episode.mp3")
+        self.assertEqual((job["stage"], job["status"], job["attempts"]), ("downloaded", "pending", 1))
+        self.assertIn("Could not transcribe", job["last_error"])
+
+        mock_transcribe_audio.return_value = "transcription.txt"
+        with patch('main_workflow.datetime') as mock_datetime:
+            mock_datetime.now.return_value = datetime.now() + timedelta(minutes=6)
+            process_podcasts()
+
+        self.assertEqual(mock_transcribe_audio.call_count, 2)
+        job = database_manager.get_pipeline_job(job["id"])
+        self.assertEqual((job["stage"], job["status"], job["attempts"]), ("emailed", "done", 0))
+        self.assertTrue(database_manager.episode_exists("http://test.com/new_episode.mp3"))
+
+    @patch('main_workflow.transcribe_audio')
+    def test_expired_lease_is_taken_over(self, mock_transcribe_audio):
+        job = database_manager.create_pipeline_job({
+            "episode_url": "http://test.com/new_episode.mp3", "podcast_name": "Test Podcast", "rss_feed_url": "http://test.com/rss",
+            "title": "New Episode", "audio_filepath": "podcasts/new_episode.mp3", "stage": "downloaded",
+        })
+        # A worker claims the job, then dies without renewing its lease
+        self.assertIsNotNone(database_manager.claim_pipeline_job(["downloaded"], "dead-worker", 60))
+        self.assertIsNone(database_manager.claim_pipeline_job(["downloaded"], "worker-2", 60))
+
+        later = datetime.now() + timedelta(seconds=61)
+        claimed = database_manager.claim_pipeline_job(["downloaded"], "worker-2", 60, later)
+        self.assertEqual(claimed["lease_owner"], "worker-2")
+        self.assertIsNone(database_manager.advance_pipeline_job(job["id"], "transcribed", worker_id="dead-worker"))
+        self.assertFalse(database_manager.renew_pipeline_job_lease(job["id"], "dead-worker", 60))
+
+        advanced = database_manager.advance_pipeline_job(job["id"], "transcribed", {"transcription_filepath": "t.txt"}, worker_id="worker-2")
+        self.assertEqual(advanced["stage"], "transcribed")
+        self.assertIsNone(advanced["lease_owner"])
+
+    def test_concurrent_workers_transcribe_each_job_once(self):
+        for i in range(24):
+            database_manager.create_pipeline_job({
+                "episode_url": f"http://test.com/episode{i}.mp3", "podcast_name": "Test Podcast", "rss_feed_url": "http://test.com/rss",
+                "title": f"Episode {i}", "audio_filepath": f"podcasts/episode{i}.mp3", "stage": "downloaded",
+            })
+        database_manager.close_all_connections()
+
+        repo_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        log_path = os.path.join(repo_dir, "test_worker_transcriptions.log")
+        self.addCleanup(lambda: os.path.exists(log_path) and os.remove(log_path))
+        worker_script = (
+            "import sys, time, main_workflow\n"
+            "def transcribe(audio_filepath):\n"
+            "    time.sleep(0.01)\n"
+            "    with open(sys.argv[2], 'a') as f:\n"
+            "        f.write(audio_filepath + ' ' + sys.argv[1] + '\\n')\n"
+            "    return audio_filepath + '.txt'\n"
+            "main_workflow.transcribe_audio = transcribe\n"
+            "main_workflow.run_worker(['transcriber'], worker_id=sys.argv[1], drain=True)\n"
+        )
+        workers = [
+            subprocess.Popen([sys.executable, "-c", worker_script, f"worker-{n}", log_path], cwd=repo_dir)
+            for n in range(4)
+        ]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=120), 0)
+
+        with open(log_path) as f:
+            transcribed = [line.split()[0] for line in f]
+        self.assertEqual(sorted(transcribed), sorted(f"podcasts/episode{i}.mp3" for i in range(24)))
+        for i in range(24):
+            job = database_manager.get_pipeline_job_by_url(f"http://test.com/episode{i}.mp3")
+            self.assertEqual((job["stage"], job["transcription_filepath"], job["lease_owner"]),
+                             ("transcribed", f"podcasts/episode{i}.mp3.txt", None))
+
+    def create_transcription_jobs(self, count):
+        return [database_manager.create_pipeline_job({
+            "episode_url": f"http://test.com/episode{i}.mp3", "podcast_name": "Test Podcast", "rss_feed_url": "http://test.com/rss",
+            "title": f"Episode {i}", "audio_filepath": f"podcasts/episode{i}.mp3", "stage": "downloaded",
+        }) for i in range(count)]
+
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    def test_staged_pipeline_overlaps_stages(self, mock_summarize_transcript, mock_transcribe_audio):
+        jobs = self.create_transcription_jobs(2)
+        second_transcribing = threading.Event()
+
+        def transcribe(audio_filepath):
+            if audio_filepath == "podcasts/episode1.mp3":
+                second_transcribing.set()
+            return audio_filepath + ".txt"
+
+        def summarize(transcription_filepath, variants):
+            # The first episode is only summarized once the second is being transcribed
+            return ("Summary", {}) if transcription_filepath != "podcasts/episode0.mp3.txt" or second_transcribing.wait(10) else (None, {})
+
+        mock_transcribe_audio.side_effect = transcribe
+        mock_summarize_transcript.side_effect = summarize
+        pipeline = StagedPipeline("pipeline-test", {"transcriber": 1, "summarizer": 1})
+        pipeline.start()
+        for job in jobs:
+            self.assertTrue(pipeline.submit(job))
+        self.assertFalse(pipeline.submit(jobs[0])) # Already in the pipeline
+        pipeline.wait_until_idle()
+        pipeline.stop()
+
+        for job in jobs:
+            job = database_manager.get_pipeline_job(job["id"])
+            self.assertEqual((job["stage"], job["status"]), ("emailed", "done"))
+        self.assertEqual(len(database_manager.get_due_emails()), 2)
+
+    @patch('main_workflow.transcribe_audio')
+    @patch('main_workflow.summarize_transcript')
+    def test_staged_pipeline_full_queue_blocks_upstream(self, mock_summarize_transcript, mock_transcribe_audio):
+        jobs = self.create_transcription_jobs(3)
+        release = threading.Event()
+        mock_transcribe_audio.side_effect = lambda audio_filepath: release.wait(10) and audio_filepath + ".txt"
+        mock_summarize_transcript.return_value = ("Summary", {})
+        pipeline = StagedPipeline("pipeline-test", {"transcriber": 1}, queue_size=1)
+        pipeline.start()
+
+        # One job is being transcribed and one waits in the full queue, so the third can't be handed over yet
+        submitter = threading.Thread(target=lambda: [pipeline.submit(job) for job in jobs])
+        submitter.start()
+        submitter.join(0.5)
+        self.assertTrue(submitter.is_alive())
+
+        release.set()
+        submitter.join(10)
+        self.assertFalse(submitter.is_alive())
+        pipeline.wait_until_idle()
+        pipeline.stop()
+        self.assertEqual(mock_transcribe_audio.call_count, 3)
+        for job in jobs:
+            self.assertEqual(database_manager.get_pipeline_job(job["id"])["status"], "done")
@@ -0,0 +1,106 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+import logging
+
+# Add the parent directory to the sys.path to allow importing opml
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import opml
+import database_manager
+
+OPML_DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<opml version="2.0">
+    <head><title>My podcasts</title></head>
+    <body>
+        <outline text="News">
+            <outline type="rss" text="Daily News" xmlUrl="http://news.com/rss"/>
+            <outline type="rss" text="Broken" xmlUrl="http://broken.com/rss"/>
+        </outline>
+        <outline type="rss" text="No Audio" xmlUrl="http://text.com/rss"/>
+        <outline type="rss" xmlUrl="http://untitled.com/rss"/>
+        <outline type="rss" text="Existing" xmlUrl="http://existing.com/rss"/>
+        <outline type="rss" text="Daily News again" xmlUrl="http://news.com/rss"/>
+    </body>
+</opml>"""
+
+def make_feed(title, enclosure_type="audio/mpeg"):
+    return f"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>{title}</title>
+    <item><title>Episode 1</title><enclosure url="http://example.com/1.mp3" type="{enclosure_type}" length="1"/></item>
+</channel></rss>""".encode()
+
+FEEDS = {
+    "http://news.com/rss": make_feed("Daily News"),
+    "http://text.com/rss": make_feed("Blog", enclosure_type="text/html"),
+    "http://untitled.com/rss": make_feed("Untitled Show"),
+}
+
+def fake_fetch_feed(url):
+    if url not in FEEDS:
+        raise opml.FeedValidationError("HTTP 404")
+    return FEEDS[url]
+
+class TestOpml(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        self.original_database_name = database_manager.DATABASE_NAME
+        database_manager.DATABASE_NAME = "test_opml.db"
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.create_table()
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        database_manager.close_all_connections()
+        if os.path.exists(database_manager.DATABASE_NAME):
+            os.remove(database_manager.DATABASE_NAME)
+        database_manager.DATABASE_NAME = self.original_database_name
+
+    def test_parse_opml_reads_nested_outlines_once(self):
+        feeds = opml.parse_opml(OPML_DOCUMENT)
+        self.assertEqual([feed["rss_feed_url"] for feed in feeds], [
+            "http://news.com/rss", "http://broken.com/rss", "http://text.com/rss", "http://untitled.com/rss", "http://existing.com/rss",
+        ])
+        self.assertEqual(feeds[0]["name"], "Daily News")
+        with self.assertRaises(ValueError):
+            opml.parse_opml(b"<rss></rss>")
+        with self.assertRaises(ValueError):
+            opml.parse_opml(b"not xml")
+
+    @patch('opml.fetch_feed', side_effect=fake_fetch_feed)
+    def test_import_validates_feeds_and_reports_each(self, mock_fetch_feed):
+        database_manager.add_podcast_config("Existing", "http://existing.com/rss")
+
+        report = {entry["rss_feed_url"]: entry for entry in opml.import_opml(OPML_DOCUMENT, workers=2)}
+
+        self.assertEqual({url: entry["status"] for url, entry in report.items()}, {
+            "http://news.com/rss": "added",
+            "http://broken.com/rss": "invalid",
+            "http://text.com/rss": "invalid",
+            "http://untitled.com/rss": "added",
+            "http://existing.com/rss": "exists",
+        })
+        self.assertEqual(report["http://broken.com/rss"]["error"], "HTTP 404")
+        self.assertEqual(report["http://text.com/rss"]["error"], "No episodes with audio enclosures")
+        # Already-configured feeds aren't fetched again
+        self.assertNotIn("http://existing.com/rss", [call.args[0] for call in mock_fetch_feed.call_args_list])
+        self.assertEqual(sorted(config["name"] for config in database_manager.get_all_podcast_configs()),
+                         ["Daily News", "Existing", "Untitled Show"])
+
+    def test_export_round_trips(self):
+        database_manager.add_podcast_config("Show & Tell", "http://show.com/rss?a=1&b=2")
+        database_manager.add_podcast_config("Other", "http://other.com/rss")
+        document = opml.export_opml(database_manager.get_all_podcast_configs())
+        self.assertEqual(opml.parse_opml(document), [
+            {"name": "Show & Tell", "rss_feed_url": "http://show.com/rss?a=1&b=2"},
+            {"name": "Other", "rss_feed_url": "http://other.com/rss"},
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
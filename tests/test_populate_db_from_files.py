@@ -27,17 +27,13 @@ class TestPopulateDbFromFiles(unittest.TestCase):
 
         # Set up a clean test database before each test
         database_manager.DATABASE_NAME = self.test_db
-        conn = database_manager.connect_db()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("DROP TABLE IF EXISTS podcast_configs")
-            conn.commit()
-            conn.close()
-        database_manager.create_podcast_configs_table()
+        database_manager.clear_all_data()
+        database_manager.create_table()
 
 
     def tearDown(self):
         shutil.rmtree(self.test_podcasts_dir)
+        database_manager.close_all_connections()
         if os.path.exists(self.test_db):
             os.remove(self.test_db)
 
@@ -56,5 +52,35 @@ class TestPopulateDbFromFiles(unittest.TestCase):
         self.assertEqual(podcasts[0], "Podcast 1")
         self.assertEqual(podcasts[1], "Podcast 2")
 
+    def test_populate_db_imports_episode_files(self):
+        podcast_path = os.path.join(self.test_podcasts_dir, "Podcast 1")
+        for name, content in [
+            ("Episode A.mp3", "audio"), ("Episode A.txt", "Transcript of episode A about volcanoes."),
+            ("Episode A.summary.txt", "Summary of A."), ("Episode B.m4a", "audio"),
+            ("Orphan.summary.txt", "Summary without an episode."),
+        ]:
+            with open(os.path.join(podcast_path, name), "w", encoding="utf-8") as f:
+                f.write(content)
+
+        with patch('populate_db_from_files.IMPORT_BATCH_SIZE', 1):
+            result = populate_db_from_files(podcasts_dir=self.test_podcasts_dir, db_name=self.test_db)
+        self.assertEqual(result, {"podcasts": 2, "episodes": 2})
+
+        episodes = {e["title"]: e for e in database_manager.list_episodes(columns=tuple(database_manager.EPISODE_COLUMNS))["episodes"]}
+        self.assertEqual(sorted(episodes), ["Episode A", "Episode B"])
+        episode_a = episodes["Episode A"]
+        self.assertEqual(episode_a["summary_text"], "Summary of A.")
+        self.assertEqual(episode_a["audio_filepath"], os.path.join(podcast_path, "Episode A.mp3"))
+        self.assertEqual(episode_a["podcast_id"], database_manager.get_all_podcast_configs()[0]["id"])
+        self.assertIsNotNone(episode_a["published_epoch"])
+        self.assertEqual(database_manager.get_episode_artifact(episode_a["id"], "transcript"), "Transcript of episode A about volcanoes.")
+        self.assertEqual([r["title"] for r in database_manager.search_episodes("volcanoes")], ["Episode A"])
+        self.assertIsNone(episodes["Episode B"]["transcription_filepath"])
+
+        # Re-running the import adds nothing new
+        result = populate_db_from_files(podcasts_dir=self.test_podcasts_dir, db_name=self.test_db)
+        self.assertEqual(result, {"podcasts": 0, "episodes": 0})
+        self.assertEqual(len(database_manager.list_episodes(columns=tuple(database_manager.EPISODE_COLUMNS))["episodes"]), 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import os
+import sys
+import shutil
+import logging
+from datetime import datetime, timedelta
+
+# Add the parent directory to the sys.path to allow importing retention
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from retention import run_retention
+import database_manager
+
+class TestRetention(unittest.TestCase):
+
+    def setUp(self):
+        # Disable logging during tests to prevent clutter
+        logging.disable(logging.CRITICAL)
+        self.original_names = (database_manager.DATABASE_NAME, database_manager.ARCHIVE_DATABASE_NAME)
+        database_manager.DATABASE_NAME = "test_retention.db"
+        database_manager.ARCHIVE_DATABASE_NAME = "test_retention_archive.db"
+        database_manager.close_all_connections()
+        for filename in (database_manager.DATABASE_NAME, database_manager.ARCHIVE_DATABASE_NAME):
+            if os.path.exists(filename):
+                os.remove(filename)
+        database_manager.create_table()
+        self.files_dir = "test_retention_files"
+        os.makedirs(self.files_dir, exist_ok=True)
+
+        self.now = datetime(2025, 7, 27, 12, 0, 0)
+        database_manager.add_podcast_config("Kept Podcast", "http://kept.com/rss")
+        database_manager.add_podcast_config("Archived Podcast", "http://archived.com/rss")
+        self.kept_id, self.archived_id = [c["id"] for c in database_manager.get_all_podcast_configs()]
+        # The second podcast's summaries are only kept for 30 days
+        database_manager.set_retention_rule(self.archived_id, "summary", 30)
+        for feed in ("kept", "archived"):
+            for name, age in (("old", timedelta(days=400)), ("recent", timedelta(days=60)), ("new", timedelta(days=1))):
+                self.add_episode(feed, name, self.now - age)
+
+    def tearDown(self):
+        # Re-enable logging after tests
+        logging.disable(logging.NOTSET)
+        database_manager.close_all_connections()
+        shutil.rmtree(self.files_dir)
+        for filename in (database_manager.DATABASE_NAME, database_manager.ARCHIVE_DATABASE_NAME):
+            if os.path.exists(filename):
+                os.remove(filename)
+        database_manager.DATABASE_NAME, database_manager.ARCHIVE_DATABASE_NAME = self.original_names
+
+    def add_episode(self, feed, name, published):
+        audio_filepath = os.path.join(self.files_dir, f"{feed}-{name}.mp3")
+        with open(audio_filepath, "wb") as f:
+            f.write(b"\0" * 1000)
+        database_manager.add_episode({
+            "podcast_url": f"http://{feed}.com/rss",
+            "episode_url": f"http://{feed}.com/{name}.mp3",
+            "title": f"{feed} {name}",
+            "published_date": published.isoformat(),
+            "audio_filepath": audio_filepath,
+            "transcription_filepath": os.path.join(self.files_dir, f"{feed}-{name}.txt"),
+            "summary_text": f"Summary of {feed} {name}.",
+        })
+        transcription_filepath = os.path.join(self.files_dir, f"{feed}-{name}.txt")
+        with open(transcription_filepath, "w") as f:
+            f.write(f"Transcript of the {feed} {name} episode, about volcanoes. {os.urandom(4000).hex()}")
+        database_manager.index_transcript(f"http://{feed}.com/{name}.mp3", transcription_filepath)
+
+    def episodes_by_title(self):
+        return {episode["title"]: episode for episode in database_manager.list_episodes(columns=tuple(database_manager.EPISODE_COLUMNS))["episodes"]}
+
+    def test_retention_applies_per_feed_rules(self):
+        # Archived episodes' files go too, as the archive keeps their transcripts
+        transcript_bytes = sum(os.path.getsize(os.path.join(self.files_dir, f"{name}.txt"))
+                               for name in ("kept-old", "archived-old", "archived-recent"))
+
+        report = run_retention(now=self.now)
+
+        self.assertEqual(report["audio_files_deleted"], 4)
+        self.assertEqual(report["transcripts_deleted"], 2)
+        self.assertEqual(report["episodes_archived"], 2)
+        self.assertEqual(report["file_bytes_reclaimed"], 4000 + transcript_bytes)
+        self.assertGreaterEqual(report["database_bytes_reclaimed"], 0)
+        self.assertEqual(database_manager.get_retention_runs()[0]["episodes_archived"], 2)
+
+        episodes = self.episodes_by_title()
+        self.assertEqual(sorted(episodes), ["archived new", "kept new", "kept old", "kept recent"])
+        # Audio is kept for 7 days, transcripts for a year, and summaries forever by default
+        self.assertIsNone(episodes["kept recent"]["audio_filepath"])
+        self.assertFalse(os.path.exists(os.path.join(self.files_dir, "kept-recent.mp3")))
+        self.assertTrue(os.path.exists(episodes["kept new"]["audio_filepath"]))
+        self.assertIsNone(database_manager.get_transcript(episodes["kept old"]["id"]))
+        self.assertFalse(os.path.exists(os.path.join(self.files_dir, "kept-old.txt")))
+        self.assertIsNotNone(database_manager.get_transcript(episodes["kept recent"]["id"]))
+        self.assertEqual(episodes["kept old"]["summary_text"], "Summary of kept old.")
+        self.assertEqual(sorted(r["title"] for r in database_manager.search_episodes("volcanoes")),
+                         ["archived new", "kept new", "kept recent"])
+
+        # Archived episodes can still be read back, and are never processed again
+        archived = database_manager.get_archived_episode("http://archived.com/recent.mp3")
+        self.assertEqual(archived["summary_text"], "Summary of archived recent.")
+        self.assertIn("volcanoes", archived["transcript"])
+        self.assertTrue(database_manager.episode_exists("http://archived.com/recent.mp3"))
+
+        # A second run has nothing left to do
+        report = run_retention(now=self.now)
+        self.assertEqual((report["audio_files_deleted"], report["transcripts_deleted"], report["episodes_archived"]), (0, 0, 0))
+
+    def test_expired_transcripts_take_their_sidecar_files(self):
+        sidecars = {name: [os.path.join(self.files_dir, name + suffix) for suffix in (".summary.txt", ".timings.json", ".chunks.json")]
+                    for name in ("kept-old", "kept-recent")}
+        for filepath in sidecars["kept-old"] + sidecars["kept-recent"]:
+            with open(filepath, "w") as f:
+                f.write("sidecar")
+
+        report = run_retention(now=self.now)
+
+        self.assertEqual(report["transcripts_deleted"], 2)
+        self.assertFalse(any(os.path.exists(filepath) for filepath in sidecars["kept-old"]))
+        self.assertTrue(all(os.path.exists(filepath) for filepath in sidecars["kept-recent"]))
+
+    def test_compaction_reclaims_freed_pages(self):
+        database_manager.compact_database()
+        self.assertEqual(database_manager.connect_db().execute("PRAGMA auto_vacuum").fetchone()[0], 2)
+        database_manager.set_retention_rule(self.kept_id, "summary", 0)
+        database_manager.set_retention_rule(self.archived_id, "summary", 0)
+
+        report = run_retention(now=self.now)
+
+        self.assertEqual(report["episodes_archived"], 6)
+        self.assertGreater(report["database_bytes_reclaimed"], 0)
+        self.assertEqual(database_manager.connect_db().execute("PRAGMA freelist_count").fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,6 @@ import logging
 # Add the parent directory to the sys.path to allow importing send_email
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from send_email import send_email
-from app import app # Import the app for context
 
 class TestSendEmail(unittest.TestCase):
 
@@ -18,9 +17,6 @@ class TestSendEmail(unittest.TestCase):
         os.environ["RECIPIENT_EMAIL"] = "recipient@example.com"
         # Disable logging during tests to prevent clutter
         logging.disable(logging.CRITICAL)
-        # Push an application context
-        self.app_context = app.app_context()
-        self.app_context.push()
 
     def tearDown(self):
         # Clean up environment variables after testing
@@ -29,17 +25,13 @@ class TestSendEmail(unittest.TestCase):
                 del os.environ[var]
         # Re-enable logging after tests
         logging.disable(logging.NOTSET)
-        # Pop the application context
-        self.app_context.pop()
 
-    @patch('send_email.render_template')
-    @patch('send_email.markdown.markdown')
+    @patch('send_email.email_renderer.render_summary_email')
     @patch('requests.post')
-    def test_send_email_success(self, mock_post, mock_markdown, mock_render_template):
+    def test_send_email_success(self, mock_post, mock_render_summary_email):
         mock_post.return_value.raise_for_status.return_value = None
         mock_post.return_value.json.return_value = {'success_count': 1}
-        mock_markdown.return_value = "markdown_summary"
-        mock_render_template.return_value = "<html><body>markdown_summary</body></html>"
+        mock_render_summary_email.return_value = "<html><body>markdown_summary</body></html>"
 
         result = send_email(
             "Test Subject",
@@ -50,13 +42,11 @@ class TestSendEmail(unittest.TestCase):
             "2025-01-01"
         )
 
-        mock_markdown.assert_called_once_with("Test Summary Content")
-        mock_render_template.assert_called_once_with(
-            'email_summary_template.html',
-            podcast_name="Test Podcast",
-            episode_title="Test Episode",
-            published_date="2025-01-01",
-            summary_content="markdown_summary"
+        mock_render_summary_email.assert_called_once_with(
+            "Test Podcast",
+            "Test Episode",
+            "2025-01-01",
+            "Test Summary Content"
         )
         mock_post.assert_called_once_with(
             'https://api.ahasend.com/v1/email/send',
@@ -76,14 +66,12 @@ class TestSendEmail(unittest.TestCase):
         mock_post.assert_not_called()
         self.assertFalse(result)
 
-    @patch('send_email.render_template')
-    @patch('send_email.markdown.markdown')
+    @patch('send_email.email_renderer.render_summary_email')
     @patch('requests.post')
-    def test_send_email_custom_recipient(self, mock_post, mock_markdown, mock_render_template):
+    def test_send_email_custom_recipient(self, mock_post, mock_render_summary_email):
         mock_post.return_value.raise_for_status.return_value = None
         mock_post.return_value.json.return_value = {'success_count': 1}
-        mock_markdown.return_value = "markdown_summary"
-        mock_render_template.return_value = "<html><body>markdown_summary</body></html>"
+        mock_render_summary_email.return_value = "<html><body>markdown_summary</body></html>"
 
         result = send_email(
             "Test Subject",
@@ -106,5 +94,29 @@ class TestSendEmail(unittest.TestCase):
         )
         self.assertTrue(result)
 
+    @patch('send_email.email_renderer.render_summary_email')
+    @patch('requests.post')
+    def test_send_email_batched_recipients(self, mock_post, mock_render_summary_email):
+        mock_post.return_value.raise_for_status.return_value = None
+        mock_render_summary_email.return_value = "<html><body>markdown_summary</body></html>"
+
+        result = send_email(
+            "Test Subject",
+            "Test Text Body",
+            "Test Summary Content",
+            "Test Podcast",
+            "Test Episode",
+            "2025-01-01",
+            recipient_email=["one@example.com", None, "two@example.com"]
+        )
+
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args.kwargs['json']['recipients'], [
+            {'name': 'Podcast Listener', 'email': 'one@example.com'},
+            {'name': 'Podcast Listener', 'email': 'recipient@example.com'},
+            {'name': 'Podcast Listener', 'email': 'two@example.com'},
+        ])
+        self.assertTrue(result)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -8,7 +8,7 @@ import logging
 # Add the parent directory to the sys.path to allow importing summarize_podcast
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from summarize_podcast import summarize_text
+from summarize_podcast import summarize_text, stream_summary, SummarizationError, summarize_variants, summarize_transcript
 
 class TestSummarizePodcast(unittest.TestCase):
 
@@ -17,6 +17,7 @@ class TestSummarizePodcast(unittest.TestCase):
         os.makedirs(self.test_dir, exist_ok=True)
         self.dummy_transcription_path = os.path.join(self.test_dir, "dummy_transcription.txt")
         self.expected_summary_path = os.path.join(self.test_dir, "dummy_transcription.summary.txt")
+        self.expected_chunks_path = os.path.join(self.test_dir, "dummy_transcription.chunks.json")
         # Disable logging during tests to prevent clutter
         logging.disable(logging.CRITICAL)
 
@@ -25,6 +26,8 @@ class TestSummarizePodcast(unittest.TestCase):
             os.remove(self.dummy_transcription_path)
         if os.path.exists(self.expected_summary_path):
             os.remove(self.expected_summary_path)
+        if os.path.exists(self.expected_chunks_path):
+            os.remove(self.expected_chunks_path)
         if os.path.exists(self.test_dir):
             os.rmdir(self.test_dir)
         # Re-enable logging after tests
@@ -86,5 +89,113 @@ This is a dummy transcription content.
         self.assertIsNone(summary)
         self.assertFalse(os.path.exists(self.expected_summary_path)) # Summary file should not be created
 
+    @patch('summarize_podcast.CHUNK_WORDS', 4)
+    @patch('summarize_podcast.run_gemini')
+    def test_summarize_variants_shares_map_stage(self, mock_run_gemini):
+        # Two chunks to map, then one reduce per variant
+        mock_run_gemini.side_effect = ["Notes 1", "Notes 2", "Short summary", "Long summary"]
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("one two three four five six seven")
+
+        summaries = summarize_variants(self.dummy_transcription_path, ["short", "long-paragraphs"])
+
+        self.assertEqual(summaries, {"short": "Short summary", "long-paragraphs": "Long summary"})
+        self.assertEqual(mock_run_gemini.call_count, 4)
+        self.assertIn("one two three four", mock_run_gemini.call_args_list[0].args[0])
+        self.assertIn("five six seven", mock_run_gemini.call_args_list[1].args[0])
+        self.assertIn("Notes 1", mock_run_gemini.call_args_list[2].args[0])
+        self.assertIn("prose paragraphs", mock_run_gemini.call_args_list[3].args[0])
+
+        # A later variant reuses the cached chunk summaries and costs a single reduce call
+        mock_run_gemini.reset_mock()
+        mock_run_gemini.side_effect = ["Medium summary"]
+        summaries = summarize_variants(self.dummy_transcription_path, ["medium-bullets"])
+        self.assertEqual(summaries, {"medium-bullets": "Medium summary"})
+        mock_run_gemini.assert_called_once()
+
+    @patch('summarize_podcast.CHUNK_WORDS', 4)
+    @patch('summarize_podcast.run_gemini')
+    def test_summarize_transcript_maps_once_for_full_summary_and_variants(self, mock_run_gemini):
+        # Two chunks to map, then a reduce for the full summary and one per variant
+        mock_run_gemini.side_effect = ["Notes 1", "Notes 2", "Summary: Full summary", "Short summary"]
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("one two three four five six seven")
+
+        summary, variants = summarize_transcript(self.dummy_transcription_path, ["short"])
+
+        self.assertEqual((summary, variants), ("Full summary", {"short": "Short summary"}))
+        prompts = [call.args[0] for call in mock_run_gemini.call_args_list]
+        self.assertEqual(len(prompts), 4)
+        self.assertEqual(sum("of a podcast transcript. Write detailed notes" in prompt for prompt in prompts), 2)
+        self.assertIn("## Key Quote", prompts[2])
+        self.assertIn("Notes 1", prompts[2])
+        self.assertIn("no more than 100 words", prompts[3])
+        with open(self.expected_summary_path, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "Full summary")
+
+    @patch('summarize_podcast.CHUNK_WORDS', 4)
+    @patch('summarize_podcast.run_gemini')
+    def test_chunk_cache_is_invalidated_by_new_transcript(self, mock_run_gemini):
+        mock_run_gemini.side_effect = ["Old notes", "Old summary"]
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("one two three")
+        summarize_variants(self.dummy_transcription_path, ["short"])
+
+        # Re-transcribing changes the transcript, so its chunks are summarized afresh
+        mock_run_gemini.side_effect = ["New notes", "New summary"]
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("four five six")
+        self.assertEqual(summarize_variants(self.dummy_transcription_path, ["short"]), {"short": "New summary"})
+        self.assertIn("four five six", mock_run_gemini.call_args_list[2].args[0])
+
+        # A corrupt cache is treated as a miss
+        mock_run_gemini.side_effect = ["Notes", "Summary"]
+        with open(self.expected_chunks_path, "w", encoding="utf-8") as f:
+            f.write('{"transcript_sha256": ')
+        self.assertEqual(summarize_variants(self.dummy_transcription_path, ["short"]), {"short": "Summary"})
+        self.assertEqual(mock_run_gemini.call_count, 6)
+
+    def test_summarize_variants_unknown_variant(self):
+        with self.assertRaises(ValueError):
+            summarize_variants(self.dummy_transcription_path, ["enormous"])
+
+    def test_stream_summary_yields_incrementally_and_saves(self):
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("This is a dummy transcription content.")
+
+        # Stand in for the Gemini CLI with a process that streams its output in pieces
+        fake_cli = [sys.executable, "-c", (
+            "import sys, time; sys.stdin.read(); "
+            "sys.stdout.write('Loaded cached credentials.\\n'); sys.stdout.flush(); "
+            "[(sys.stdout.write(p), sys.stdout.flush(), time.sleep(0.01)) for p in ['First point. ' * 10, 'Second point.\\n']]"
+        )]
+        with patch('summarize_podcast.GEMINI_COMMAND', fake_cli):
+            pieces = list(stream_summary(self.dummy_transcription_path, chunk_size=8))
+
+        self.assertGreater(len(pieces), 1)
+        expected_summary = "First point. " * 10 + "Second point."
+        self.assertEqual("".join(pieces).strip(), expected_summary)
+        with open(self.expected_summary_path, "r", encoding="utf-8") as f:
+            self.assertEqual(f.read(), expected_summary)
+
+    def test_stream_summary_cli_error(self):
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("This is a dummy transcription content.")
+
+        fake_cli = [sys.executable, "-c", "import sys; sys.stdin.read(); sys.stderr.write('CLI Error'); sys.exit(1)"]
+        with patch('summarize_podcast.GEMINI_COMMAND', fake_cli):
+            with self.assertRaises(SummarizationError):
+                list(stream_summary(self.dummy_transcription_path))
+        self.assertFalse(os.path.exists(self.expected_summary_path))
+
+    def test_stream_summary_missing_cli(self):
+        with open(self.dummy_transcription_path, "w", encoding="utf-8") as f:
+            f.write("This is a dummy transcription content.")
+
+        with patch('summarize_podcast.GEMINI_COMMAND', ["/nonexistent/gemini"]):
+            with self.assertRaises(SummarizationError):
+                list(stream_summary(self.dummy_transcription_path))
+        self.assertFalse(os.path.exists(self.expected_summary_path))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to the sys.path to allow importing summary_renderer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import summary_renderer
+
+class TestSummaryRenderer(unittest.TestCase):
+
+    def test_renders_markdown(self):
+        html = summary_renderer.render_summary_html("## Key Quote\n\n* **First** point\n\n[Link](https://example.com)")
+        self.assertIn("<h2>Key Quote</h2>", html)
+        self.assertIn("<li><strong>First</strong> point</li>", html)
+        self.assertIn('<a href="https://example.com">Link</a>', html)
+
+    def test_strips_scripts_and_event_handlers(self):
+        html = summary_renderer.render_summary_html(
+            'Hi <script>alert(1)</script><img src=x onerror="alert(2)"><b onclick="alert(3)">bold</b>'
+        )
+        self.assertNotIn("script", html)
+        self.assertNotIn("alert", html)
+        self.assertNotIn("<img", html)
+        self.assertIn("<b>bold</b>", html)
+
+    def test_drops_unsafe_link_schemes(self):
+        html = summary_renderer.render_summary_html('[a](javascript:alert(1)) <a href="java\tscript:alert(2)">b</a>')
+        self.assertNotIn("javascript", html)
+        self.assertNotIn("script:", html)
+        self.assertIn("<a>a</a>", html)
+
+    def test_closes_unclosed_tags(self):
+        html = summary_renderer.sanitize_html("<blockquote><p>Unfinished")
+        self.assertEqual(html, "<blockquote><p>Unfinished</p></blockquote>")
+
+    def test_escapes_disallowed_text(self):
+        self.assertEqual(summary_renderer.sanitize_html("<div>1 < 2 &amp; 3</div>"), "1 &lt; 2 &amp; 3")
+
+    def test_empty_summary(self):
+        self.assertEqual(summary_renderer.render_summary_html(None), "")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,22 @@ class TestTranscribePodcast(unittest.TestCase):
         mock_open().write.assert_called_once_with(mock_transcription_text)
         self.assertEqual(result, expected_transcription_filepath)
 
+    @patch('transcribe_podcast.whisper.load_model')
+    @patch('builtins.open', new_callable=mock_open)
+    def test_transcribe_audio_saves_timings(self, mock_open, mock_load_model):
+        mock_model = MagicMock()
+        mock_model.transcribe.return_value = {
+            "text": " Hello there. Welcome back.",
+            "segments": [{"id": 0, "start": 0.0, "end": 1.5, "text": " Hello there."},
+                         {"id": 1, "start": 1.5, "end": 3.0, "text": " Welcome back."}],
+        }
+        mock_load_model.return_value = mock_model
+
+        self.assertEqual(transcribe_audio("/path/to/episode.mp3"), "/path/to/episode.txt")
+        mock_open.assert_any_call("/path/to/episode.timings.json", "w", encoding="utf-8")
+        written = "".join(call.args[0] for call in mock_open().write.call_args_list)
+        self.assertIn('[{"start": 0.0, "end": 1.5, "text": " Hello there."}', written)
+
     @patch('transcribe_podcast.whisper.load_model', side_effect=Exception("Whisper error"))
     @patch('builtins.open', new_callable=mock_open)
     @patch('transcribe_podcast.os.path.splitext')
@@ -1,5 +1,6 @@
 import whisper
 import os
+import json
 import logging
 
 # Configure logging for this module
@@ -15,6 +16,12 @@ def transcribe_audio(audio_file_path):
         transcription_file_path = os.path.splitext(audio_file_path)[0] + ".txt"
         with open(transcription_file_path, "w", encoding="utf-8") as f:
             f.write(result["text"])
+        if result.get("segments"):
+            # When each stretch of text was spoken, so the transcript viewer can seek by time
+            timings = [{"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                       for segment in result["segments"]]
+            with open(os.path.splitext(audio_file_path)[0] + ".timings.json", "w", encoding="utf-8") as f:
+                json.dump(timings, f)
         logger.info(f"Transcription saved to {transcription_file_path}")
         return transcription_file_path
     except FileNotFoundError: